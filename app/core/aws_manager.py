@@ -1,14 +1,51 @@
+import threading
+from functools import cached_property
+from typing import Any, Dict, Optional, Tuple
+
 import boto3
+import botocore.session
+from botocore.config import Config as BotocoreConfig
+from botocore.credentials import DeferredRefreshableCredentials
 from botocore.exceptions import NoCredentialsError, ClientError
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 class AWSManager:
-    def __init__(self, aws_profile: str, aws_region: str):
+    """
+    Creates boto3 sessions and clients, caching them for the life of the process.
+
+    Clients are cached per (service, role ARN, region) and share one tuned botocore config,
+    so every module asking for the same client reuses its connection pool. Assumed-role
+    sessions are cached per role ARN with refreshable credentials: the first request made
+    with them calls `sts:AssumeRole`, and botocore renews them before they expire, so a role
+    costs one STS call at startup and long-lived workers never hold expired credentials.
+    boto3 clients are thread-safe; sessions are not, so they are only used under a lock.
+    """
+
+    def __init__(self, aws_profile: str, aws_region: str, client_config: Optional[Dict[str, Any]] = None):
         self.aws_profile = aws_profile
         self.aws_region = aws_region
-        self.session = self._create_session()
+        client_config = client_config or {}
+        self.role_session_duration = int(client_config.get("role_session_duration") or 3600)
+        self.botocore_config = BotocoreConfig(
+            max_pool_connections=int(client_config.get("max_pool_connections") or 50),
+            retries={
+                "mode": client_config.get("retries_mode") or "standard",
+                "max_attempts": int(client_config.get("max_attempts") or 3),
+            },
+            connect_timeout=client_config.get("connect_timeout", 5),
+            read_timeout=client_config.get("read_timeout", 60),
+            tcp_keepalive=bool(client_config.get("tcp_keepalive", True)),
+        )
+        self._role_sessions: Dict[str, boto3.Session] = {}
+        self._clients: Dict[Tuple[str, Optional[str], Optional[str]], Any] = {}
+        self._lock = threading.RLock()
+
+    @cached_property
+    def session(self):
+        """The base boto3 session, created on first use."""
+        return self._create_session()
 
     def _create_session(self):
         """Creates a boto3 session, prioritizing named profiles for local development
@@ -33,62 +70,81 @@ class AWSManager:
         """Returns the configured boto3 session."""
         return self.session
 
+    def _fetch_role_credentials(self, role_arn: str, role_session_name: str) -> Dict[str, str]:
+        """Calls `sts:AssumeRole` and returns the credentials in the form botocore refreshes from."""
+        try:
+            response = self.get_client("sts").assume_role(
+                RoleArn=role_arn, RoleSessionName=role_session_name, DurationSeconds=self.role_session_duration
+            )
+        except ClientError as e:
+            logger.error(f"Error assuming role {role_arn}: {e}")
+            raise
+        credentials = response["Credentials"]
+        logger.info(f"Assumed role {role_arn} until {credentials['Expiration']}")
+        return {
+            "access_key": credentials["AccessKeyId"],
+            "secret_key": credentials["SecretAccessKey"],
+            "token": credentials["SessionToken"],
+            "expiry_time": credentials["Expiration"].isoformat(),
+        }
+
     def assume_role(self, role_arn: str, role_session_name: str = "AssumedSession"):
         """
-        Assumes a specified IAM role and returns a new session.
+        Returns the session for a role, creating it with self-refreshing credentials on first use.
 
         Args:
             role_arn (str): The ARN of the role to assume.
             role_session_name (str): The name to use for the assumed role session.
 
         Returns:
-            boto3.Session: A new session using the assumed role credentials.
+            boto3.Session: A session using the assumed role credentials, shared by every caller of the role.
         """
-        sts_client = self.get_client("sts")
-        try:
-            response = sts_client.assume_role(
-                RoleArn=role_arn, RoleSessionName=role_session_name
-            )
-
-            credentials = response["Credentials"]
-            assumed_role_session = boto3.Session(
-                aws_access_key_id=credentials["AccessKeyId"],
-                aws_secret_access_key=credentials["SecretAccessKey"],
-                aws_session_token=credentials["SessionToken"],
-                region_name=self.aws_region,
-            )
-            logger.info(f"Successfully assumed role: {role_arn}")
-            return assumed_role_session
-        except ClientError as e:
-            logger.error(f"Error assuming role {role_arn}: {e}")
-            raise
+        with self._lock:
+            session = self._role_sessions.get(role_arn)
+            if session is None:
+                credentials = DeferredRefreshableCredentials(
+                    refresh_using=lambda: self._fetch_role_credentials(role_arn, role_session_name),
+                    method="sts-assume-role",
+                )
+                core_session = botocore.session.get_session()
+                # botocore has no public setter for refreshable credentials on a session
+                core_session._credentials = credentials
+                session = boto3.Session(botocore_session=core_session, region_name=self.aws_region)
+                self._role_sessions[role_arn] = session
+            return session
 
-    def get_client(self, service_name: str, assumed_role_arn: str = None):
+    def get_client(self, service_name: str, assumed_role_arn: str = None, region_name: str = None):
         """
-        Returns a boto3 client for the specified service. Optionally assumes a role before creating the client.
+        Returns the cached boto3 client for the specified service, creating it on first use.
 
         Args:
             service_name (str): The name of the AWS service (e.g., 's3', 'bedrock', 'rds').
             assumed_role_arn (str, optional): The ARN of an IAM role to assume for this client.
+            region_name (str, optional): The region of the client. Defaults to the configured region.
         """
-        if assumed_role_arn:
-            session = self.assume_role(assumed_role_arn)
-        else:
-            session = self.session
-
-        return session.client(service_name, region_name=self.aws_region)
+        region_name = region_name or self.aws_region
+        key = (service_name, assumed_role_arn, region_name)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                session = self.assume_role(assumed_role_arn) if assumed_role_arn else self.session
+                client = session.client(service_name, region_name=region_name, config=self.botocore_config)
+                self._clients[key] = client
+            return client
 
     def get_resource(self, service_name: str, assumed_role_arn: str = None):
         """
-        Returns a boto3 resource for the specified service. Optionally assumes a role before creating the resource.
+        Returns a new boto3 resource for the specified service. Optionally assumes a role before creating the resource.
+
+        Resources are not thread-safe, so they are not cached; the role session they come from is.
 
         Args:
             service_name (str): The name of the AWS service (e.g., 's3', 'dynamodb').
             assumed_role_arn (str, optional): The ARN of an IAM role to assume for this resource.
         """
-        if assumed_role_arn:
-            session = self.assume_role(assumed_role_arn)
-        else:
-            session = self.session
-
-        return session.resource(service_name, region_name=self.aws_region)
\ No newline at end of file
+        with self._lock:
+            session = self.assume_role(assumed_role_arn) if assumed_role_arn else self.session
+            return session.resource(service_name, region_name=self.aws_region, config=self.botocore_config)
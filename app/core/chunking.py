@@ -1,9 +1,64 @@
+import hashlib
+import uuid
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from dataclasses import dataclass
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c1c9e-2a0b-4d8e-9a57-0d6c3f1e8b42")
+# Page metadata every stored chunk keeps inline: the page it belongs to, and the version stale-chunk cleanup compares
+PAGE_REFERENCE_FIELDS = ("id", "version")
+
+def make_chunk_id(page_id: Optional[str], version: Optional[int], ordinal: int, text: str) -> str:
+    """
+    Derives a deterministic chunk id, so re-ingesting an unchanged page yields the same ids.
+
+    Args:
+        page_id (str): The id of the page the chunk belongs to.
+        version (int): The version of the page.
+        ordinal (int): The position of the chunk within the page.
+        text (str): The chunk text.
+
+    Returns:
+        str: A UUID string derived from (page id, page version, chunk ordinal, content hash).
+    """
+    content_hash = hashlib.sha256(text.encode()).hexdigest()
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{page_id}:{version}:{ordinal}:{content_hash}"))
+
+def page_id_of(metadata: Dict[str, Any]) -> Optional[str]:
+    """Returns the page id of a document's metadata as a string, the key chunks refer to their page by."""
+    page_id = metadata.get("id")
+    return None if page_id is None else str(page_id)
+
+def page_reference(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns the part of a page's metadata stored with each of its chunks.
+
+    The rest is stored once per page and joined back in on search. Metadata without a page
+    id has no page to refer to and is kept whole.
+
+    Args:
+        metadata (Dict[str, Any]): The page metadata.
+
+    Returns:
+        Dict[str, Any]: The `PAGE_REFERENCE_FIELDS` of the metadata, or the metadata itself.
+    """
+    if metadata.get("id") is None:
+        return metadata
+    return {field: metadata[field] for field in PAGE_REFERENCE_FIELDS if field in metadata}
+
+@dataclass(slots=True)
+class Chunk:
+    """
+    A chunk of a page. The page metadata is not copied onto each chunk: chunks refer to it by
+    `page_id`, and callers keep one metadata dict per page alongside them.
+    """
+    page_content: str
+    page_id: Optional[str]
+    chunk_id: str
 
 class ChunkingStrategy(ABC):
     @abstractmethod
-    def chunk_document(self, document: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def chunk_document(self, document: Dict[str, Any]) -> List[Chunk]:
         """
         Splits a document into smaller chunks.
 
@@ -11,9 +66,28 @@ class ChunkingStrategy(ABC):
             document (Dict[str, Any]): The document to be chunked.
 
         Returns:
-            List[Dict[str, Any]]: A list of document chunks.
+            List[Chunk]: The document's chunks, each referring to the document by page id and
+            with a stable chunk id (see `make_chunk_id`).
         """
         if not isinstance(document, dict):
             raise TypeError("document must be a dictionary")
         if "page_content" not in document or not isinstance(document["page_content"], str):
-            raise ValueError("document must contain a 'page_content' key with a string value")
\ No newline at end of file
+            raise ValueError("document must contain a 'page_content' key with a string value")
+
+    def chunk_documents(self, documents: Iterable[Dict[str, Any]], ordered: Optional[bool] = None) -> Iterator[List[Chunk]]:
+        """
+        Splits a stream of documents, yielding the chunks of each document as it is done.
+
+        Strategies that can split documents in parallel override this; the default splits
+        them one at a time, in order.
+
+        Args:
+            documents (Iterable[Dict[str, Any]]): The documents to be chunked, consumed lazily.
+            ordered (bool): Whether results must follow the input order. None uses the
+                strategy's configured default; unordered results are yielded as soon as they are ready.
+
+        Returns:
+            Iterator[List[Chunk]]: The chunks of each document, one list per document.
+        """
+        for document in documents:
+            yield self.chunk_document(document)
@@ -1,12 +1,137 @@
+import threading
 import yaml
 import os
-import boto3
-from botocore.exceptions import NoCredentialsError
+from dataclasses import dataclass
+from functools import cached_property
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
 from dotenv import load_dotenv
+from app.core.secret_cache import SecretCache, parse_secret
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Parsed secrets from Secrets Manager, shared by every Config of the process
+_secret_cache = SecretCache()
+
+
+def _freeze(value: Any) -> Any:
+    """Makes nested config values read-only: mappings become mapping proxies and lists become tuples."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _optional_int(value: Any) -> Optional[int]:
+    return None if value is None or value == "" else int(value)
+
+
+def _optional_bool(value: Any) -> Optional[bool]:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return None if value is None else bool(value)
+
+
+class ConfigSection:
+    """
+    Base of the frozen config sections returned by the `Config.get_*_config` methods.
+
+    Fields are read as attributes; `get` and item access keep mapping-style callers working.
+    """
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+
+@dataclass(frozen=True)
+class DatabaseConfig(ConfigSection):
+    host: Optional[str]
+    port: Optional[int]
+    dbname: Optional[str]
+    user: Optional[str]
+    password: Optional[str]
+    collection_name: Optional[str]
+    assumed_role_arn: Optional[str]
+    write_mode: Optional[str]
+    index: Mapping[str, Any]
+    pool: Mapping[str, Any]
+    retrieval: Mapping[str, Any]
+    metadata_indexes: Mapping[str, Any]
+
+
+@dataclass(frozen=True)
+class EmbeddingsConfig(ConfigSection):
+    model_id: Optional[str]
+    assumed_role_arn: Optional[str]
+    max_concurrency: int
+    requests_per_second: float
+    tokens_per_minute: float
+    max_retries: int
+
+
+@dataclass(frozen=True)
+class LLMConfig(ConfigSection):
+    model_id: Optional[str]
+    model_kwargs: Mapping[str, Any]
+    assumed_role_arn: Optional[str]
+
+
+@dataclass(frozen=True)
+class QueryConfig(ConfigSection):
+    max_concurrency: int
+    llm_concurrency: int
+
+
+@dataclass(frozen=True)
+class AWSConfig(ConfigSection):
+    max_pool_connections: int
+    retries_mode: str
+    max_attempts: int
+    connect_timeout: float
+    read_timeout: float
+    tcp_keepalive: bool
+    role_session_duration: int
+
+
+@dataclass(frozen=True)
+class VectorStoreConfig(ConfigSection):
+    backend: str
+    local: Mapping[str, Any]
+
+
+@dataclass(frozen=True)
+class ConfluenceConfig(ConfigSection):
+    url: Optional[str]
+    username: Optional[str]
+    api_key: Optional[str]
+    space_key: Optional[str]
+    max_pages: Optional[int]
+    include_attachments: Optional[bool]
+    limit: Optional[int]
+    continue_on_failure: Optional[bool]
+    include_restricted_content: Optional[bool]
+    prefetch: Optional[int]
+    spaces: Optional[Tuple[str, ...]]
+    cql_queries: Optional[Tuple[str, ...]]
+    crawler_workers: Optional[int]
+    max_retries: Optional[int]
+
+
+@dataclass(frozen=True)
+class TelemetryConfig(ConfigSection):
+    exporters: Tuple[str, ...]
+    service_name: str
+    prometheus: Mapping[str, Any]
+    otel: Mapping[str, Any]
+
 
 class Config:
     def __init__(self, config_path="config/config.yaml"):
@@ -16,12 +141,30 @@ class Config:
 
         self.aws_profile = self.get("AWS_PROFILE")
         self.aws_region = self.get("AWS_REGION")
-        self.session = self._create_session()
-        self.secret_manager = self.get_client("secretsmanager")
+        secrets_config = self.config.get("secrets") or {}
+        self.secret_ttl_seconds = float(self.get("SECRETS_TTL_SECONDS", secrets_config.get("ttl_seconds", 3600)))
+        self.batch_secrets = secrets_config.get("batch", True)
+        # Memoized get_*_config sections with the versions of the secrets they were resolved from
+        self._sections: Dict[str, Tuple[ConfigSection, Dict[str, Optional[int]]]] = {}
+        self._sections_lock = threading.RLock()
+        self._resolving = threading.local()
+
+    @cached_property
+    def session(self):
+        """The boto3 session, created on first use so runs that read no secrets never import boto3."""
+        return self._create_session()
+
+    @cached_property
+    def secret_manager(self):
+        """The Secrets Manager client, created on the first secret not found in the environment."""
+        return self.get_client("secretsmanager")
 
     def _create_session(self):
         """Creates a boto3 session, prioritizing named profiles for local development
         and falling back to IAM roles for AWS environments."""
+        import boto3
+        from botocore.exceptions import NoCredentialsError
+
         try:
             if self.aws_profile:
                 # Use named profile for local development
@@ -67,6 +210,9 @@ class Config:
         """
         Retrieves a secret from AWS Secrets Manager.
 
+        Secrets are parsed once and cached process-wide for `secrets.ttl_seconds`. The first
+        lookup fetches every secret named in config.yaml in one `BatchGetSecretValue` call.
+
         Args:
             secret_name (str): The name of the secret in Secrets Manager.
             key (str, optional): A specific key within the secret to retrieve.
@@ -81,91 +227,207 @@ class Config:
 
             if secret_value:
                 if key:
-                    try:
-                        # Attempt to parse as JSON if a key is specified
-                        import json
-
-                        secret_dict = json.loads(secret_value)
-                        return secret_dict.get(key)
-                    except json.JSONDecodeError:
-                        logger.warning(
-                            f"Could not parse environment variable {env_secret_name} as JSON for key {key}. Returning raw value."
-                        )
-                        return secret_value
-                else:
-                    return secret_value
+                    # Attempt to parse as JSON if a key is specified
+                    secret = parse_secret(secret_value)
+                    if isinstance(secret, dict):
+                        return secret.get(key)
+                    logger.warning(
+                        f"Could not parse environment variable {env_secret_name} as JSON for key {key}. Returning raw value."
+                    )
+                return secret_value
 
             # If not found in environment, try Secrets Manager
-            get_secret_value_response = self.secret_manager.get_secret_value(
-                SecretId=secret_name
-            )
-
-            if "SecretString" in get_secret_value_response:
-                secret = get_secret_value_response["SecretString"]
-                if key:
-                    import json
-
-                    secret_dict = json.loads(secret)
-                    return secret_dict.get(key)
-                else:
-                    return secret
-            else:
-                logger.error(f"Secret {secret_name} is not a string.")
-                return None
+            self._record_secret_read(secret_name)
+            prefetch = self._configured_secret_names() if self.batch_secrets else ()
+            if not key:
+                return _secret_cache.get(self.secret_manager, secret_name, self.secret_ttl_seconds, prefetch, raw=True)
+            secret = _secret_cache.get(self.secret_manager, secret_name, self.secret_ttl_seconds, prefetch)
+            return secret.get(key) if isinstance(secret, dict) else None
 
         except Exception as e:
             logger.error(f"Error retrieving secret {secret_name}: {e}")
             return None
 
-    def get_database_config(self):
+    def refresh_secret(self, secret_name: Optional[str] = None):
+        """
+        Drops a cached secret, or all of them, e.g. after a credential was rejected following a rotation.
+
+        Config sections resolved from it are rebuilt on their next `get_*_config` call.
+        """
+        _secret_cache.invalidate(secret_name)
+
+    def _configured_secret_names(self) -> List[str]:
+        """The `secret_name` of every config section, except those supplied through the environment."""
+        names = []
+        for section in self.config.values():
+            name = section.get("secret_name") if isinstance(section, dict) else None
+            if name and not os.environ.get(name.upper().replace("-", "_")):
+                names.append(name)
+        return names
+
+    def _record_secret_read(self, secret_name: str):
+        reads = getattr(self._resolving, "secrets", None)
+        if reads is not None:
+            reads.append(secret_name)
+
+    def _section(self, name: str, build: Callable[[], ConfigSection]) -> ConfigSection:
+        """
+        Returns a memoized config section, building it on first use.
+
+        A section is rebuilt once a secret it was resolved from expires or changes, so rotated
+        credentials are picked up without re-reading the environment and YAML on every call.
+        """
+        with self._sections_lock:
+            memoized = self._sections.get(name)
+            if memoized is not None:
+                section, secret_versions = memoized
+                if all(_secret_cache.version(secret) == version for secret, version in secret_versions.items()):
+                    return section
+            self._resolving.secrets = []
+            try:
+                section = build()
+                secret_versions = {secret: _secret_cache.version(secret) for secret in self._resolving.secrets}
+            finally:
+                self._resolving.secrets = None
+            if memoized is not None and memoized[1] == secret_versions:
+                # The secrets were refetched unchanged, or their refresh failed and the last good values are served
+                return memoized[0]
+            # Sections built while a secret could not be fetched are not memoized, so the next call retries it
+            if None not in secret_versions.values():
+                self._sections[name] = (section, secret_versions)
+            return section
+
+    def get_database_config(self) -> DatabaseConfig:
+        return self._section("database", self._build_database_config)
+
+    def _build_database_config(self) -> DatabaseConfig:
         db_config = self.config.get("database", {})
-        return {
-            "host": self.get("DATABASE_HOST", db_config.get("host")),
-            "port": self.get("DATABASE_PORT", db_config.get("port")),
-            "dbname": self.get("DATABASE_DBNAME", db_config.get("dbname")),
-            "user": self.get("DATABASE_USER", db_config.get("user")),
-            "password": self.get_secret(db_config.get("secret_name"), "password")
-                        or self.get("DATABASE_PASSWORD"),  # Check secret manager first, then env
-            "collection_name": self.get(
-                "DATABASE_COLLECTION_NAME", db_config.get("collection_name")
-            ),
-            "assumed_role_arn": db_config.get("assumed_role_arn"),
-        }
+        return DatabaseConfig(
+            host=self.get("DATABASE_HOST", db_config.get("host")),
+            port=_optional_int(self.get("DATABASE_PORT", db_config.get("port"))),
+            dbname=self.get("DATABASE_DBNAME", db_config.get("dbname")),
+            user=self.get("DATABASE_USER", db_config.get("user")),
+            password=self.get_secret(db_config.get("secret_name"), "password")
+                     or self.get("DATABASE_PASSWORD"),  # Check secret manager first, then env
+            collection_name=self.get("DATABASE_COLLECTION_NAME", db_config.get("collection_name")),
+            assumed_role_arn=db_config.get("assumed_role_arn"),
+            write_mode=self.get("DATABASE_WRITE_MODE", db_config.get("write_mode")),
+            index=_freeze(db_config.get("index") or {}),
+            pool=_freeze(db_config.get("pool") or {}),
+            retrieval=_freeze(db_config.get("retrieval") or {}),
+            metadata_indexes=_freeze(db_config.get("metadata_indexes") or {}),
+        )
 
-    def get_embeddings_config(self):
+    def get_embeddings_config(self) -> EmbeddingsConfig:
+        return self._section("embeddings", self._build_embeddings_config)
+
+    def _build_embeddings_config(self) -> EmbeddingsConfig:
         embeddings_config = self.config.get("embeddings", {})
-        return {
-            "model_id": self.get("EMBEDDINGS_MODEL_ID", embeddings_config.get("model_id")),
-            "assumed_role_arn": embeddings_config.get("assumed_role_arn")
-        }
-
-    def get_llm_config(self):
-        llm_config = self.config.get("llm",{})
-        return {
-            "model_id": self.get("LLM_MODEL_ID", llm_config.get("model_id")),
-            "model_kwargs": llm_config.get("model_kwargs",{}),
-            "assumed_role_arn": llm_config.get("assumed_role_arn")
-        }
-
-    def get_confluence_config(self):
+        return EmbeddingsConfig(
+            model_id=self.get("EMBEDDINGS_MODEL_ID", embeddings_config.get("model_id")),
+            assumed_role_arn=embeddings_config.get("assumed_role_arn"),
+            max_concurrency=int(self.get("EMBEDDINGS_MAX_CONCURRENCY", embeddings_config.get("max_concurrency", 8))),
+            requests_per_second=float(
+                self.get("EMBEDDINGS_REQUESTS_PER_SECOND", embeddings_config.get("requests_per_second", 30))
+            ),
+            tokens_per_minute=float(
+                self.get("EMBEDDINGS_TOKENS_PER_MINUTE", embeddings_config.get("tokens_per_minute", 300000))
+            ),
+            max_retries=int(embeddings_config.get("max_retries", 8)),
+        )
+
+    def get_llm_config(self) -> LLMConfig:
+        return self._section("llm", self._build_llm_config)
+
+    def _build_llm_config(self) -> LLMConfig:
+        llm_config = self.config.get("llm", {})
+        return LLMConfig(
+            model_id=self.get("LLM_MODEL_ID", llm_config.get("model_id")),
+            model_kwargs=_freeze(llm_config.get("model_kwargs", {})),
+            assumed_role_arn=llm_config.get("assumed_role_arn"),
+        )
+
+    def get_query_config(self) -> QueryConfig:
+        return self._section("query", self._build_query_config)
+
+    def _build_query_config(self) -> QueryConfig:
+        query_config = self.config.get("query", {})
+        return QueryConfig(
+            max_concurrency=int(self.get("QUERY_MAX_CONCURRENCY", query_config.get("max_concurrency", 8))),
+            llm_concurrency=int(self.get("QUERY_LLM_CONCURRENCY", query_config.get("llm_concurrency", 4))),
+        )
+
+    def get_aws_config(self) -> AWSConfig:
+        return self._section("aws", self._build_aws_config)
+
+    def _build_aws_config(self) -> AWSConfig:
+        aws_config = self.config.get("aws", {})
+        return AWSConfig(
+            max_pool_connections=int(self.get("AWS_MAX_POOL_CONNECTIONS", aws_config.get("max_pool_connections", 50))),
+            retries_mode=self.get("AWS_RETRIES_MODE", aws_config.get("retries_mode", "standard")),
+            max_attempts=int(self.get("AWS_MAX_ATTEMPTS", aws_config.get("max_attempts", 3))),
+            connect_timeout=aws_config.get("connect_timeout", 5),
+            read_timeout=aws_config.get("read_timeout", 60),
+            tcp_keepalive=aws_config.get("tcp_keepalive", True),
+            role_session_duration=int(aws_config.get("role_session_duration", 3600)),
+        )
+
+    def get_vector_store_config(self) -> VectorStoreConfig:
+        return self._section("vector_store", self._build_vector_store_config)
+
+    def _build_vector_store_config(self) -> VectorStoreConfig:
+        store_config = self.config.get("vector_store", {})
+        return VectorStoreConfig(
+            backend=self.get("VECTOR_STORE_BACKEND", store_config.get("backend", "pgvector")),
+            local=_freeze(store_config.get("local") or {}),
+        )
+
+    def get_confluence_config(self) -> ConfluenceConfig:
+        return self._section("confluence", self._build_confluence_config)
+
+    def _build_confluence_config(self) -> ConfluenceConfig:
         confluence_config = self.config.get("confluence", {})
-        return {
-            "url": self.get("CONFLUENCE_URL", confluence_config.get("url")),
-            "username": self.get_secret(confluence_config.get("secret_name"), "username")
-                        or self.get(
-                "CONFLUENCE_USERNAME"
-            ),  # Check secret manager, then .env
-            "api_key": self.get_secret(confluence_config.get("secret_name"), "api_key")
-                       or self.get("CONFLUENCE_API_KEY"),  # Check secret manager, then .env
-            "space_key": self.get("CONFLUENCE_SPACE_KEY", confluence_config.get("space_key")),
-            "max_pages": self.get("CONFLUENCE_MAX_PAGES", confluence_config.get("max_pages")),
-            "include_attachments": self.get(
+        return ConfluenceConfig(
+            url=self.get("CONFLUENCE_URL", confluence_config.get("url")),
+            username=self.get_secret(confluence_config.get("secret_name"), "username")
+                     or self.get("CONFLUENCE_USERNAME"),  # Check secret manager, then .env
+            api_key=self.get_secret(confluence_config.get("secret_name"), "api_key")
+                    or self.get("CONFLUENCE_API_KEY"),  # Check secret manager, then .env
+            space_key=self.get("CONFLUENCE_SPACE_KEY", confluence_config.get("space_key")),
+            max_pages=_optional_int(self.get("CONFLUENCE_MAX_PAGES", confluence_config.get("max_pages"))),
+            include_attachments=_optional_bool(self.get(
                 "CONFLUENCE_INCLUDE_ATTACHMENTS",
                 confluence_config.get("include_attachments"),
-            ),
-            "limit": self.get("CONFLUENCE_LIMIT", confluence_config.get("limit")),
-            "continue_on_failure": self.get(
+            )),
+            limit=_optional_int(self.get("CONFLUENCE_LIMIT", confluence_config.get("limit"))),
+            continue_on_failure=_optional_bool(self.get(
                 "CONFLUENCE_CONTINUE_ON_FAILURE",
                 confluence_config.get("continue_on_failure"),
+            )),
+            include_restricted_content=_optional_bool(self.get(
+                "CONFLUENCE_INCLUDE_RESTRICTED_CONTENT",
+                confluence_config.get("include_restricted_content"),
+            )),
+            prefetch=_optional_int(self.get("CONFLUENCE_PREFETCH", confluence_config.get("prefetch"))),
+            spaces=_freeze(confluence_config.get("spaces")),
+            cql_queries=_freeze(confluence_config.get("cql_queries")),
+            crawler_workers=_optional_int(
+                self.get("CONFLUENCE_CRAWLER_WORKERS", confluence_config.get("crawler_workers"))
             ),
-        }
\ No newline at end of file
+            max_retries=_optional_int(self.get("CONFLUENCE_MAX_RETRIES", confluence_config.get("max_retries"))),
+        )
+
+    def get_telemetry_config(self) -> TelemetryConfig:
+        return self._section("telemetry", self._build_telemetry_config)
+
+    def _build_telemetry_config(self) -> TelemetryConfig:
+        telemetry_config = self.config.get("telemetry", {})
+        exporters = self.get("TELEMETRY_EXPORTERS", telemetry_config.get("exporters") or [])
+        if isinstance(exporters, str):
+            exporters = [name.strip() for name in exporters.split(",") if name.strip()]
+        return TelemetryConfig(
+            exporters=tuple(exporters),
+            service_name=self.get("TELEMETRY_SERVICE_NAME", telemetry_config.get("service_name", "confluence-rag")),
+            prometheus=_freeze(telemetry_config.get("prometheus") or {}),
+            otel=_freeze(telemetry_config.get("otel") or {}),
+        )
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator
 
 class DocumentLoader(ABC):
     @abstractmethod
@@ -9,4 +9,34 @@ class DocumentLoader(ABC):
         Returns:
             List[Dict[str, Any]]: List of documents (each document is a dictionary with text and metadata).
         """
-        pass
\ No newline at end of file
+        pass
+
+    def iter_pages(self, **kwargs) -> Iterator[Dict[str, Any]]:
+        """Streams documents from the source one at a time.
+
+        Loaders that can page through their source lazily should override this; the default
+        falls back to `load`.
+
+        Yields:
+            Dict[str, Any]: Documents with "page_content" and "metadata" keys.
+        """
+        yield from self.load(**kwargs)
+
+    def list_page_versions(self) -> Dict[str, Dict[str, Any]]:
+        """Lists the pages currently in the source without fetching their content.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Mapping of page id to a dictionary with its "version" and "last_modified".
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support incremental ingestion")
+
+    def load_pages(self, page_ids: List[str]) -> List[Dict[str, Any]]:
+        """Loads specific pages by id.
+
+        Args:
+            page_ids (List[str]): Ids of the pages to load.
+
+        Returns:
+            List[Dict[str, Any]]: List of documents for the requested pages.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support incremental ingestion")
@@ -0,0 +1,61 @@
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List
+
+
+class EmbeddingCache(ABC):
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_id: str, text: str) -> str:
+        """Builds the content address of a text for a given embedding model.
+
+        Whitespace is collapsed so that chunks differing only in formatting share an entry.
+
+        Args:
+            model_id (str): The embedding model id.
+            text (str): The text to embed.
+
+        Returns:
+            str: The hex digest identifying the (model, text) pair.
+        """
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{model_id}\0{normalized}".encode()).hexdigest()
+
+    @abstractmethod
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Looks up cached embeddings.
+
+        Args:
+            keys (List[str]): Cache keys built with `make_key`.
+
+        Returns:
+            Dict[str, List[float]]: The embeddings found, keyed by cache key. Missing keys are omitted.
+        """
+        if not isinstance(keys, list):
+            raise TypeError("keys must be a list of strings")
+
+    @abstractmethod
+    def put_many(self, entries: Dict[str, List[float]]) -> None:
+        """Stores embeddings, evicting the least recently used entries beyond the size bound.
+
+        Args:
+            entries (Dict[str, List[float]]): Embeddings keyed by cache key.
+        """
+        if not isinstance(entries, dict):
+            raise TypeError("entries must be a dictionary")
+
+    def record(self, hits: int, misses: int) -> None:
+        """Adds to the hit and miss counters."""
+        with self._stats_lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the hit and miss counters."""
+        with self._stats_lock:
+            return {"hits": self.hits, "misses": self.misses}
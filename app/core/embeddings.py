@@ -28,4 +28,17 @@ class Embeddings(ABC):
             List[float]: The embedding of the query.
         """
         if not isinstance(text, str):
-            raise TypeError("text must be a string")
\ No newline at end of file
+            raise TypeError("text must be a string")
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embeds several query strings. Implementations may send them in a single request.
+
+        Args:
+            texts (List[str]): The query strings.
+
+        Returns:
+            List[List[float]]: The embeddings, in the order of the queries.
+        """
+        if not isinstance(texts, list):
+            raise TypeError("texts must be a list of strings")
+        return [self.embed_query(text) for text in texts]
@@ -0,0 +1,150 @@
+import datetime
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple, Union
+
+class MetadataFilter(ABC):
+    """
+    A typed predicate on chunk metadata.
+
+    Filters combine with `&`. Stores compile them to their own query language (see
+    `app.modules.pg_filters`); `matches` is the reference semantics, evaluated in Python.
+    """
+
+    @abstractmethod
+    def matches(self, metadata: Dict[str, Any]) -> bool:
+        """Returns True if a chunk with the given metadata passes the filter."""
+        pass
+
+    def __and__(self, other: "MetadataFilter") -> "And":
+        return And((self, other))
+
+def _comparable(value: Any) -> Any:
+    """Dates are stored as ISO-8601 strings, which order the same way as the dates themselves."""
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+@dataclass(frozen=True)
+class Eq(MetadataFilter):
+    """The field equals `value`, or contains it if the field is a list (e.g. labels, ancestors)."""
+
+    field: str
+    value: Any
+
+    def matches(self, metadata: Dict[str, Any]) -> bool:
+        stored = metadata.get(self.field)
+        if isinstance(stored, list):
+            return self.value in stored
+        return stored == self.value
+
+@dataclass(frozen=True)
+class In(MetadataFilter):
+    """The field equals, or contains, any of `values`."""
+
+    field: str
+    values: Tuple[Any, ...]
+
+    def __post_init__(self):
+        object.__setattr__(self, "values", tuple(self.values))
+
+    def matches(self, metadata: Dict[str, Any]) -> bool:
+        return any(Eq(self.field, value).matches(metadata) for value in self.values)
+
+@dataclass(frozen=True)
+class Range(MetadataFilter):
+    """
+    The field lies within the given bounds; omitted bounds are open.
+
+    Numbers compare numerically and everything else as text, so date bounds match the
+    ISO-8601 timestamps Confluence returns, e.g. `Range("last_modified", gte=date(2024, 1, 1))`.
+    """
+
+    field: str
+    gte: Any = None
+    gt: Any = None
+    lte: Any = None
+    lt: Any = None
+
+    def __post_init__(self):
+        if all(bound is None for bound in (self.gte, self.gt, self.lte, self.lt)):
+            raise ValueError("Range needs at least one bound")
+
+    @property
+    def numeric(self) -> bool:
+        return all(
+            isinstance(bound, (int, float)) and not isinstance(bound, bool)
+            for bound in (self.gte, self.gt, self.lte, self.lt) if bound is not None
+        )
+
+    def bounds(self) -> Dict[str, Any]:
+        """Returns the set bounds by operator name, with dates converted to their stored form."""
+        return {
+            name: _comparable(bound)
+            for name, bound in (("gte", self.gte), ("gt", self.gt), ("lte", self.lte), ("lt", self.lt))
+            if bound is not None
+        }
+
+    def matches(self, metadata: Dict[str, Any]) -> bool:
+        stored = metadata.get(self.field)
+        if stored is None:
+            return False
+        try:
+            stored = float(stored) if self.numeric else str(stored)
+        except (TypeError, ValueError):
+            return False
+        checks = {
+            "gte": lambda bound: stored >= bound,
+            "gt": lambda bound: stored > bound,
+            "lte": lambda bound: stored <= bound,
+            "lt": lambda bound: stored < bound,
+        }
+        return all(checks[name](bound) for name, bound in self.bounds().items())
+
+@dataclass(frozen=True)
+class Exists(MetadataFilter):
+    """The field is present in the metadata."""
+
+    field: str
+
+    def matches(self, metadata: Dict[str, Any]) -> bool:
+        return self.field in metadata
+
+@dataclass(frozen=True)
+class And(MetadataFilter):
+    """All of `filters` pass."""
+
+    filters: Tuple[MetadataFilter, ...]
+
+    def __post_init__(self):
+        object.__setattr__(self, "filters", tuple(self.filters))
+
+    def matches(self, metadata: Dict[str, Any]) -> bool:
+        return all(f.matches(metadata) for f in self.filters)
+
+    def __and__(self, other: MetadataFilter) -> "And":
+        return And(self.filters + (other,))
+
+FilterLike = Union[MetadataFilter, Dict[str, Any], None]
+
+def as_filter(filters: FilterLike) -> Optional[MetadataFilter]:
+    """
+    Normalizes the accepted filter forms into a MetadataFilter.
+
+    Args:
+        filters: A MetadataFilter, a `{field: value or list of values}` shorthand for Eq/In, or None.
+
+    Returns:
+        Optional[MetadataFilter]: The filter, or None if nothing is filtered.
+    """
+    if filters is None or isinstance(filters, MetadataFilter):
+        return filters
+    if not isinstance(filters, dict):
+        raise TypeError("filters must be a MetadataFilter or a dictionary")
+    parts = [
+        In(field, tuple(value)) if isinstance(value, (list, tuple, set)) else Eq(field, value)
+        for field, value in filters.items()
+    ]
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else And(tuple(parts))
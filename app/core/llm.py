@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Iterator
 
 class LLM(ABC):
     @abstractmethod
@@ -15,4 +15,19 @@ class LLM(ABC):
             str: The generated text.
         """
         if not isinstance(prompt, str):
-            raise TypeError("prompt must be a string")
\ No newline at end of file
+            raise TypeError("prompt must be a string")
+
+    def stream_text(self, prompt: str, **kwargs: Any) -> Iterator[str]:
+        """
+        Generates text based on a given prompt, yielding it in pieces as it is produced.
+
+        Implementations without a streaming API yield the whole completion at once.
+
+        Args:
+            prompt (str): The input prompt for text generation.
+            **kwargs: Additional keyword arguments for customization.
+
+        Yields:
+            str: The next piece of generated text.
+        """
+        yield self.generate_text(prompt, **kwargs)
@@ -0,0 +1,80 @@
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+
+class ResponseCache(ABC):
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query: str) -> str:
+        """Builds the cache key of a query.
+
+        Case and whitespace are normalized so that trivially different spellings share an entry.
+
+        Args:
+            query (str): The user's query.
+
+        Returns:
+            str: The hex digest identifying the query.
+        """
+        normalized = " ".join(query.split()).casefold()
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Looks up a cached response.
+
+        Args:
+            key (str): A cache key built with `make_key`.
+
+        Returns:
+            Optional[str]: The response, or None if it is missing or expired.
+        """
+        if not isinstance(key, str):
+            raise TypeError("key must be a string")
+
+    @abstractmethod
+    def put(self, key: str, response: str) -> None:
+        """Stores a response, evicting entries beyond the size bound.
+
+        Args:
+            key (str): A cache key built with `make_key`.
+            response (str): The generated response.
+        """
+        if not isinstance(key, str):
+            raise TypeError("key must be a string")
+        if not isinstance(response, str):
+            raise TypeError("response must be a string")
+
+    @abstractmethod
+    def invalidate(self) -> None:
+        """Drops every cached response, e.g. after an ingestion run changed the corpus."""
+
+    def generation(self) -> Optional[int]:
+        """Returns the invalidation generation of a cache shared between instances.
+
+        Shared caches bump it on every `invalidate`, so instances can tell that their in-process
+        tiers hold responses from before an ingestion run elsewhere.
+
+        Returns:
+            Optional[int]: The generation, or None for an in-process cache.
+        """
+        return None
+
+    def record(self, hit: bool) -> None:
+        """Counts a lookup as a hit or a miss."""
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the hit and miss counters."""
+        with self._stats_lock:
+            return {"hits": self.hits, "misses": self.misses}
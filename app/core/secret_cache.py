@@ -0,0 +1,179 @@
+import json
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# BatchGetSecretValue accepts at most this many secret ids per call
+BATCH_SIZE = 20
+# After a failed refresh the expired value is served for this long, doubling per consecutive failure
+RETRY_SECONDS = 5.0
+MAX_RETRY_SECONDS = 300.0
+
+
+def parse_secret(secret_string: str) -> Any:
+    """Parses a secret string once: JSON objects become dicts, anything else stays a string."""
+    try:
+        value = json.loads(secret_string)
+    except json.JSONDecodeError:
+        return secret_string
+    return value if isinstance(value, dict) else secret_string
+
+
+class SecretEntry(NamedTuple):
+    expires_at: float
+    secret_string: Optional[str]
+    value: Any
+    version: int
+
+
+class SecretCache:
+    """
+    A thread-safe TTL cache of parsed Secrets Manager secrets, shared by the whole process.
+
+    Each secret is fetched and parsed once per TTL. Misses fetch every other stale secret the
+    caller expects to need in the same `BatchGetSecretValue` call, falling back to
+    `GetSecretValue` where the batch call is not permitted. Fetches run outside the cache's
+    lock, so lookups of other secrets are not held up by a slow refresh; a thread that needs a
+    secret another thread is already fetching waits for that fetch instead of repeating it.
+    Every stored value has a version that changes when the secret is refetched with a different
+    value (e.g. after a rotation) or invalidated, so holders of values derived from it can tell
+    when to rebuild them. When a refresh fails, the expired value and its version keep being
+    served, and the refresh is retried with exponential backoff rather than on every lookup.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._entries: Dict[str, SecretEntry] = {}
+        self._versions = 0
+        self._failures: Dict[str, int] = {}  # name -> consecutive failed refreshes
+        self._pending: Dict[str, threading.Event] = {}  # name -> set when its in-flight fetch ends
+        self._lock = threading.Lock()
+
+    def get(self, client, secret_name: str, ttl_seconds: float, prefetch: Iterable[str] = (),
+            raw: bool = False) -> Any:
+        """
+        Returns the parsed secret, fetching it if it is missing or expired.
+
+        Args:
+            client: The Secrets Manager client.
+            secret_name (str): The secret to return.
+            ttl_seconds (float): How long a fetched secret is served before it is fetched again.
+            prefetch (Iterable[str]): Other secrets to fetch in the same batch if they are stale.
+            raw (bool): Returns the secret string as stored instead of the parsed value.
+
+        Returns:
+            Any: The secret as a dict if it is a JSON object, else the secret string; None for binary secrets.
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(secret_name)
+                if entry is not None and entry.expires_at > self.clock():
+                    return entry.secret_string if raw else entry.value
+                pending = self._pending.get(secret_name)
+                if pending is None:
+                    names = [secret_name] + [
+                        name for name in dict.fromkeys(prefetch)
+                        if name != secret_name and not self._is_fresh(name) and name not in self._pending
+                    ]
+                    pending = threading.Event()
+                    self._pending.update(dict.fromkeys(names, pending))
+                    break
+            # Another thread is fetching this secret; use its result, or retry if it failed
+            pending.wait()
+
+        try:
+            fetched = self._fetch(client, names)
+        except Exception:
+            with self._lock:
+                entry = self._entries.get(secret_name)
+                if entry is None:
+                    raise
+                failures = self._failures.get(secret_name, 0) + 1
+                self._failures[secret_name] = failures
+                retry_seconds = min(MAX_RETRY_SECONDS, RETRY_SECONDS * 2 ** (failures - 1))
+                # Until the retry, the old value counts as fresh: lookups and memoized sections skip the fetch
+                self._entries[secret_name] = entry._replace(expires_at=self.clock() + retry_seconds)
+            logger.warning(
+                f"Could not refresh secret {secret_name}, serving the expired value for {retry_seconds:.0f}s",
+                exc_info=True,
+            )
+            return entry.secret_string if raw else entry.value
+        else:
+            with self._lock:
+                expires_at = self.clock() + ttl_seconds
+                for name, secret_string in fetched.items():
+                    self._store(name, secret_string, expires_at)
+                    self._failures.pop(name, None)
+                entry = self._entries[secret_name]
+            return entry.secret_string if raw else entry.value
+        finally:
+            with self._lock:
+                for name in names:
+                    if self._pending.get(name) is pending:
+                        del self._pending[name]
+            pending.set()
+
+    def version(self, secret_name: str) -> Optional[int]:
+        """Returns the version of a fresh cached secret, or None if it is missing or due for a refresh."""
+        with self._lock:
+            entry = self._entries.get(secret_name)
+            return entry.version if entry is not None and entry.expires_at > self.clock() else None
+
+    def invalidate(self, secret_name: Optional[str] = None):
+        """Drops one secret, or all of them, so the next lookup fetches it again."""
+        with self._lock:
+            if secret_name is None:
+                self._entries.clear()
+                self._failures.clear()
+            else:
+                self._entries.pop(secret_name, None)
+                self._failures.pop(secret_name, None)
+
+    def _is_fresh(self, secret_name: str) -> bool:
+        entry = self._entries.get(secret_name)
+        return entry is not None and entry.expires_at > self.clock()
+
+    def _store(self, secret_name: str, secret_string: Optional[str], expires_at: float):
+        previous = self._entries.get(secret_name)
+        if previous is not None and previous.secret_string == secret_string:
+            version, value = previous.version, previous.value
+        else:
+            self._versions += 1
+            version = self._versions
+            value = parse_secret(secret_string) if secret_string is not None else None
+        self._entries[secret_name] = SecretEntry(expires_at, secret_string, value, version)
+
+    def _fetch(self, client, names: List[str]) -> Dict[str, Optional[str]]:
+        """Fetches the secret strings of `names` (None for binary secrets); raises only if the first one fails."""
+        fetched: Dict[str, Optional[str]] = {}
+        if len(names) > 1:
+            try:
+                for start in range(0, len(names), BATCH_SIZE):
+                    response = client.batch_get_secret_value(SecretIdList=names[start:start + BATCH_SIZE])
+                    for secret in response.get("SecretValues", []):
+                        # Secrets are returned under their name even when requested by ARN
+                        requested = secret["Name"] if secret["Name"] in names else secret["ARN"]
+                        fetched[requested] = self._secret_string(requested, secret)
+            except Exception as e:
+                logger.info(f"BatchGetSecretValue unavailable ({e}), fetching secrets one at a time")
+        # Secrets the batch did not return, including the requested one, are fetched individually
+        for name in names:
+            if name not in fetched:
+                try:
+                    fetched[name] = self._secret_string(name, client.get_secret_value(SecretId=name))
+                except Exception:
+                    if name == names[0]:
+                        raise
+                    logger.warning(f"Could not prefetch secret {name}", exc_info=True)
+        return fetched
+
+    @staticmethod
+    def _secret_string(secret_name: str, response: Dict[str, Any]) -> Optional[str]:
+        if "SecretString" not in response:
+            logger.error(f"Secret {secret_name} is not a string.")
+            return None
+        return response["SecretString"]
@@ -1,14 +1,18 @@
 from abc import ABC, abstractmethod
 from typing import List, Tuple, Dict, Any
+from app.core.filters import FilterLike, MetadataFilter
 
 class VectorStore(ABC):
     @abstractmethod
-    def add_texts(self, texts: List[str], metadatas: List[Dict[str, Any]] = None) -> None:
+    def add_texts(self, texts: List[str], metadatas: List[Dict[str, Any]] = None, ids: List[str] = None) -> None:
         """Adds text and metadata to the VectorStore.
 
+        Adding a text under an id that is already stored is a no-op, so re-running ingestion is idempotent.
+
         Args:
             texts (List[str]): List of texts to add.
             metadatas (List[Dict[str, Any]], optional): List of metadata dictionaries. Defaults to None.
+            ids (List[str], optional): Stable chunk ids (see `make_chunk_id`). Defaults to None.
         """
         if not isinstance(texts, list):
             raise TypeError("texts must be a list of strings")
@@ -18,14 +22,18 @@ class VectorStore(ABC):
             raise TypeError("metadatas must be a list of dictionaries")
         if metadatas is not None and not all(isinstance(m, dict) for m in metadatas):
             raise TypeError("metadatas must be a list of dictionaries")
+        if ids is not None and len(ids) != len(texts):
+            raise ValueError("ids must have the same length as texts")
 
     @abstractmethod
-    def similarity_search(self, query: str, k: int = 4) -> List[Tuple[str, float]]:
+    def similarity_search(self, query: str, k: int = 4, filters: FilterLike = None) -> List[Tuple[str, float]]:
         """Performs a similarity search with a query.
 
         Args:
             query (str): The query string.
             k (int, optional): Number of results to return. Defaults to 4.
+            filters (FilterLike, optional): Restricts the results to chunks whose metadata passes the filter,
+                e.g. `Eq("space", "OPS") & Range("last_modified", gte="2024-01-01")`. Defaults to None.
 
         Returns:
             List[Tuple[str, float]]: List of (text, score) tuples.
@@ -33,4 +41,39 @@ class VectorStore(ABC):
         if not isinstance(query, str):
             raise TypeError("query must be a string")
         if not isinstance(k, int):
-            raise TypeError("k must be an integer")
\ No newline at end of file
+            raise TypeError("k must be an integer")
+        if filters is not None and not isinstance(filters, (MetadataFilter, dict)):
+            raise TypeError("filters must be a MetadataFilter or a dictionary")
+
+    @abstractmethod
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, query: str = None,
+                                    filters: FilterLike = None) -> List[Tuple[str, float]]:
+        """Performs a similarity search with an already computed query embedding.
+
+        Args:
+            embedding (List[float]): The query embedding.
+            k (int, optional): Number of results to return. Defaults to 4.
+            query (str, optional): The query text, for stores that also rank by keywords. Defaults to None.
+            filters (FilterLike, optional): Restricts the results to chunks whose metadata passes the filter.
+
+        Returns:
+            List[Tuple[str, float]]: List of (text, score) tuples.
+        """
+        if not isinstance(embedding, list):
+            raise TypeError("embedding must be a list of floats")
+        if not isinstance(k, int):
+            raise TypeError("k must be an integer")
+        if filters is not None and not isinstance(filters, (MetadataFilter, dict)):
+            raise TypeError("filters must be a MetadataFilter or a dictionary")
+
+    @abstractmethod
+    def delete_by_page(self, page_ids: List[str]) -> None:
+        """Deletes every stored chunk that belongs to the given pages.
+
+        Args:
+            page_ids (List[str]): Ids of the source pages whose chunks should be removed.
+        """
+        if not isinstance(page_ids, list):
+            raise TypeError("page_ids must be a list of strings")
+        if not all(isinstance(page_id, str) for page_id in page_ids):
+            raise TypeError("page_ids must be a list of strings")
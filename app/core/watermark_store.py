@@ -0,0 +1,46 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+@dataclass
+class PageWatermark:
+    """The last ingested state of a single source page."""
+
+    page_id: str
+    version: Optional[int]
+    content_hash: str
+    last_modified: Optional[str] = None
+
+
+class WatermarkStore(ABC):
+    @abstractmethod
+    def get_all(self) -> Dict[str, PageWatermark]:
+        """Returns every stored watermark.
+
+        Returns:
+            Dict[str, PageWatermark]: Watermarks keyed by page id.
+        """
+        pass
+
+    @abstractmethod
+    def upsert(self, watermarks: List[PageWatermark]) -> None:
+        """Inserts or replaces watermarks.
+
+        Args:
+            watermarks (List[PageWatermark]): Watermarks to persist.
+        """
+        if not isinstance(watermarks, list):
+            raise TypeError("watermarks must be a list of PageWatermark")
+        if not all(isinstance(w, PageWatermark) for w in watermarks):
+            raise TypeError("watermarks must be a list of PageWatermark")
+
+    @abstractmethod
+    def delete(self, page_ids: List[str]) -> None:
+        """Removes the watermarks of the given pages.
+
+        Args:
+            page_ids (List[str]): Ids of the pages to forget.
+        """
+        if not isinstance(page_ids, list):
+            raise TypeError("page_ids must be a list of strings")
@@ -1,51 +1,277 @@
 import argparse
+from functools import cached_property
+
+from app.utils.startup_profile import StartupProfiler
+
+# Imported before anything heavy so the startup profile covers the driver's own imports
+profiler = StartupProfiler()
 
 from app.core.config import Config
-from app.core.aws_manager import AWSManager
-from app.modules.bedrock_embedding import BedrockEmbeddings
-from app.modules.pgvector_store import PGVectorStore
-from app.modules.confluence_loader import ConfluenceDocumentLoader
-from app.modules.bedrock_llm import BedrockLLM
-from app.modules.markdown_recursive_splitter import MarkdownRecursiveChunking
-from app.pipelines.rag_pipeline import RAGPipeline
+from app.core.vectorstore import VectorStore
 from app.utils.logger import get_logger
+from app.utils.telemetry import telemetry
 
 logger = get_logger(__name__)
 
-def main(query: str = None):
-    config = Config()
-    aws_manager = AWSManager(config.get("AWS_PROFILE"), config.get("AWS_REGION"))
+# Modules are imported where they are built: a query never imports the Confluence loader or the
+# text splitters, and only the configured cache and vector store backends are loaded.
+
+def build_embedding_cache(config: Config):
+    """Builds the embedding cache backend selected in the `embeddings.cache` config section."""
+    backend = config.get("embeddings", {}).get("cache", {}).get("backend", "none")
+    if backend == "sqlite":
+        from app.modules.sqlite_embedding_cache import SQLiteEmbeddingCache
+        return SQLiteEmbeddingCache(config)
+    if backend == "postgres":
+        from app.modules.pg_embedding_cache import PGEmbeddingCache
+        return PGEmbeddingCache(config)
+    return None
 
-    # Instantiate modules
-    embeddings_module = BedrockEmbeddings(config, aws_manager)
-    vector_store_module = PGVectorStore(config, embeddings_module, aws_manager)
-    confluence_loader_module = ConfluenceDocumentLoader(config)
-    llm_module = BedrockLLM(config, aws_manager)
-    chunking_module = MarkdownRecursiveChunking(config)
+def build_query_embedding_cache(config: Config):
+    """Builds the in-process LRU of query embeddings, unless `embeddings.query_cache.max_entries` is 0."""
+    from app.modules.memory_embedding_cache import MemoryEmbeddingCache
 
-    # Instantiate RAG pipeline
-    rag_pipeline = RAGPipeline(
-        config,
-        confluence_loader_module,
-        chunking_module,
-        embeddings_module,
-        vector_store_module,
-        llm_module,
+    max_entries = config.get("embeddings", {}).get("query_cache", {}).get("max_entries", 10000)
+    return MemoryEmbeddingCache(max_entries=max_entries) if max_entries else None
+
+def build_response_cache(config: Config):
+    """Builds the in-memory response cache, in front of the shared tier selected in `response_cache.shared`."""
+    from app.modules.memory_response_cache import MemoryResponseCache
+
+    cache_config = config.get("response_cache", {})
+    memory = MemoryResponseCache(
+        max_entries=cache_config.get("max_entries", 10000),
+        ttl_seconds=cache_config.get("ttl_seconds", 3600),
     )
+    backend = cache_config.get("shared", {}).get("backend", "none")
+    generation_check_seconds = cache_config.get("generation_check_seconds", 5)
+    if backend == "sqlite":
+        from app.modules.sqlite_response_cache import SQLiteResponseCache
+        from app.modules.tiered_response_cache import TieredResponseCache
+        return TieredResponseCache([memory, SQLiteResponseCache(config)], generation_check_seconds)
+    if backend == "postgres":
+        from app.modules.pg_response_cache import PGResponseCache
+        from app.modules.tiered_response_cache import TieredResponseCache
+        return TieredResponseCache([memory, PGResponseCache(config)], generation_check_seconds)
+    return memory
+
+def build_semantic_cache(config: Config):
+    """Builds the semantic response cache if `response_cache.semantic.enabled` is set."""
+    semantic_config = config.get("response_cache", {}).get("semantic", {})
+    if not semantic_config.get("enabled"):
+        return None
+    from app.modules.semantic_response_cache import SemanticResponseCache
+
+    return SemanticResponseCache(
+        threshold=semantic_config.get("threshold", 0.95),
+        max_entries=semantic_config.get("max_entries", 5000),
+        ttl_seconds=config.get("response_cache", {}).get("ttl_seconds", 3600),
+    )
+
+def watermark_namespace(confluence_config) -> str:
+    """The watermark namespace of the configured source: the crawled spaces and CQL queries, or the one space."""
+    shards = sorted(confluence_config.get("spaces") or []) + [
+        f"cql:{cql}" for cql in sorted(confluence_config.get("cql_queries") or [])
+    ]
+    if shards:
+        return ",".join(shards)
+    return confluence_config.get("space_key") or "default"
+
+def log_pool_metrics(vector_store: VectorStore):
+    # Only the pgvector backend has a connection pool
+    if hasattr(vector_store, "pool_metrics"):
+        logger.info(f"Database pool: {vector_store.pool_metrics()}")
+
+class Components:
+    """
+    Builds each pipeline component on first use, timing it as a startup stage.
+
+    A run only constructs, and imports, what its path needs: a query never builds the document
+    loader, the chunker or the watermark store, and Secrets Manager is only called by the
+    components that read a secret.
+    """
+
+    def __init__(self, profiler: StartupProfiler):
+        self.profiler = profiler
+
+    @cached_property
+    def config(self) -> Config:
+        with self.profiler.stage("config"):
+            return Config()
+
+    @cached_property
+    def aws_manager(self):
+        with self.profiler.stage("aws_manager"):
+            from app.core.aws_manager import AWSManager
+
+            config = self.config
+            return AWSManager(config.get("AWS_PROFILE"), config.get("AWS_REGION"), config.get_aws_config())
+
+    @cached_property
+    def embeddings(self):
+        aws_manager = self.aws_manager
+        with self.profiler.stage("embeddings"):
+            from app.modules.bedrock_embedding import BedrockEmbeddings
+
+            return BedrockEmbeddings(
+                self.config, aws_manager,
+                cache=build_embedding_cache(self.config), query_cache=build_query_embedding_cache(self.config),
+            )
+
+    @cached_property
+    def vector_store(self) -> VectorStore:
+        embeddings = self.embeddings
+        with self.profiler.stage("vector_store"):
+            if self.config.get_vector_store_config()["backend"] == "local":
+                from app.modules.local_vector_store import LocalVectorStore
+                return LocalVectorStore(self.config, embeddings)
+            from app.modules.pgvector_store import PGVectorStore
+            return PGVectorStore(self.config, embeddings)
+
+    @cached_property
+    def confluence_config(self):
+        return self.config.get_confluence_config()
+
+    @cached_property
+    def document_loader(self):
+        confluence_config = self.confluence_config
+        with self.profiler.stage("document_loader"):
+            if confluence_config.get("spaces") or confluence_config.get("cql_queries"):
+                from app.modules.confluence_crawler import ConfluenceCrawler
+                return ConfluenceCrawler(self.config)
+            from app.modules.confluence_loader import ConfluenceDocumentLoader
+            return ConfluenceDocumentLoader(self.config)
+
+    @cached_property
+    def llm(self):
+        aws_manager = self.aws_manager
+        with self.profiler.stage("llm"):
+            from app.modules.bedrock_llm import BedrockLLM
 
+            return BedrockLLM(self.config, aws_manager)
+
+    @cached_property
+    def chunking(self):
+        with self.profiler.stage("chunking"):
+            from app.modules.markdown_recursive_splitter import MarkdownRecursiveChunking
+
+            return MarkdownRecursiveChunking(self.config)
+
+    @cached_property
+    def watermark_store(self):
+        namespace = watermark_namespace(self.confluence_config)
+        with self.profiler.stage("watermark_store"):
+            from app.modules.sqlite_watermark_store import SQLiteWatermarkStore
+
+            return SQLiteWatermarkStore(self.config, namespace=namespace)
+
+    def pipeline(self, ingest: bool):
+        """
+        Builds the RAG pipeline: the loader, chunker and watermark store only when ingesting, the LLM only for queries.
+
+        Args:
+            ingest (bool): Whether the run ingests documents, rather than only answering a query.
+        """
+        config, embeddings, vector_store = self.config, self.embeddings, self.vector_store
+        llm = None if ingest else self.llm
+        document_loader = self.document_loader if ingest else None
+        chunking = self.chunking if ingest else None
+        watermark_store = self.watermark_store if ingest else None
+        with self.profiler.stage("pipeline"):
+            from app.pipelines.rag_pipeline import RAGPipeline
+
+            return RAGPipeline(
+                config,
+                document_loader,
+                chunking,
+                embeddings,
+                vector_store,
+                llm,
+                watermark_store=watermark_store,
+                response_cache=build_response_cache(config),
+                semantic_cache=build_semantic_cache(config),
+            )
+
+def main(query: str = None, incremental: bool = False, streaming: bool = False, rebuild_index: bool = False,
+         stream_response: bool = False, profile_startup: bool = False):
+    profiler.enabled = profile_startup
+    components = Components(profiler)
+    telemetry.configure(components.config.get_telemetry_config())
+    try:
+        run(components, query, incremental, streaming, rebuild_index, stream_response, profile_startup)
+    finally:
+        # Writes the Prometheus text file and the buffered OTLP spans
+        telemetry.shutdown()
+
+def run(components: Components, query: str, incremental: bool, streaming: bool, rebuild_index: bool,
+        stream_response: bool, profile_startup: bool):
+    rag_pipeline = components.pipeline(ingest=not query)
+    if profile_startup:
+        print(profiler.report())
+
+    if query and stream_response:
+        # Print the response as the LLM generates it
+        print("Response: ", end="", flush=True)
+        for part in rag_pipeline.stream_response(query):
+            print(part, end="", flush=True)
+        print()
+        log_pool_metrics(components.vector_store)
+        return
     if query:
         # Generate response for a query
         response = rag_pipeline.generate_response(query)
         print(f"Response: {response}")
+        log_pool_metrics(components.vector_store)
+        return
+    config = components.config
+    if streaming:
+        # Run data ingestion with overlapping load, chunk, embed and write stages
+        ingestion_config = config.get("ingestion", {})
+        rag_pipeline.ingest_streaming(
+            batch_size=ingestion_config.get("batch_size", 100),
+            queue_size=ingestion_config.get("queue_size", 4),
+            embed_workers=ingestion_config.get("embed_workers", 2),
+            write_workers=ingestion_config.get("write_workers", 1),
+        )
+    elif incremental:
+        # Only ingest pages that changed since the last run
+        rag_pipeline.ingest_incremental()
     else:
         # Run data ingestion
         rag_pipeline.ingest_data()
 
+    components.chunking.close()
+
+    # The index is maintained on insert once it exists, so this only builds it after the first ingestion
+    components.vector_store.build_index(rebuild=rebuild_index)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run the RAG application.")
     parser.add_argument(
         "-q", "--query", type=str, help="The user's query.", default=None
     )
+    parser.add_argument(
+        "--incremental", action="store_true", help="Only ingest pages changed since the last run."
+    )
+    parser.add_argument(
+        "--streaming", action="store_true", help="Run ingestion as a pipeline of concurrent stages."
+    )
+    parser.add_argument(
+        "--rebuild-index", action="store_true", help="Recreate the ANN index after ingestion, e.g. after changing its parameters."
+    )
+    parser.add_argument(
+        "--stream-response", action="store_true", help="Print the response to --query as it is generated."
+    )
+    parser.add_argument(
+        "--profile-startup", action="store_true", help="Print how long each startup stage took and what it imported."
+    )
     args = parser.parse_args()
 
-    main(query=args.query)
\ No newline at end of file
+    main(
+        query=args.query,
+        incremental=args.incremental,
+        streaming=args.streaming,
+        rebuild_index=args.rebuild_index,
+        stream_response=args.stream_response,
+        profile_startup=args.profile_startup,
+    )
\ No newline at end of file
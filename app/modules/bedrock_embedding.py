@@ -1,31 +1,214 @@
-from typing import List
-from langchain_aws import embeddings as e
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from botocore.exceptions import ClientError
 from app.core.embeddings import Embeddings
+from app.core.embedding_cache import EmbeddingCache
 from app.core.config import Config
 from app.core.aws_manager import AWSManager
+from app.utils.rate_limiter import TokenBucket
+from app.utils.telemetry import telemetry
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+THROTTLING_ERROR_CODES = {"ThrottlingException", "TooManyRequestsException"}
+# Throttles reported within this many seconds of a rate decrease do not decrease it again
+THROTTLE_COOLDOWN_SECONDS = 1.0
+
+# Model id prefix -> texts per request for models whose API embeds a list of texts in one call
+BATCH_EMBEDDING_MODELS = {"cohere.embed": 96}
+
 class BedrockEmbeddings(Embeddings):
-    def __init__(self, config: Config, aws_manager: AWSManager):
+    def __init__(self, config: Config, aws_manager: AWSManager, cache: Optional[EmbeddingCache] = None,
+                 query_cache: Optional[EmbeddingCache] = None):
         embeddings_config = config.get_embeddings_config()
         self.model_id = embeddings_config.get("model_id", "amazon.titan-embed-text-v1")
         self.bedrock_role_arn = embeddings_config.get("assumed_role_arn")
         self.client = aws_manager.get_client("bedrock-runtime", assumed_role_arn=self.bedrock_role_arn)
+        self.cache = cache
+        # Query and document embeddings differ for some models (Cohere input_type), so they are cached apart
+        self.query_cache = query_cache
+
+        self.max_concurrency = embeddings_config.get("max_concurrency", 8)
+        self.requests_per_second = embeddings_config.get("requests_per_second", 30)
+        self.max_retries = embeddings_config.get("max_retries", 8)
+        tokens_per_minute = embeddings_config.get("tokens_per_minute", 300000)
+
+        # Requests are limited against both the TPS and the TPM quota of the model
+        self.request_bucket = TokenBucket(rate=self.requests_per_second)
+        self.token_bucket = TokenBucket(rate=tokens_per_minute / 60, capacity=tokens_per_minute)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="bedrock-embed")
+        self.throttle_count = 0
+        self._last_decrease = float("-inf")
+        self._rate_lock = threading.Lock()
+
+        logger.info(
+            f"Using Bedrock Embeddings with model ID: {self.model_id} and role ARN: {self.bedrock_role_arn} "
+            f"(concurrency: {self.max_concurrency}, requests/sec: {self.requests_per_second})"
+        )
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Roughly estimates the number of tokens Bedrock will bill for a text."""
+        return max(1, len(text) // 4)
+
+    def _on_throttled(self, issued_rate: float):
+        """
+        Halves the request rate after a throttling error, once per throttle event.
+
+        Concurrent workers throttled by the same event each report it; only the first halves
+        the rate. Later reports are skipped if the rate already dropped below the one their
+        request was issued at, or if it was decreased within `THROTTLE_COOLDOWN_SECONDS`.
+
+        Args:
+            issued_rate (float): The request rate when the throttled request was sent.
+        """
+        with self._rate_lock:
+            self.throttle_count += 1
+            telemetry.add("rag_bedrock_throttles_total", model=self.model_id)
+            now = time.monotonic()
+            if self.request_bucket.rate < issued_rate or now - self._last_decrease < THROTTLE_COOLDOWN_SECONDS:
+                return
+            self._last_decrease = now
+            rate = max(1.0, self.request_bucket.rate / 2)
+            self.request_bucket.set_rate(rate)
+        logger.warning(f"Bedrock throttled the embedding request, reducing rate to {rate:.1f} requests/sec")
+
+    def _on_success(self):
+        """Additively recovers the request rate towards the configured quota."""
+        if self.request_bucket.rate < self.requests_per_second:
+            with self._rate_lock:
+                self.request_bucket.set_rate(min(self.requests_per_second, self.request_bucket.rate + 0.5))
+
+    def _invoke_model(self, body: Dict[str, Any], tokens: int) -> Dict[str, Any]:
+        """Calls the model, retrying with exponential backoff when throttled."""
+        for attempt in range(self.max_retries + 1):
+            self.token_bucket.acquire(tokens)
+            self.request_bucket.acquire()
+            issued_rate = self.request_bucket.rate
+            try:
+                response = self.client.invoke_model(
+                    modelId=self.model_id,
+                    body=json.dumps(body),
+                    accept="application/json",
+                    contentType="application/json",
+                )
+            except ClientError as error:
+                if error.response.get("Error", {}).get("Code") not in THROTTLING_ERROR_CODES:
+                    raise
+                if attempt == self.max_retries:
+                    raise
+                self._on_throttled(issued_rate)
+                time.sleep(min(20.0, 0.1 * 2 ** attempt) * random.uniform(0.5, 1.0))
+                continue
+            self._on_success()
+            telemetry.add("rag_embedding_tokens_total", tokens, model=self.model_id)
+            return json.loads(response["body"].read())
+
+    def _invoke(self, text: str) -> List[float]:
+        """Embeds a single text with a model that takes one text per request (Titan)."""
+        return self._invoke_model({"inputText": text}, self.estimate_tokens(text))["embedding"]
 
-        logger.info(f"Using Bedrock Embeddings with model ID: {self.model_id} and role ARN: {self.bedrock_role_arn}")
+    def _invoke_batch(self, texts: List[str], input_type: str) -> List[List[float]]:
+        """Embeds a list of texts in one request to a model that takes several (Cohere)."""
+        response = self._invoke_model(
+            {"texts": texts, "input_type": input_type}, sum(self.estimate_tokens(text) for text in texts)
+        )
+        return response["embeddings"]
 
-        # Verify imported library and class
-        if not hasattr(e, "BedrockEmbeddings") or not isinstance(e.BedrockEmbeddings(client=self.client), Embeddings):
-            raise ImportError("The imported 'BedrockEmbeddings' class is incorrect or not a subclass of 'Embeddings'.")
+    def _batch_size(self) -> Optional[int]:
+        for prefix, batch_size in BATCH_EMBEDDING_MODELS.items():
+            if self.model_id.startswith(prefix):
+                return batch_size
+        return None
 
-        self.embedder = e.BedrockEmbeddings(client=self.client, model_id=self.model_id)
+    def _embed_concurrently(self, texts: List[str], input_type: str = "search_document") -> List[List[float]]:
+        """
+        Fans the texts, or batches of them for models that embed a list per request, out over the thread pool.
+
+        Args:
+            texts (List[str]): The texts to embed.
+            input_type (str): The Cohere input type, "search_document" or "search_query"; ignored by Titan.
+
+        Returns:
+            List[List[float]]: The embeddings, in the input order.
+        """
+        if not texts:
+            return []
+        batch_size = self._batch_size()
+        if batch_size is None:
+            if len(texts) == 1:
+                return [self._invoke(texts[0])]
+            return list(self.executor.map(self._invoke, texts))
+
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        if len(batches) == 1:
+            return self._invoke_batch(batches[0], input_type)
+        return [
+            vector
+            for vectors in self.executor.map(lambda batch: self._invoke_batch(batch, input_type), batches)
+            for vector in vectors
+        ]
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         super().embed_documents(texts)
-        return self.embedder.embed_documents(texts)
+        if self.cache is None:
+            return self._embed_concurrently(texts)
+
+        keys = [EmbeddingCache.make_key(self.model_id, text) for text in texts]
+        cached = self.cache.get_many(list(set(keys)))
+
+        # Send each distinct missing text to Bedrock once, even if it repeats within the batch
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        self.cache.record(hits=len(texts) - len(missing), misses=len(missing))
+        telemetry.add("rag_cache_hits_total", len(texts) - len(missing), cache="embedding")
+        telemetry.add("rag_cache_misses_total", len(missing), cache="embedding")
+
+        if missing:
+            new_embeddings = dict(zip(missing, self._embed_concurrently(list(missing.values()))))
+            self.cache.put_many(new_embeddings)
+            cached.update(new_embeddings)
+
+        logger.info(f"Embedding cache served {len(texts) - len(missing)} of {len(texts)} texts")
+        return [cached[key] for key in keys]
 
     def embed_query(self, text: str) -> List[float]:
         super().embed_query(text)
-        return self.embedder.embed_query(text)
\ No newline at end of file
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embeds queries in as few requests as the model allows, or concurrently for single-text models.
+
+        Queries seen recently are served from the query cache; only the others reach Bedrock.
+        """
+        if not isinstance(texts, list):
+            raise TypeError("texts must be a list of strings")
+        if self.query_cache is None:
+            return self._embed_queries(texts)
+
+        keys = [EmbeddingCache.make_key(self.model_id, text) for text in texts]
+        cached = self.query_cache.get_many(list(set(keys)))
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        self.query_cache.record(hits=len(texts) - len(missing), misses=len(missing))
+        telemetry.add("rag_cache_hits_total", len(texts) - len(missing), cache="query_embedding")
+        telemetry.add("rag_cache_misses_total", len(missing), cache="query_embedding")
+
+        if missing:
+            new_embeddings = dict(zip(missing, self._embed_queries(list(missing.values()))))
+            self.query_cache.put_many(new_embeddings)
+            cached.update(new_embeddings)
+        return [cached[key] for key in keys]
+
+    def _embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self._embed_concurrently(texts, input_type="search_query")
@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Iterator
 
 from langchain_community.llms import Bedrock
 from app.core.llm import LLM
@@ -12,7 +12,7 @@ class BedrockLLM(LLM):
     def __init__(self, config: Config, aws_manager: AWSManager):
         llm_config = config.get_llm_config()
         self.model_id = llm_config.get("model_id", "anthropic.claude-v2")
-        self.model_kwargs = llm_config.get("model_kwargs", {})
+        self.model_kwargs = dict(llm_config.get("model_kwargs") or {})
         self.bedrock_role_arn = llm_config.get("assumed_role_arn")
         self.client = aws_manager.get_client(
             "bedrock-runtime", assumed_role_arn=self.bedrock_role_arn
@@ -26,4 +26,13 @@ class BedrockLLM(LLM):
 
     def generate_text(self, prompt: str, **kwargs: Any) -> str:
         super().generate_text(prompt, **kwargs)
-        return self.llm.invoke(prompt, **kwargs)
\ No newline at end of file
+        return self.llm.invoke(prompt, **kwargs)
+
+    def stream_text(self, prompt: str, **kwargs: Any) -> Iterator[str]:
+        """Streams the completion through `invoke_model_with_response_stream`, skipping empty chunks."""
+        if not isinstance(prompt, str):
+            raise TypeError("prompt must be a string")
+        # Time to first token is measured by the caller, which also records it on its telemetry span
+        for chunk in self.llm.stream(prompt, **kwargs):
+            if chunk:
+                yield chunk
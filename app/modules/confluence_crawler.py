@@ -0,0 +1,213 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.core.document_loader import DocumentLoader
+from app.core.config import Config
+from app.modules.confluence_loader import ConfluenceDocumentLoader
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_SHARD_DONE = object()
+
+def build_pooled_session(username: str, api_key: str, pool_size: int, max_retries: int) -> requests.Session:
+    """
+    Builds an authenticated session whose keep-alive connections are shared by all crawler workers.
+
+    Requests answered with 429 or a 5xx gateway error are retried, waiting for the delay in
+    the `Retry-After` header when the server sends one and backing off exponentially otherwise.
+
+    Args:
+        username (str): The Confluence username.
+        api_key (str): The Confluence API key.
+        pool_size (int): The maximum number of pooled connections per host.
+        max_retries (int): The maximum number of retries per request.
+
+    Returns:
+        requests.Session: The configured session.
+    """
+    retry = Retry(
+        total=max_retries,
+        status_forcelist=[429, 502, 503, 504],
+        allowed_methods=["GET"],
+        backoff_factor=1,
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.auth = (username, api_key)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+class ShardStats:
+    """Progress of one space or CQL query."""
+
+    def __init__(self):
+        self.pages = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = ((self.finished_at or time.monotonic()) - self.started_at) if self.started_at else 0.0
+        return {
+            "pages": self.pages,
+            "seconds": round(elapsed, 3),
+            "pages_per_sec": round(self.pages / elapsed, 2) if elapsed else 0.0,
+            "error": self.error,
+        }
+
+class ConfluenceCrawler(DocumentLoader):
+    """
+    Loads many Confluence spaces and CQL queries in parallel.
+
+    Every space or query is a shard read by its own `ConfluenceDocumentLoader`; shards are
+    spread over a thread pool and all of them share one pooled, authenticated HTTP session.
+    A failed shard does not stop the others, but the crawl raises once they have finished,
+    so a missing space never passes for a complete ingest.
+    """
+
+    def __init__(self, config: Config, spaces: Optional[List[str]] = None, cql_queries: Optional[List[str]] = None):
+        confluence_config = config.get_confluence_config()
+        self.config = config
+        self.spaces = spaces if spaces is not None else confluence_config.get("spaces") or []
+        self.cql_queries = cql_queries if cql_queries is not None else confluence_config.get("cql_queries") or []
+        self.workers = int(confluence_config.get("crawler_workers") or 8)
+        self.max_retries = int(confluence_config.get("max_retries") or 5)
+        self.session = build_pooled_session(
+            confluence_config.get("username"), confluence_config.get("api_key"), self.workers, self.max_retries
+        )
+        self.shards = [("space", space) for space in self.spaces] + [("cql", cql) for cql in self.cql_queries]
+        self.stats: Dict[Tuple[str, str], ShardStats] = {}
+
+        logger.info(
+            f"Initialized Confluence crawler for {len(self.spaces)} spaces and {len(self.cql_queries)} CQL queries "
+            f"with {self.workers} workers"
+        )
+
+    def _make_loader(self, kind: str, value: str) -> ConfluenceDocumentLoader:
+        if kind == "cql":
+            return ConfluenceDocumentLoader(self.config, session=self.session, cql=value)
+        return ConfluenceDocumentLoader(self.config, session=self.session, space_key=value)
+
+    def _crawl_shard(self, kind: str, value: str, output: queue.Queue, stop: threading.Event):
+        stats = self.stats[(kind, value)]
+        stats.started_at = time.monotonic()
+        try:
+            if stop.is_set():
+                return
+            pages = self._make_loader(kind, value).iter_pages()
+            for document in pages:
+                while not stop.is_set():
+                    try:
+                        output.put(document, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    pages.close()
+                    return
+                stats.pages += 1
+        except Exception as e:
+            stats.error = str(e)
+            logger.error(f"Error crawling Confluence {kind} {value}: {e}")
+        finally:
+            stats.finished_at = time.monotonic()
+            output.put(_SHARD_DONE)
+            snapshot = stats.snapshot()
+            logger.info(f"Crawled {snapshot['pages']} pages from {kind} {value} at {snapshot['pages_per_sec']} pages/sec")
+
+    def iter_pages(self, **kwargs) -> Iterator[Dict[str, Any]]:
+        """
+        Streams the documents of every shard as soon as any worker produces them.
+
+        Yields:
+            Dict[str, Any]: Documents with "page_content" and "metadata" keys.
+
+        Raises:
+            RuntimeError: After the other shards have been crawled, if any shard failed.
+        """
+        self.stats = {shard: ShardStats() for shard in self.shards}
+        output: queue.Queue = queue.Queue(maxsize=self.workers * 2)
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="confluence-crawler")
+        for kind, value in self.shards:
+            executor.submit(self._crawl_shard, kind, value, output, stop)
+
+        remaining = len(self.shards)
+        try:
+            while remaining:
+                item = output.get()
+                if item is _SHARD_DONE:
+                    remaining -= 1
+                    continue
+                yield item
+            failed = {f"{kind} {value}": stats.error for (kind, value), stats in self.stats.items() if stats.error}
+            if failed:
+                # Like list_page_versions: a partial crawl must not look like a complete one
+                raise RuntimeError(f"Crawling {len(failed)} of {len(self.shards)} Confluence shards failed: {failed}")
+        finally:
+            stop.set()
+            # Unblock workers waiting to report completion
+            while remaining:
+                if output.get() is _SHARD_DONE:
+                    remaining -= 1
+            executor.shutdown(wait=True)
+
+    def load(self, **kwargs) -> List[Dict[str, Any]]:
+        """
+        Loads every document of every shard.
+
+        Returns:
+            List[Dict[str, Any]]: List of documents loaded from Confluence.
+        """
+        return list(self.iter_pages())
+
+    def list_page_versions(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Lists the pages of every shard in parallel; a page matched by several shards is listed once.
+
+        A failed shard raises rather than being skipped: its pages would be missing from the
+        listing, and incremental ingestion would delete them as removed from the source.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Mapping of page id to its "version" number and "last_modified" timestamp.
+        """
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="confluence-crawler") as executor:
+            listings = executor.map(lambda shard: self._make_loader(*shard).list_page_versions(), self.shards)
+            versions = {}
+            for listing in listings:
+                versions.update(listing)
+        return versions
+
+    def load_pages(self, page_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Loads specific pages, whichever shard they belong to, spreading the ids over the workers.
+
+        Args:
+            page_ids (List[str]): Ids of the pages to load.
+
+        Returns:
+            List[Dict[str, Any]]: List of documents for the requested pages.
+        """
+        if not page_ids:
+            return []
+        # Pages are fetched by id, so any shard's loader can fetch any of them
+        kind, value = self.shards[0]
+        size = -(-len(page_ids) // self.workers)
+        parts = [page_ids[i:i + size] for i in range(0, len(page_ids), size)]
+        with ThreadPoolExecutor(max_workers=len(parts), thread_name_prefix="confluence-crawler") as executor:
+            loaded = executor.map(lambda part: self._make_loader(kind, value).load_pages(part), parts)
+            return [document for documents in loaded for document in documents]
+
+    def pages_per_second(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Returns the throughput of every (kind, value) shard of the current or last crawl."""
+        return {shard: stats.snapshot() for shard, stats in self.stats.items()}
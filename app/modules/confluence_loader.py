@@ -1,68 +1,263 @@
-from typing import List, Dict, Any, Optional
+import queue
+import threading
+from typing import List, Dict, Any, Optional, Iterator
 
+import requests
 from langchain_community.document_loaders import ConfluenceLoader
+from langchain_community.document_loaders.confluence import ContentFormat
 from app.core.document_loader import DocumentLoader
 from app.core.config import Config
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Read restrictions, expanded so restricted pages are recognized without a request per page
+RESTRICTIONS_EXPAND = "restrictions.read.restrictions.user,restrictions.read.restrictions.group"
+# Expanded on every page the loader reads: the body, the fields stored as metadata and the restrictions
+PAGE_EXPAND = f"body.storage,version,space,ancestors,metadata.labels,{RESTRICTIONS_EXPAND}"
+
 class ConfluenceDocumentLoader(DocumentLoader):
-    def __init__(self, config: Config):
+    def __init__(
+            self,
+            config: Config,
+            session: Optional[requests.Session] = None,
+            space_key: Optional[str] = None,
+            cql: Optional[str] = None,
+    ):
         confluence_config = config.get_confluence_config()
         self.url = confluence_config.get("url")
         self.username = confluence_config.get("username")
         self.api_key = confluence_config.get("api_key")
-        self.loader = ConfluenceLoader(
-            url=self.url, username=self.username, api_key=self.api_key
-        )
-        self.max_pages = confluence_config.get("max_pages", 100)
-        self.space_key = confluence_config.get("space_key")
+        if session is not None:
+            self.loader = ConfluenceLoader(url=self.url, session=session)
+        else:
+            self.loader = ConfluenceLoader(
+                url=self.url, username=self.username, api_key=self.api_key
+            )
+        self.max_pages = int(confluence_config.get("max_pages") or 0)  # 0 loads the whole space
+        self.space_key = space_key or confluence_config.get("space_key")
+        self.cql = cql
         self.include_attachments = confluence_config.get(
             "include_attachments", False
         )
-        self.limit = confluence_config.get("limit", 50)
+        self.limit = int(confluence_config.get("limit") or 50)
+        self.prefetch = int(confluence_config.get("prefetch") or 2)
+        self.include_restricted_content = confluence_config.get("include_restricted_content", False)
         self.continue_on_failure = confluence_config.get("continue_on_failure", True)
+        self.cursor: Optional[str] = None
 
-        logger.info(f"Initialized Confluence loader for space: {self.space_key} at URL: {self.url}")
+        logger.info(f"Initialized Confluence loader for {self.source} at URL: {self.url}")
 
-    def load(self, limit: int = 50, offset: int = 0, **kwargs) -> List[Dict[str, Any]]:
+    @property
+    def source(self) -> str:
+        """A readable name for what this loader reads: its CQL query or its space."""
+        return f"CQL: {self.cql}" if self.cql else f"space: {self.space_key}"
+
+    def load(self, **kwargs) -> List[Dict[str, Any]]:
         """
-        Loads documents from Confluence with pagination support.
+        Loads every document of the space.
+
+        Prefer `iter_pages`, which streams documents instead of holding the whole space in memory.
 
         Args:
-            limit (int): The maximum number of documents to load per batch.
-            offset (int): The starting offset for loading documents.
-            **kwargs: Additional keyword arguments to pass to the ConfluenceLoader.
+            **kwargs: Keyword arguments passed to `iter_pages`.
 
         Returns:
             List[Dict[str, Any]]: List of documents loaded from Confluence.
         """
         try:
-            all_documents = []
-            current_offset = offset
-            while True:
-                docs = self.loader.load(
-                    space_key=self.space_key,
-                    include_attachments=self.include_attachments,
-                    limit=limit,
-                    max_pages=self.max_pages,
-                    continue_on_failure=self.continue_on_failure,
-                    next_page_offset=current_offset,
-                    **kwargs
-                )
-                if not docs:
-                    break  # No more documents to load
-
-                documents = []
-                for doc in docs:
-                    metadata = doc.metadata
-                    document = {"page_content": doc.page_content, "metadata": metadata}
-                    documents.append(document)
-                all_documents.extend(documents)
-                current_offset += limit  # Increment the offset for the next batch
-
-            return all_documents
+            return list(self.iter_pages(**kwargs))
         except Exception as e:
             logger.error(f"Error loading from Confluence: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    def _fetch_results(self, cursor: Optional[str], expand: str = PAGE_EXPAND) -> Dict[str, Any]:
+        """Fetches one page of REST results, either the first one or the one a cursor points to."""
+        if cursor:
+            return self.loader.confluence.get(cursor)
+        if self.cql:
+            return self.loader.confluence.get(
+                "rest/api/content/search", params={"cql": self.cql, "limit": self.limit, "expand": expand},
+            )
+        return self.loader.confluence.get(
+            "rest/api/content",
+            params={
+                "spaceKey": self.space_key,
+                "type": "page",
+                "status": "current",
+                "limit": self.limit,
+                "expand": expand,
+            },
+        )
+
+    def _prefetch_results(self, cursor: Optional[str], buffer: queue.Queue, stop: threading.Event):
+        """Follows `_links.next` from `cursor` and pushes (results, next cursor) into the bounded buffer."""
+        def put(item):
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        try:
+            while not stop.is_set():
+                response = self._fetch_results(cursor)
+                cursor = response.get("_links", {}).get("next")
+                put((response.get("results", []), cursor))
+                if not cursor:
+                    break
+        except Exception as e:
+            put(e)
+        finally:
+            put(None)
+
+    def _is_included(self, page: Dict[str, Any]) -> bool:
+        """
+        Whether a page is ingested: it is current and, unless `include_restricted_content` is set, has no read restrictions.
+
+        Uses the restrictions expanded on the page (`RESTRICTIONS_EXPAND`), the same check as
+        `ConfluenceLoader.is_public_page` without its extra request per page.
+        """
+        if self.include_restricted_content:
+            return True
+        if "restrictions" not in page:
+            return self.loader.is_public_page(page)
+        read = page["restrictions"].get("read", {}).get("restrictions", {})
+        return (
+            page.get("status", "current") == "current"
+            and not read.get("user", {}).get("results")
+            and not read.get("group", {}).get("results")
+        )
+
+    def _to_document(self, page: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Converts a REST page expanded with `PAGE_EXPAND` into a document with the filterable metadata.
+
+        Returns:
+            Optional[Dict[str, Any]]: The document, or None if the page is restricted or failed to process.
+        """
+        try:
+            if not self._is_included(page):
+                return None
+            doc = self.loader.process_page(page, self.include_attachments, False, ContentFormat.STORAGE)
+        except Exception as e:
+            if not self.continue_on_failure:
+                raise
+            logger.warning(f"Skipping Confluence page {page.get('id')}: {e}")
+            return None
+        doc.metadata["version"] = page.get("version", {}).get("number")
+        doc.metadata["space"] = page.get("space", {}).get("key", self.space_key)
+        # Filterable fields (see app.core.filters)
+        doc.metadata["last_modified"] = page.get("version", {}).get("when")
+        doc.metadata["ancestors"] = [ancestor.get("id") for ancestor in page.get("ancestors", [])]
+        doc.metadata["labels"] = [
+            label.get("name") for label in page.get("metadata", {}).get("labels", {}).get("results", [])
+        ]
+        return {"page_content": doc.page_content, "metadata": doc.metadata}
+
+    def iter_pages(self, cursor: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Streams the documents of the space, fetching each Confluence page exactly once.
+
+        Result pages are requested by following the REST `_links.next` cursor in a background
+        thread that stays at most `prefetch` result pages ahead of the consumer. After every
+        fully consumed result page, `self.cursor` holds the cursor to pass back in to resume
+        (it is None once the space has been read to the end).
+
+        Args:
+            cursor (str, optional): A cursor saved from `self.cursor` to resume from.
+
+        Yields:
+            Dict[str, Any]: Documents with "page_content" and "metadata" keys.
+        """
+        buffer = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        fetcher = threading.Thread(
+            target=self._prefetch_results, args=(cursor, buffer, stop), name="confluence-prefetch", daemon=True
+        )
+        fetcher.start()
+
+        yielded = 0
+        self.cursor = cursor
+        try:
+            while True:
+                item = buffer.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                pages, next_cursor = item
+                for page in pages:
+                    if self.max_pages and yielded >= self.max_pages:
+                        return
+                    document = self._to_document(page)
+                    if document is None:
+                        continue
+                    yielded += 1
+                    yield document
+                self.cursor = next_cursor
+        finally:
+            stop.set()
+
+    def list_page_versions(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Lists the current pages of the space, or matched by the CQL query, with their version information only.
+
+        Page bodies are not expanded, so this is cheap enough to run on every ingestion
+        to decide which pages need to be reloaded. Restricted pages are left out, as in
+        `iter_pages`: they would never be ingested, so they would otherwise look changed on
+        every run, and a page that becomes restricted is removed from the store.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Mapping of page id to its "version" number and "last_modified" timestamp.
+        """
+        versions = {}
+        cursor = None
+        while True:
+            response = self._fetch_results(cursor, expand=f"version,{RESTRICTIONS_EXPAND}")
+            for page in response.get("results", []):
+                if not self._is_included(page):
+                    continue
+                version = page.get("version", {})
+                versions[page["id"]] = {
+                    "version": version.get("number"),
+                    "last_modified": version.get("when"),
+                }
+            cursor = response.get("_links", {}).get("next")
+            if not cursor:
+                break
+
+        logger.info(f"Listed {len(versions)} pages in {self.source}")
+        return versions
+
+    def load_pages(self, page_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Loads specific pages from Confluence.
+
+        Args:
+            page_ids (List[str]): Ids of the pages to load.
+
+        Returns:
+            List[Dict[str, Any]]: List of documents for the requested pages.
+        """
+        if not page_ids:
+            return []
+        # Fetched with the same expansions as iter_pages, so re-ingested pages keep their filterable metadata
+        documents = []
+        for i in range(0, len(page_ids), self.limit):
+            batch = page_ids[i:i + self.limit]
+            cql = "id in ({})".format(",".join(f'"{page_id}"' for page_id in batch))
+            response = self.loader.confluence.get(
+                "rest/api/content/search", params={"cql": cql, "limit": len(batch), "expand": PAGE_EXPAND},
+            )
+            while True:
+                for page in response.get("results", []):
+                    document = self._to_document(page)
+                    if document is not None:
+                        documents.append(document)
+                cursor = response.get("_links", {}).get("next")
+                if not cursor:
+                    break
+                response = self.loader.confluence.get(cursor)
+        return documents
@@ -0,0 +1,101 @@
+import heapq
+import math
+import random
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+class HNSWGraph:
+    """
+    A hierarchical navigable small world graph over the rows of a vector matrix.
+
+    Vectors are expected to be L2-normalized, so the distance is `1 - dot`. The graph only
+    stores neighbour lists; vectors are read through `vectors(rows)`, which lets it sit on top
+    of a memory-mapped matrix that grows. Deleted rows stay in the graph as waypoints and
+    are skipped by the caller; compaction rebuilds the graph from the surviving rows.
+    """
+
+    def __init__(self, vectors: Callable[[np.ndarray], np.ndarray], m: int = 16, ef_construction: int = 100,
+                 seed: int = 42):
+        self.vectors = vectors
+        self.m = m
+        self.max_neighbours_0 = 2 * m
+        self.ef_construction = ef_construction
+        self.level_multiplier = 1 / math.log(max(m, 2))
+        self.neighbours: List[Dict[int, List[int]]] = []
+        self.entry_point: Optional[int] = None
+        self.max_level = -1
+        self._random = random.Random(seed)
+
+    def __len__(self) -> int:
+        return len(self.neighbours)
+
+    def _distances(self, query: np.ndarray, rows: List[int]) -> np.ndarray:
+        return 1.0 - self.vectors(np.asarray(rows, dtype=np.int64)) @ query
+
+    def _search_layer(self, query: np.ndarray, entry_points: List[Tuple[float, int]], ef: int,
+                      level: int) -> List[Tuple[float, int]]:
+        """Best-first search of one layer; returns up to `ef` (distance, row) pairs, nearest first."""
+        visited = {row for _, row in entry_points}
+        candidates = list(entry_points)
+        heapq.heapify(candidates)
+        # Max-heap of the best results so far, by negated distance
+        results = [(-distance, row) for distance, row in entry_points]
+        heapq.heapify(results)
+        while candidates:
+            distance, row = heapq.heappop(candidates)
+            if distance > -results[0][0] and len(results) >= ef:
+                break
+            unvisited = [n for n in self.neighbours[row].get(level, ()) if n not in visited]
+            if not unvisited:
+                continue
+            visited.update(unvisited)
+            for neighbour_distance, neighbour in zip(self._distances(query, unvisited).tolist(), unvisited):
+                if len(results) < ef or neighbour_distance < -results[0][0]:
+                    heapq.heappush(candidates, (neighbour_distance, neighbour))
+                    heapq.heappush(results, (-neighbour_distance, neighbour))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return sorted((-negated, row) for negated, row in results)
+
+    def _prune(self, row: int, level: int):
+        limit = self.max_neighbours_0 if level == 0 else self.m
+        neighbours = self.neighbours[row][level]
+        if len(neighbours) <= limit:
+            return
+        distances = self._distances(self.vectors(np.asarray([row]))[0], neighbours)
+        keep = np.argsort(distances)[:limit]
+        self.neighbours[row][level] = [neighbours[i] for i in keep]
+
+    def add(self, row: int):
+        """Inserts the next row of the matrix; rows must be added in order."""
+        if row != len(self.neighbours):
+            raise ValueError(f"Rows must be added in order, expected {len(self.neighbours)} got {row}")
+        level = int(-math.log(1.0 - self._random.random()) * self.level_multiplier)
+        self.neighbours.append({layer: [] for layer in range(level + 1)})
+        if self.entry_point is None:
+            self.entry_point, self.max_level = row, level
+            return
+
+        query = self.vectors(np.asarray([row]))[0]
+        entry = [(float(self._distances(query, [self.entry_point])[0]), self.entry_point)]
+        for layer in range(self.max_level, level, -1):
+            entry = self._search_layer(query, entry, 1, layer)[:1]
+        for layer in range(min(level, self.max_level), -1, -1):
+            entry = self._search_layer(query, entry, self.ef_construction, layer)
+            selected = [neighbour for _, neighbour in entry[:self.m]]
+            self.neighbours[row][layer] = selected
+            for neighbour in selected:
+                self.neighbours[neighbour][layer].append(row)
+                self._prune(neighbour, layer)
+        if level > self.max_level:
+            self.entry_point, self.max_level = row, level
+
+    def search(self, query: np.ndarray, k: int, ef: int) -> List[Tuple[float, int]]:
+        """Returns up to max(ef, k) approximate nearest (distance, row) pairs, nearest first."""
+        if self.entry_point is None:
+            return []
+        entry = [(float(self._distances(query, [self.entry_point])[0]), self.entry_point)]
+        for layer in range(self.max_level, 0, -1):
+            entry = self._search_layer(query, entry, 1, layer)[:1]
+        return self._search_layer(query, entry, max(ef, k), 0)
@@ -0,0 +1,537 @@
+import json
+import math
+import mmap
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.chunking import make_chunk_id, page_id_of, page_reference
+from app.core.config import Config
+from app.core.embeddings import Embeddings
+from app.core.filters import FilterLike, as_filter
+from app.core.vectorstore import VectorStore
+from app.modules.local_hnsw import HNSWGraph
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+LOCAL_QUANTIZATIONS = ("none", "int8")
+# Rows dequantized at a time when scanning an int8 matrix, bounding the temporary float32 copy
+_SCAN_BLOCK_ROWS = 65536
+
+class LocalVectorStore(VectorStore):
+    """
+    An in-process vector store that needs no database, for CI, local development and edge deployments.
+
+    Embeddings are L2-normalized and kept in a contiguous float32 matrix in a memory-mapped
+    file (`vectors.f32`), one row per chunk. Documents live in a SQLite side table keyed by
+    row; page metadata is stored once per page in a `pages` table, and each row keeps only
+    its page reference. Search computes every cosine distance with a single matrix-vector
+    product and takes the top k with `argpartition`. Once the store holds `index.min_rows`
+    rows and `index.method` is "hnsw", an in-memory HNSW graph is used instead.
+
+    Writes only append: deleted and superseded chunks are tombstoned, and the matrix is
+    rewritten without them once tombstones exceed `compact_threshold` of the rows.
+
+    With `quantization: int8` the matrix holds int8 components with one float32 scale per
+    row (`vectors.i8` and `scales.f32`), a quarter of the float32 footprint. Distances are
+    computed on the dequantized rows; the quantization is fixed when the store is created.
+    """
+
+    def __init__(self, config: Config, embeddings: Embeddings):
+        store_config = config.get_vector_store_config().get("local") or {}
+        self.path = store_config.get("path") or "data/local_vector_store"
+        self.embedder = embeddings
+        self.compact_threshold = float(store_config.get("compact_threshold") or 0.3)
+        self.quantization = (store_config.get("quantization") or "none").lower()
+        if self.quantization not in LOCAL_QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization {self.quantization}, expected one of {LOCAL_QUANTIZATIONS}")
+        index_config = store_config.get("index") or {}
+        self.index_method = (index_config.get("method") or "none").lower()
+        self.index_min_rows = int(index_config.get("min_rows", 50000))
+        self.m = int(index_config.get("m") or 16)
+        self.ef_construction = int(index_config.get("ef_construction") or 100)
+        self.ef_search = int(index_config.get("ef_search") or 64)
+        self._lock = threading.RLock()
+
+        os.makedirs(self.path, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(self.path, "rows.db"), check_same_thread=False)
+        with self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chunks (
+                    row INTEGER PRIMARY KEY,
+                    custom_id TEXT NOT NULL,
+                    page_id TEXT,
+                    document TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    deleted INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            self.connection.execute("CREATE TABLE IF NOT EXISTS pages (page_id TEXT PRIMARY KEY, metadata TEXT NOT NULL)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._load()
+        logger.info(f"Using local vector store at {self.path} with {self.count()} chunks")
+
+    def _load(self):
+        """Reads the side table into memory and maps the vector file."""
+        settings = dict(self.connection.execute("SELECT name, value FROM settings").fetchall())
+        self.dimensions: Optional[int] = int(settings["dimensions"]) if "dimensions" in settings else None
+        stored_quantization = settings.get("quantization", "none")
+        if self.dimensions is not None and stored_quantization != self.quantization:
+            raise ValueError(
+                f"The local vector store at {self.path} holds {stored_quantization} vectors, "
+                f"not {self.quantization}; re-ingest into a new path to change the quantization"
+            )
+        rows = self.connection.execute(
+            "SELECT row, custom_id, page_id, metadata, deleted FROM chunks ORDER BY row"
+        ).fetchall()
+        self.size = len(rows)
+        self.ids: Dict[str, int] = {}
+        self.pages: Dict[str, List[int]] = {}
+        self.custom_ids: List[str] = []
+        # Per row: the page it belongs to and the metadata stored inline (the page reference)
+        self.row_pages: List[Optional[str]] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.page_metadata: Dict[str, Dict[str, Any]] = {
+            page_id: json.loads(metadata) for page_id, metadata in self.connection.execute("SELECT page_id, metadata FROM pages")
+        }
+        self.alive = np.ones(max(self.size, 1), dtype=bool)
+        for row, custom_id, page_id, metadata, deleted in rows:
+            self.custom_ids.append(custom_id)
+            self.row_pages.append(page_id)
+            self.metadatas.append(json.loads(metadata))
+            if deleted:
+                self.alive[row] = False
+                continue
+            self.ids[custom_id] = row
+            if page_id is not None:
+                self.pages.setdefault(page_id, []).append(row)
+        self.matrix = None
+        self.scales = None
+        if self.dimensions is not None:
+            self._map(max(self.size, 1024))
+        self.graph: Optional[HNSWGraph] = None
+        self._load_graph()
+
+    def _vector_file(self) -> str:
+        return os.path.join(self.path, "vectors.i8" if self.quantization == "int8" else "vectors.f32")
+
+    def _scale_file(self) -> str:
+        return os.path.join(self.path, "scales.f32")
+
+    @staticmethod
+    def _grow_file(path: str, nbytes: int):
+        with open(path, "ab") as handle:
+            if handle.tell() < nbytes:
+                handle.truncate(nbytes)
+
+    def _map(self, capacity: int):
+        """(Re)maps the vector file with room for `capacity` rows, growing the file if needed."""
+        if self.matrix is not None:
+            self.matrix.flush()
+        dtype = np.int8 if self.quantization == "int8" else np.float32
+        self._grow_file(self._vector_file(), capacity * self.dimensions * np.dtype(dtype).itemsize)
+        self.matrix = np.memmap(self._vector_file(), dtype=dtype, mode="r+", shape=(capacity, self.dimensions))
+        if self.quantization == "int8":
+            if self.scales is not None:
+                self.scales.flush()
+            self._grow_file(self._scale_file(), capacity * 4)
+            self.scales = np.memmap(self._scale_file(), dtype=np.float32, mode="r+", shape=(capacity,))
+        if len(self.alive) < capacity:
+            self.alive = np.concatenate([self.alive, np.ones(capacity - len(self.alive), dtype=bool)])
+
+    def _graph_file(self) -> str:
+        return os.path.join(self.path, "hnsw.npz")
+
+    def _save_graph(self):
+        """
+        Writes the graph as flat integer arrays: one (row, level, neighbour count) entry per
+        non-empty adjacency list, and all neighbour lists concatenated in the same order.
+        """
+        rows, levels, counts, targets = [], [], [], []
+        for row, layers in enumerate(self.graph.neighbours):
+            for level, neighbours in layers.items():
+                rows.append(row)
+                levels.append(level)
+                counts.append(len(neighbours))
+                targets.extend(neighbours)
+        entry_point = -1 if self.graph.entry_point is None else self.graph.entry_point
+        temporary = self._graph_file() + ".tmp"
+        with open(temporary, "wb") as handle:
+            np.savez(
+                handle,
+                header=np.array([len(self.graph), entry_point, self.graph.max_level], dtype=np.int64),
+                rows=np.array(rows, dtype=np.int64), levels=np.array(levels, dtype=np.int64),
+                counts=np.array(counts, dtype=np.int64), targets=np.array(targets, dtype=np.int64),
+            )
+        os.replace(temporary, self._graph_file())
+
+    def _load_graph(self):
+        if self.index_method != "hnsw" or not os.path.exists(self._graph_file()):
+            return
+        # Plain integer arrays only: a tampered file cannot run code when it is loaded
+        with np.load(self._graph_file(), allow_pickle=False) as state:
+            (nodes, entry_point, max_level), rows, levels, counts, targets = (
+                state["header"].tolist(), state["rows"].tolist(), state["levels"].tolist(),
+                state["counts"], state["targets"].tolist(),
+            )
+        if nodes != self.size:
+            # Searches would otherwise fall back to an exact scan until the next build_index
+            logger.warning("HNSW graph is out of date with the vectors, rebuilding it")
+            self.build_index()
+            return
+        neighbours: List[Dict[int, List[int]]] = [{} for _ in range(nodes)]
+        ends = np.cumsum(counts).tolist()
+        for row, level, start, end in zip(rows, levels, [0] + ends[:-1], ends):
+            neighbours[row][level] = targets[start:end]
+        self.graph = self._new_graph()
+        self.graph.neighbours, self.graph.entry_point, self.graph.max_level = (
+            neighbours, None if entry_point < 0 else entry_point, max_level
+        )
+
+    def _new_graph(self) -> HNSWGraph:
+        return HNSWGraph(self._vectors, m=self.m, ef_construction=self.ef_construction)
+
+    def _store(self, start: int, vectors: np.ndarray):
+        """Writes normalized float32 rows from `start`, quantizing them when configured."""
+        end = start + len(vectors)
+        if self.quantization != "int8":
+            self.matrix[start:end] = vectors
+            return
+        # Symmetric per-row scale: the largest component maps to +-127
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        self.matrix[start:end] = np.rint(vectors / scales[:, None]).astype(np.int8)
+        self.scales[start:end] = scales
+
+    def _vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Returns the given rows as float32 vectors."""
+        if self.quantization != "int8":
+            return self.matrix[rows]
+        return self.matrix[rows].astype(np.float32) * self.scales[rows][:, None]
+
+    def _similarities(self, query: np.ndarray) -> np.ndarray:
+        """Returns the cosine similarity of every stored row to a normalized query."""
+        if self.quantization != "int8":
+            return self.matrix[:self.size] @ query
+        similarities = np.empty(self.size, dtype=np.float32)
+        for start in range(0, self.size, _SCAN_BLOCK_ROWS):
+            end = min(start + _SCAN_BLOCK_ROWS, self.size)
+            similarities[start:end] = (self.matrix[start:end].astype(np.float32) @ query) * self.scales[start:end]
+        return similarities
+
+    def _flush_rows(self, start: int, end: int):
+        """Writes rows [start, end) of the mapped vector (and scale) files to disk."""
+        for array in (self.matrix, self.scales):
+            if array is None or end <= start:
+                continue
+            row_bytes = array.strides[0]
+            # msync ranges must start on a page boundary
+            offset = start * row_bytes // mmap.ALLOCATIONGRANULARITY * mmap.ALLOCATIONGRANULARITY
+            array.base.flush(offset, end * row_bytes - offset)
+
+    def flush(self):
+        """Writes the mapped vectors and the HNSW graph to disk."""
+        with self._lock:
+            if self.matrix is not None:
+                self.matrix.flush()
+            if self.scales is not None:
+                self.scales.flush()
+            if self.graph is not None:
+                self._save_graph()
+
+    def count(self) -> int:
+        """Returns the number of live chunks."""
+        return len(self.ids)
+
+    def add_texts(self, texts: List[str], metadatas: List[Dict[str, Any]] = None, embeddings: List[List[float]] = None,
+                  ids: List[str] = None) -> None:
+        """
+        Appends the chunks that are not stored yet and tombstones the chunks of older versions of their pages.
+
+        Args:
+            texts (List[str]): List of texts to add.
+            metadatas (List[Dict[str, Any]], optional): List of metadata dictionaries. Defaults to None.
+            embeddings (List[List[float]], optional): List of embeddings. Computed when omitted.
+            ids (List[str], optional): Stable chunk ids. Derived from the metadata when omitted.
+        """
+        super().add_texts(texts, metadatas, ids)
+        if not texts:
+            return
+        metadatas = metadatas or [{} for _ in texts]
+        if ids is None or None in ids:
+            derived = self._derive_ids(texts, metadatas)
+            ids = derived if ids is None else [chunk_id or derived[i] for i, chunk_id in enumerate(ids)]
+
+        with self._lock:
+            self._tombstone_stale_versions(metadatas)
+            self._upsert_pages(metadatas)
+            new_rows = [i for i, chunk_id in enumerate(ids) if chunk_id not in self.ids]
+            if not new_rows:
+                return
+            new_embeddings = (
+                [embeddings[i] for i in new_rows] if embeddings is not None
+                else self.embedder.embed_documents([texts[i] for i in new_rows])
+            )
+            vectors = np.asarray(new_embeddings, dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms == 0, 1, norms)
+
+            if self.dimensions is None:
+                self.dimensions = vectors.shape[1]
+                with self.connection:
+                    self.connection.executemany(
+                        "INSERT INTO settings (name, value) VALUES (?, ?)",
+                        [("dimensions", str(self.dimensions)), ("quantization", self.quantization)],
+                    )
+                self._map(max(1024, len(new_rows)))
+            if self.size + len(new_rows) > len(self.matrix):
+                # Double the file so appends stay amortized O(1)
+                self._map(max(2 * len(self.matrix), self.size + len(new_rows)))
+
+            start = self.size
+            self._store(start, vectors)
+            records = []
+            for offset, i in enumerate(new_rows):
+                row = start + offset
+                page_id = page_id_of(metadatas[i])
+                reference = page_reference(metadatas[i])
+                records.append((row, ids[i], page_id, texts[i], json.dumps(reference)))
+                self.ids[ids[i]] = row
+                self.custom_ids.append(ids[i])
+                self.row_pages.append(page_id)
+                self.metadatas.append(reference)
+                self.alive[row] = True
+                if page_id is not None:
+                    self.pages.setdefault(page_id, []).append(row)
+            with self.connection:
+                self.connection.executemany(
+                    "INSERT INTO chunks (row, custom_id, page_id, document, metadata) VALUES (?, ?, ?, ?, ?)", records
+                )
+            self.size += len(new_rows)
+            if self.graph is not None:
+                for row in range(start, self.size):
+                    self.graph.add(row)
+            # The side table is committed; write the new rows so a reopened store agrees with it. The graph
+            # is saved by build_index and flush, and a graph that missed appends is rebuilt on load
+            self._flush_rows(start, self.size)
+        logger.info(f"Appended {len(new_rows)} of {len(texts)} chunks to the local vector store")
+        self._maybe_compact()
+
+    def _upsert_pages(self, metadatas: List[Dict[str, Any]]):
+        """Stores the metadata of the pages being written, once per page."""
+        pages = {page_id_of(metadata): metadata for metadata in metadatas}
+        pages.pop(None, None)
+        changed = {page_id: metadata for page_id, metadata in pages.items() if self.page_metadata.get(page_id) != metadata}
+        if not changed:
+            return
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO pages (page_id, metadata) VALUES (?, ?)",
+                [(page_id, json.dumps(metadata)) for page_id, metadata in changed.items()],
+            )
+        self.page_metadata.update(changed)
+
+    def _metadata(self, row: int) -> Dict[str, Any]:
+        """Returns the full metadata of a row: its page metadata overlaid with what the row stores inline."""
+        page = self.page_metadata.get(self.row_pages[row])
+        return {**page, **self.metadatas[row]} if page else self.metadatas[row]
+
+    @staticmethod
+    def _derive_ids(texts: List[str], metadatas: List[Dict[str, Any]]) -> List[str]:
+        ordinals: Dict[Any, int] = {}
+        ids = []
+        for text, metadata in zip(texts, metadatas):
+            page_id = metadata.get("id")
+            ordinal = ordinals.get(page_id, 0)
+            ordinals[page_id] = ordinal + 1
+            ids.append(make_chunk_id(page_id, metadata.get("version"), ordinal, text))
+        return ids
+
+    def _tombstone(self, rows: List[int]):
+        if not rows:
+            return
+        for row in rows:
+            self.alive[row] = False
+            self.ids.pop(self.custom_ids[row], None)
+        with self.connection:
+            self.connection.executemany("UPDATE chunks SET deleted = 1 WHERE row = ?", [(row,) for row in rows])
+
+    def _tombstone_stale_versions(self, metadatas: List[Dict[str, Any]]):
+        """Tombstones the stored chunks of the given pages whose version differs from the one being written."""
+        versions = {str(m["id"]): m.get("version") for m in metadatas if m.get("id") is not None}
+        stale = []
+        for page_id, version in versions.items():
+            rows = self.pages.get(page_id, [])
+            keep = [row for row in rows if self.metadatas[row].get("version") == version]
+            stale.extend(row for row in rows if self.metadatas[row].get("version") != version)
+            self.pages[page_id] = keep
+        self._tombstone(stale)
+
+    def delete_by_page(self, page_ids: List[str]) -> None:
+        super().delete_by_page(page_ids)
+        with self._lock:
+            rows = [row for page_id in page_ids for row in self.pages.pop(page_id, [])]
+            self._tombstone(rows)
+            with self.connection:
+                self.connection.executemany("DELETE FROM pages WHERE page_id = ?", [(page_id,) for page_id in page_ids])
+            for page_id in page_ids:
+                self.page_metadata.pop(page_id, None)
+        logger.info(f"Deleted {len(rows)} chunks for {len(page_ids)} pages from the local vector store")
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self.size and (self.size - self.count()) / self.size > self.compact_threshold:
+            self.compact()
+
+    def compact(self):
+        """Rewrites the matrix and side table without tombstoned rows and rebuilds the graph."""
+        with self._lock:
+            survivors = np.flatnonzero(self.alive[:self.size])
+            if len(survivors) == self.size:
+                return
+            logger.info(f"Compacting local vector store: {self.size - len(survivors)} of {self.size} rows are tombstones")
+            # Rows move as stored: re-quantizing dequantized int8 rows would compound the rounding error
+            vectors = np.array(self.matrix[survivors]) if self.matrix is not None else None
+            scales = np.array(self.scales[survivors]) if self.scales is not None else None
+            rows = self.connection.execute(
+                "SELECT row, custom_id, page_id, document, metadata FROM chunks WHERE deleted = 0 ORDER BY row"
+            ).fetchall()
+            with self.connection:
+                self.connection.execute("DELETE FROM chunks")
+                self.connection.executemany(
+                    "INSERT INTO chunks (row, custom_id, page_id, document, metadata) VALUES (?, ?, ?, ?, ?)",
+                    [(new_row, *record[1:]) for new_row, record in enumerate(rows)],
+                )
+            if vectors is not None:
+                self.matrix[:len(vectors)] = vectors
+                if scales is not None:
+                    self.scales[:len(scales)] = scales
+                self._flush_rows(0, len(vectors))
+                # Release the mappings before shrinking the files to the surviving rows
+                itemsize = self.matrix.dtype.itemsize
+                self.matrix, self.scales = None, None
+                os.truncate(self._vector_file(), len(vectors) * self.dimensions * itemsize)
+                if self.quantization == "int8":
+                    os.truncate(self._scale_file(), len(vectors) * 4)
+            if os.path.exists(self._graph_file()):
+                os.remove(self._graph_file())
+            self._load()
+            if self.index_method == "hnsw" and self.size >= self.index_min_rows:
+                self.build_index()
+
+    def build_index(self, rebuild: bool = False) -> bool:
+        """
+        Builds the HNSW graph over the stored rows if the store is configured for it and large enough.
+
+        Args:
+            rebuild (bool): Rebuilds an existing graph.
+
+        Returns:
+            bool: True if a graph was built.
+        """
+        with self._lock:
+            if self.index_method != "hnsw" or self.size < self.index_min_rows:
+                return False
+            if self.graph is not None and not rebuild:
+                # Saves the rows appended to the graph since it was last written
+                self.flush()
+                return False
+            graph = self._new_graph()
+            for row in range(self.size):
+                graph.add(row)
+            self.graph = graph
+            self.flush()
+        logger.info(f"Built HNSW graph over {self.size} rows of the local vector store")
+        return True
+
+    def similarity_search(self, query: str, k: int = 4, filters: FilterLike = None) -> List[Tuple[str, float]]:
+        super().similarity_search(query, k, filters)
+        return self.similarity_search_by_vector(self.embedder.embed_query(query), k, query=query, filters=filters)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, query: str = None,
+                                    filters: FilterLike = None, ef_search: int = None) -> List[Tuple[str, float]]:
+        """
+        Returns the k chunks nearest to a query embedding with their cosine distance.
+
+        Args:
+            embedding (List[float]): The query embedding.
+            k (int): The number of results. Defaults to 4.
+            query (str, optional): Unused; the local store ranks by embedding only.
+            filters (FilterLike, optional): Metadata filter, evaluated on the in-memory side table.
+            ef_search (int, optional): HNSW candidate list size for this query only.
+        """
+        super().similarity_search_by_vector(embedding, k, query, filters)
+        return [(document, distance) for document, _, distance in self.search(embedding, k, filters, ef_search)]
+
+    def _allowed(self, filters: FilterLike) -> np.ndarray:
+        allowed = self.alive[:self.size].copy()
+        node = as_filter(filters)
+        if node is not None:
+            # Evaluated once per page rather than once per chunk
+            matching_pages = {page_id: node.matches(metadata) for page_id, metadata in self.page_metadata.items()}
+            allowed &= np.fromiter(
+                (
+                    matching_pages[page_id] if page_id in matching_pages else node.matches(self._metadata(row))
+                    for row, page_id in enumerate(self.row_pages)
+                ),
+                dtype=bool, count=self.size,
+            )
+        return allowed
+
+    def search(self, embedding: List[float], k: int = 4, filters: FilterLike = None,
+               ef_search: int = None) -> List[Tuple[str, Dict[str, Any], float]]:
+        """Returns (document, metadata, distance) tuples for the k nearest live chunks passing the filter."""
+        with self._lock:
+            if self.matrix is None or self.size == 0:
+                return []
+            query = np.asarray(embedding, dtype=np.float32)
+            query /= np.linalg.norm(query) or 1.0
+            allowed = self._allowed(filters)
+            if self.graph is not None and len(self.graph) == self.size:
+                rows, distances = self._graph_search(query, k, allowed, ef_search)
+            else:
+                rows, distances = self._exact_search(query, k, allowed)
+            documents = self._documents(rows)
+            return [(documents[row], self._metadata(row), float(distance)) for row, distance in zip(rows, distances)]
+
+    def _exact_search(self, query: np.ndarray, k: int, allowed: np.ndarray) -> Tuple[List[int], List[float]]:
+        distances = 1.0 - self._similarities(query)
+        distances[~allowed] = np.inf
+        k = min(k, int(allowed.sum()))
+        if k == 0:
+            return [], []
+        # argpartition finds the k smallest in O(n); only those k are sorted
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        return top.tolist(), distances[top].tolist()
+
+    def _graph_search(self, query: np.ndarray, k: int, allowed: np.ndarray,
+                      ef_search: Optional[int]) -> Tuple[List[int], List[float]]:
+        ef = max(int(ef_search or self.ef_search), k)
+        selectivity = allowed.sum() / self.size
+        if selectivity == 0:
+            return [], []
+        # Like the pgvector planner: widen the candidate list for a filter, or scan exactly when the
+        # widened graph walk would touch more vectors than a full scan
+        candidates_needed = math.ceil(ef / selectivity)
+        if candidates_needed * self.m > self.size:
+            return self._exact_search(query, k, allowed)
+        candidates = self.graph.search(query, k, candidates_needed)
+        results = [(distance, row) for distance, row in candidates if allowed[row]][:k]
+        return [row for _, row in results], [distance for distance, _ in results]
+
+    def _documents(self, rows: List[int]) -> Dict[int, str]:
+        if not rows:
+            return {}
+        placeholders = ",".join("?" for _ in rows)
+        found = self.connection.execute(
+            f"SELECT row, document FROM chunks WHERE row IN ({placeholders})", rows
+        ).fetchall()
+        return dict(found)
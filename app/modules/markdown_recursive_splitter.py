@@ -1,37 +1,142 @@
-from typing import List, Dict, Any
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import List, Dict, Any, Deque, Iterable, Iterator, Optional, Tuple
 
 from langchain.text_splitter import MarkdownTextSplitter, RecursiveCharacterTextSplitter
-from app.core.chunking import ChunkingStrategy
+from app.core.chunking import Chunk, ChunkingStrategy, make_chunk_id, page_id_of
 from app.core.config import Config
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-class MarkdownRecursiveChunking(ChunkingStrategy):
-    def __init__(self, config: Config):
-        chunking_config = config.get("chunking", {})
-        self.markdown_splitter = MarkdownTextSplitter(
+Splitters = Tuple[MarkdownTextSplitter, RecursiveCharacterTextSplitter]
+
+# Splitters of a pool worker process, built once by _init_worker
+_worker_splitters: Optional[Splitters] = None
+
+
+def _build_splitters(chunking_config: Dict[str, Any]) -> Splitters:
+    return (
+        MarkdownTextSplitter(
             chunk_size=chunking_config.get("markdown_chunk_size", 1000),
             chunk_overlap=chunking_config.get("markdown_chunk_overlap", 0),
-        )
-        self.recursive_splitter = RecursiveCharacterTextSplitter(
+        ),
+        RecursiveCharacterTextSplitter(
             chunk_size=chunking_config.get("recursive_chunk_size", 200),
             chunk_overlap=chunking_config.get("recursive_chunk_overlap", 50),
-        )
+        ),
+    )
+
+
+def _split_document(document: Dict[str, Any], splitters: Splitters) -> List[Chunk]:
+    markdown_splitter, recursive_splitter = splitters
+    markdown_chunks = markdown_splitter.split_text(document["page_content"])
+    metadata = document["metadata"]
+    page_id = page_id_of(metadata)
+    chunks = []
+    for markdown_chunk in markdown_chunks:
+        recursive_chunks = recursive_splitter.split_text(markdown_chunk)
+        for recursive_chunk in recursive_chunks:
+            chunks.append(
+                Chunk(
+                    page_content=recursive_chunk,
+                    page_id=page_id,  # The page metadata stays with the document
+                    chunk_id=make_chunk_id(metadata.get("id"), metadata.get("version"), len(chunks), recursive_chunk),
+                )
+            )
+    return chunks
+
+
+def _init_worker(chunking_config: Dict[str, Any]):
+    global _worker_splitters
+    _worker_splitters = _build_splitters(chunking_config)
+
 
-        logger.info("Initialized MarkdownRecursiveChunking strategy")
+def _chunk_task(documents: List[Dict[str, Any]]) -> List[List[Chunk]]:
+    return [_split_document(document, _worker_splitters) for document in documents]
 
-    def chunk_document(self, document: Dict[str, Any]) -> List[Dict[str, Any]]:
+
+class MarkdownRecursiveChunking(ChunkingStrategy):
+    """
+    Splits Markdown into sections, then sections into overlapping character chunks.
+
+    With `workers` set, `chunk_documents` spreads documents over a process pool: they are
+    submitted in tasks of `task_size` documents, at most `max_pending_tasks` tasks are in
+    flight (so a streaming loader is not drained into memory), and results are yielded in
+    input order or as soon as each task completes.
+    """
+
+    def __init__(self, config: Config):
+        chunking_config = config.get("chunking", {})
+        self.chunking_config = dict(chunking_config)
+        self.splitters = _build_splitters(chunking_config)
+        self.markdown_splitter, self.recursive_splitter = self.splitters
+        workers = chunking_config.get("workers", 0)
+        self.workers = (os.cpu_count() or 1) if workers is None else int(workers)
+        self.task_size = max(1, int(chunking_config.get("task_size", 8)))
+        self.max_pending_tasks = max(1, int(chunking_config.get("max_pending_tasks") or 2 * max(self.workers, 1)))
+        self.ordered = bool(chunking_config.get("ordered", True))
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+        logger.info(f"Initialized MarkdownRecursiveChunking strategy with {self.workers or 'no'} worker processes")
+
+    def chunk_document(self, document: Dict[str, Any]) -> List[Chunk]:
         super().chunk_document(document)
-        markdown_chunks = self.markdown_splitter.split_text(document["page_content"])
-        chunks = []
-        for markdown_chunk in markdown_chunks:
-            recursive_chunks = self.recursive_splitter.split_text(markdown_chunk)
-            for recursive_chunk in recursive_chunks:
-                chunks.append(
-                    {
-                        "page_content": recursive_chunk,
-                        "metadata": document["metadata"],  # Keep original metadata
-                    }
+        return _split_document(document, self.splitters)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # Spawned rather than forked: the parent runs pipeline threads and AWS clients
+                # whose locks must not be copied mid-use into the workers
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.chunking_config,),
                 )
-        return chunks
\ No newline at end of file
+            return self._executor
+
+    def chunk_documents(self, documents: Iterable[Dict[str, Any]], ordered: Optional[bool] = None) -> Iterator[List[Chunk]]:
+        if self.workers <= 0:
+            yield from super().chunk_documents(documents, ordered)
+            return
+        ordered = self.ordered if ordered is None else ordered
+        executor = self._get_executor()
+        iterator = iter(documents)
+        pending: Deque[Future] = deque()
+        try:
+            while True:
+                task = list(islice(iterator, self.task_size))
+                if task:
+                    for document in task:
+                        super().chunk_document(document)  # Fail fast in the caller on malformed input
+                    pending.append(executor.submit(_chunk_task, task))
+                if not pending:
+                    return
+                if task and len(pending) < self.max_pending_tasks:
+                    continue
+                # Full, or the input is exhausted: yield the next finished task
+                if ordered:
+                    finished = [pending.popleft()]
+                else:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        pending.remove(future)
+                for future in finished:
+                    yield from future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def close(self):
+        """Shuts down the worker processes, if they were started."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
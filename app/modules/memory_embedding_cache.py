@@ -0,0 +1,37 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List
+
+from app.core.embedding_cache import EmbeddingCache
+
+class MemoryEmbeddingCache(EmbeddingCache):
+    """In-process LRU of embeddings, for hot query embeddings that are not worth a disk round trip."""
+
+    def __init__(self, max_entries: int = 10000):
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        super().get_many(keys)
+        found = {}
+        with self._lock:
+            for key in keys:
+                embedding = self._entries.get(key)
+                if embedding is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = embedding
+        return found
+
+    def put_many(self, entries: Dict[str, List[float]]) -> None:
+        super().put_many(entries)
+        with self._lock:
+            for key, embedding in entries.items():
+                self._entries[key] = embedding
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -0,0 +1,46 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.core.response_cache import ResponseCache
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class MemoryResponseCache(ResponseCache):
+    """In-process LRU cache whose entries also expire `ttl_seconds` after they were stored."""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        super().get(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        self.record(entry is not None)
+        return entry[0] if entry is not None else None
+
+    def put(self, key: str, response: str) -> None:
+        super().put(key, response)
+        with self._lock:
+            self._entries[key] = (response, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
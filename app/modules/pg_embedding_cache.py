@@ -0,0 +1,80 @@
+from typing import Dict, List
+
+import sqlalchemy
+
+from app.core.embedding_cache import EmbeddingCache
+from app.core.config import Config
+from app.modules.pg_pool import TableRowCount, get_engine
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class PGEmbeddingCache(EmbeddingCache):
+    def __init__(self, config: Config):
+        super().__init__()
+        db_config = config.get_database_config()
+        cache_config = config.get("embeddings", {}).get("cache", {})
+        self.table_name = cache_config.get("table_name", "embedding_cache")
+        self.max_entries = cache_config.get("max_entries", 1_000_000)
+        self.engine = get_engine(db_config)
+        self.row_count = TableRowCount(self.table_name)
+
+        with self.engine.begin() as connection:
+            connection.execute(
+                sqlalchemy.text(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {self.table_name} (
+                        cache_key TEXT PRIMARY KEY,
+                        embedding REAL[] NOT NULL,
+                        accessed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    )
+                    """
+                )
+            )
+            connection.execute(
+                sqlalchemy.text(
+                    f"CREATE INDEX IF NOT EXISTS {self.table_name}_accessed_at ON {self.table_name} (accessed_at)"
+                )
+            )
+
+        logger.info(f"Using Postgres embedding cache table {self.table_name} with max entries: {self.max_entries}")
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        super().get_many(keys)
+        if not keys:
+            return {}
+        # Refresh the access time of the hits and return them in a single round-trip
+        statement = sqlalchemy.text(
+            f"UPDATE {self.table_name} SET accessed_at = now() "
+            f"WHERE cache_key = ANY(:keys) RETURNING cache_key, embedding"
+        )
+        with self.engine.begin() as connection:
+            rows = connection.execute(statement, {"keys": keys}).fetchall()
+        return {cache_key: list(embedding) for cache_key, embedding in rows}
+
+    def put_many(self, entries: Dict[str, List[float]]) -> None:
+        super().put_many(entries)
+        if not entries:
+            return
+        # One multi-row INSERT, so its rowcount is the number of new keys
+        values = ", ".join(f"(:cache_key_{i}, :embedding_{i})" for i in range(len(entries)))
+        parameters = {}
+        for i, (key, embedding) in enumerate(entries.items()):
+            parameters[f"cache_key_{i}"], parameters[f"embedding_{i}"] = key, embedding
+        statement = sqlalchemy.text(
+            f"INSERT INTO {self.table_name} (cache_key, embedding) VALUES {values} "
+            f"ON CONFLICT (cache_key) DO NOTHING"
+        )
+        evict = sqlalchemy.text(
+            f"DELETE FROM {self.table_name} WHERE cache_key IN ("
+            f"SELECT cache_key FROM {self.table_name} ORDER BY accessed_at LIMIT :overflow)"
+        )
+        evicted = 0
+        with self.engine.begin() as connection:
+            inserted = connection.execute(statement, parameters).rowcount
+            overflow = self.row_count.overflow(connection, inserted, self.max_entries)
+            if overflow:
+                evicted = connection.execute(evict, {"overflow": overflow}).rowcount
+        if evicted:
+            self.row_count.evicted(evicted)
+            logger.info(f"Evicted {evicted} entries from the embedding cache")
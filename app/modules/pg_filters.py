@@ -0,0 +1,106 @@
+import json
+import re
+from typing import Any, Dict, List
+
+import sqlalchemy
+
+from app.core.filters import And, Eq, Exists, FilterLike, In, MetadataFilter, Range, as_filter
+
+# Field names are inlined so predicates match the expression indexes; anything else is bound
+_FIELD_PATTERN = re.compile(r"^[A-Za-z0-9_\-]+$")
+_RANGE_OPERATORS = {"gte": ">=", "gt": ">", "lte": "<=", "lt": "<"}
+
+def _field(field: str) -> str:
+    if not _FIELD_PATTERN.match(field):
+        raise ValueError(f"Unsupported metadata field name: {field!r}")
+    return field
+
+def _bind(params: Dict[str, Any], value: Any) -> str:
+    name = f"filter_{len(params)}"
+    params[name] = value
+    return f":{name}"
+
+def _compile(node: MetadataFilter, params: Dict[str, Any], alias: str, column: str) -> str:
+    document = f"CAST({alias}.{column} AS jsonb)"
+    if isinstance(node, Eq):
+        field = _field(node.field)
+        # Containment serves both scalar fields and list fields such as labels from the GIN index
+        scalar = _bind(params, json.dumps({field: node.value}))
+        listed = _bind(params, json.dumps({field: [node.value]}))
+        return f"({document} @> CAST({scalar} AS jsonb) OR {document} @> CAST({listed} AS jsonb))"
+    if isinstance(node, In):
+        if not node.values:
+            return "FALSE"
+        return "(" + " OR ".join(_compile(Eq(node.field, value), params, alias, column) for value in node.values) + ")"
+    if isinstance(node, Range):
+        field = _field(node.field)
+        expression = range_expression(field, node.numeric, alias, column)
+        return "(" + " AND ".join(
+            f"{expression} {_RANGE_OPERATORS[name]} {_bind(params, bound)}" for name, bound in node.bounds().items()
+        ) + ")"
+    if isinstance(node, Exists):
+        return f"({document} ? '{_field(node.field)}')"
+    if isinstance(node, And):
+        return "(" + " AND ".join(_compile(part, params, alias, column) for part in node.filters) + ")"
+    raise TypeError(f"Unsupported filter type {type(node).__name__}")
+
+def range_expression(field: str, numeric: bool, alias: str = "e", column: str = "cmetadata") -> str:
+    """The expression a range predicate compares, identical to the B-tree index expression on the field."""
+    prefix = f"{alias}." if alias else ""
+    if numeric:
+        return f"CAST({prefix}{column}->>'{_field(field)}' AS numeric)"
+    return f"({prefix}{column}->>'{_field(field)}')"
+
+def metadata_filter_clause(filters: FilterLike, params: Dict[str, Any], alias: str = "e",
+                           column: str = "cmetadata") -> str:
+    """
+    Compiles metadata filters into SQL conditions on a json metadata column.
+
+    Equality and membership compile to jsonb containment, existence to the `?` operator
+    (both served by the GIN index from `ensure_metadata_indexes`) and ranges to comparisons
+    on `cmetadata->>'<field>'` (served by the per-field B-tree indexes). Values are always
+    bound as parameters.
+
+    Args:
+        filters (FilterLike): A MetadataFilter or the `{field: value or list of values}` shorthand.
+        params (Dict[str, Any]): The statement parameters, extended in place.
+        alias (str): The alias of the table holding the metadata in the statement.
+        column (str): The metadata column, `cmetadata` of the chunks or `metadata` of the pages.
+
+    Returns:
+        str: The conditions prefixed with AND, or an empty string.
+    """
+    node = as_filter(filters)
+    if node is None:
+        return ""
+    return " AND " + _compile(node, params, alias, column)
+
+def metadata_index_names(table: str, column: str, btree_fields: Dict[str, str] = None) -> List[str]:
+    """Returns the names of the GIN index and the per-field B-tree indexes `ensure_metadata_indexes` creates."""
+    return [f"{table}_{column}_gin_idx"] + [
+        f"{table}_meta_{_field(field).replace('-', '_')}_idx" for field in (btree_fields or {})
+    ]
+
+def ensure_metadata_indexes(connection, btree_fields: Dict[str, str] = None, table: str = "langchain_pg_embedding",
+                            column: str = "cmetadata"):
+    """
+    Creates the GIN index on a metadata column and a B-tree index per range-filtered field.
+
+    langchain stores the metadata as `json`, so both are expression indexes over `jsonb`
+    and text casts of it, matching what `metadata_filter_clause` emits.
+
+    Args:
+        connection: An open connection or session.
+        btree_fields (Dict[str, str], optional): Field -> "text" or "numeric", e.g. {"last_modified": "text"}.
+        table (str): The table holding the metadata.
+        column (str): The metadata column.
+    """
+    gin_index, *btree_indexes = metadata_index_names(table, column, btree_fields)
+    statements: List[str] = [
+        f"CREATE INDEX IF NOT EXISTS {gin_index} ON {table} USING gin ((CAST({column} AS jsonb)))"
+    ]
+    for index, (field, kind) in zip(btree_indexes, (btree_fields or {}).items()):
+        expression = range_expression(field, kind == "numeric", alias="", column=column)
+        statements.append(f"CREATE INDEX IF NOT EXISTS {index} ON {table} (collection_id, ({expression}))")
+    for statement in statements:
+        connection.execute(sqlalchemy.text(statement))
@@ -0,0 +1,139 @@
+import json
+from typing import Any, Dict, List, Optional
+
+import sqlalchemy
+
+from app.core.chunking import page_id_of, page_reference
+from app.core.filters import FilterLike
+from app.modules.pg_filters import ensure_metadata_indexes, metadata_filter_clause, metadata_index_names
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+PAGE_TABLE = "langchain_pg_page"
+
+
+def page_join(alias: str = "e") -> str:
+    """Joins each chunk row to its page's metadata, as `p`. Rows without a page keep their inline metadata."""
+    return (
+        f"LEFT JOIN {PAGE_TABLE} p ON p.collection_id = {alias}.collection_id "
+        f"AND p.page_id = {alias}.cmetadata->>'id'"
+    )
+
+
+def merged_metadata(alias: str = "e") -> str:
+    """The chunk's full metadata: the page metadata overlaid with what the chunk stores inline."""
+    return f"COALESCE(p.metadata, jsonb_build_object()) || CAST({alias}.cmetadata AS jsonb)"
+
+
+def page_filter_clause(filters: FilterLike, params: Dict[str, Any]) -> str:
+    """Compiles metadata filters against the page metadata joined in by `page_join`."""
+    return metadata_filter_clause(filters, params, alias="p", column="metadata")
+
+
+class PGPageStore:
+    """
+    Stores page-level metadata once per page instead of on every chunk.
+
+    Chunk rows in `langchain_pg_embedding` keep only the page reference (`PAGE_REFERENCE_FIELDS`)
+    in `cmetadata`; the full metadata of each page lives in `langchain_pg_page`, keyed by
+    (collection, page id). Searches join it back in (`page_join`, `merged_metadata`) and
+    metadata filters are evaluated on it, so the filter indexes cover one row per page
+    rather than one per chunk.
+    """
+
+    def __init__(self, engine: sqlalchemy.engine.Engine, collection_name: str):
+        self.engine = engine
+        self.collection_name = collection_name
+
+    def ensure_table(self, btree_fields: Optional[Dict[str, str]] = None):
+        """
+        Creates the pages table and its filter indexes.
+
+        When the table is new, the page metadata of chunks written before it existed is moved
+        into it and their inline metadata is reduced to the page reference.
+
+        Args:
+            btree_fields (Dict[str, str], optional): Range-filtered fields, see `ensure_metadata_indexes`.
+        """
+        with self.engine.begin() as connection:
+            exists = connection.execute(sqlalchemy.text(f"SELECT to_regclass('{PAGE_TABLE}')")).scalar()
+            connection.execute(sqlalchemy.text(
+                f"CREATE TABLE IF NOT EXISTS {PAGE_TABLE} ("
+                "collection_id uuid NOT NULL REFERENCES langchain_pg_collection (uuid) ON DELETE CASCADE, "
+                "page_id text NOT NULL, "
+                "metadata jsonb NOT NULL, "
+                "PRIMARY KEY (collection_id, page_id))"
+            ))
+            ensure_metadata_indexes(connection, btree_fields, table=PAGE_TABLE, column="metadata")
+            if exists is None:
+                self._migrate_inline_metadata(connection, btree_fields)
+
+    @staticmethod
+    def _migrate_inline_metadata(connection, btree_fields: Optional[Dict[str, str]]):
+        moved = connection.execute(sqlalchemy.text(
+            f"INSERT INTO {PAGE_TABLE} (collection_id, page_id, metadata) "
+            "SELECT DISTINCT ON (collection_id, cmetadata->>'id') collection_id, cmetadata->>'id', CAST(cmetadata AS jsonb) "
+            "FROM langchain_pg_embedding WHERE cmetadata->>'id' IS NOT NULL "
+            "ORDER BY collection_id, cmetadata->>'id' "
+            "ON CONFLICT DO NOTHING"
+        )).rowcount
+        if not moved:
+            return
+        metadata_type = connection.execute(sqlalchemy.text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_name = 'langchain_pg_embedding' AND column_name = 'cmetadata'"
+        )).scalar()
+        reduced = connection.execute(sqlalchemy.text(
+            "UPDATE langchain_pg_embedding SET cmetadata = CAST(jsonb_strip_nulls(jsonb_build_object("
+            "'id', CAST(cmetadata AS jsonb)->'id', 'version', CAST(cmetadata AS jsonb)->'version')) "
+            f"AS {metadata_type}) WHERE cmetadata->>'id' IS NOT NULL"
+        )).rowcount
+        # The chunk-level filter indexes are superseded by the ones on the pages table
+        for index in metadata_index_names("langchain_pg_embedding", "cmetadata", btree_fields):
+            connection.execute(sqlalchemy.text(f"DROP INDEX IF EXISTS {index}"))
+        logger.info(f"Moved the metadata of {moved} pages out of {reduced} chunk rows into {PAGE_TABLE}")
+
+    def upsert(self, metadatas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Writes the metadata of the pages the chunks belong to, once per page.
+
+        Args:
+            metadatas (List[Dict[str, Any]]): The metadata of each chunk, usually shared per page.
+
+        Returns:
+            List[Dict[str, Any]]: The metadata to store inline with each chunk (see `page_reference`).
+        """
+        pages: Dict[str, Dict[str, Any]] = {}
+        for metadata in metadatas:
+            page_id = page_id_of(metadata)
+            if page_id is not None:
+                pages[page_id] = metadata
+        if pages:
+            with self.engine.begin() as connection:
+                connection.execute(
+                    sqlalchemy.text(
+                        f"INSERT INTO {PAGE_TABLE} (collection_id, page_id, metadata) "
+                        "SELECT c.uuid, p.page_id, CAST(p.metadata AS jsonb) "
+                        "FROM langchain_pg_collection c, "
+                        "unnest(CAST(:page_ids AS TEXT[]), CAST(:metadatas AS TEXT[])) AS p(page_id, metadata) "
+                        "WHERE c.name = :collection_name "
+                        "ON CONFLICT (collection_id, page_id) DO UPDATE SET metadata = EXCLUDED.metadata"
+                    ),
+                    {
+                        "collection_name": self.collection_name,
+                        "page_ids": list(pages),
+                        "metadatas": [json.dumps(metadata) for metadata in pages.values()],
+                    },
+                )
+        return [page_reference(metadata) for metadata in metadatas]
+
+    def delete(self, connection, page_ids: List[str]):
+        """Deletes the metadata of the given pages, on the caller's connection."""
+        connection.execute(
+            sqlalchemy.text(
+                f"DELETE FROM {PAGE_TABLE} p USING langchain_pg_collection c "
+                "WHERE p.collection_id = c.uuid AND c.name = :collection_name AND p.page_id = ANY(:page_ids)"
+            ),
+            {"collection_name": self.collection_name, "page_ids": page_ids},
+        )
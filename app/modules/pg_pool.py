@@ -0,0 +1,218 @@
+import threading
+import time
+from typing import Any, Dict
+
+import sqlalchemy
+from sqlalchemy.pool import QueuePool
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_ENGINES: Dict[str, sqlalchemy.engine.Engine] = {}
+_ENGINES_LOCK = threading.Lock()
+
+class PoolMetrics:
+    """Time spent waiting for a pooled connection and running statements. Thread-safe."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.max_query_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def record_query(self, seconds: float):
+        with self._lock:
+            self.queries += 1
+            self.query_seconds += seconds
+            self.max_query_seconds = max(self.max_query_seconds, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "avg_wait_ms": round(self.wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+                "queries": self.queries,
+                "avg_query_ms": round(self.query_seconds / self.queries * 1000, 3) if self.queries else 0.0,
+                "max_query_ms": round(self.max_query_seconds * 1000, 3),
+            }
+
+class TimedQueuePool(QueuePool):
+    """A QueuePool that records how long each checkout waited for a free connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.metrics.record_wait(time.perf_counter() - started)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+def _instrument(engine: sqlalchemy.engine.Engine, metrics: PoolMetrics):
+    # One start time per connection: a connection runs one statement at a time, and a statement
+    # that fails never reaches after_cursor_execute, so its start is simply overwritten by the next
+    @sqlalchemy.event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started_at"] = time.perf_counter()
+
+    @sqlalchemy.event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("query_started_at", None)
+        if started is not None:
+            metrics.record_query(time.perf_counter() - started)
+
+    @sqlalchemy.event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        if context.connection is not None:
+            context.connection.info.pop("query_started_at", None)
+
+def database_url(db_config: Dict[str, Any]) -> sqlalchemy.engine.URL:
+    """The database URL; user and password are escaped, so they may contain '@', ':', '/' or '%'."""
+    port = db_config.get("port")
+    return sqlalchemy.engine.URL.create(
+        "postgresql",
+        username=db_config.get("user"),
+        password=db_config.get("password"),
+        host=db_config.get("host"),
+        port=int(port) if port else None,
+        database=db_config.get("dbname"),
+        query={"sslmode": "require"},
+    )
+
+def connection_string(db_config: Dict[str, Any]) -> str:
+    return database_url(db_config).render_as_string(hide_password=False)
+
+def get_engine(db_config: Dict[str, Any]) -> sqlalchemy.engine.Engine:
+    """
+    Returns the process-wide pooled engine for a database, creating it on first use.
+
+    Every store and cache pointed at the same database shares one pool, so TLS handshakes
+    and authentication are paid once per pooled connection instead of once per component.
+    The `database.pool` config section sets the pool bounds (`min_size` connections are kept
+    open, up to `max_size` under load), how long a connection lives (`recycle_seconds`),
+    whether it is health-checked on checkout (`pre_ping`) and the server-side
+    `statement_timeout_ms` applied to every session.
+
+    Args:
+        db_config (Dict[str, Any]): The database config, as returned by `Config.get_database_config`.
+
+    Returns:
+        sqlalchemy.engine.Engine: The shared engine. Its pool metrics are on `engine.pool.metrics`.
+    """
+    url = database_url(db_config)
+    key = url.render_as_string(hide_password=False)
+    with _ENGINES_LOCK:
+        engine = _ENGINES.get(key)
+        if engine is not None:
+            return engine
+
+        pool_config = db_config.get("pool") or {}
+        min_size = int(pool_config.get("min_size") or 2)
+        max_size = max(min_size, int(pool_config.get("max_size") or 10))
+        statement_timeout_ms = int(pool_config.get("statement_timeout_ms") or 0)
+        connect_args = {
+            "connect_timeout": int(pool_config.get("connect_timeout") or 10),
+            # Detect dead peers on long-lived connections instead of hanging on them
+            "keepalives": 1,
+            "keepalives_idle": int(pool_config.get("keepalives_idle_seconds") or 30),
+        }
+        if statement_timeout_ms:
+            connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+
+        engine = sqlalchemy.create_engine(
+            url,
+            poolclass=TimedQueuePool,
+            pool_size=min_size,
+            max_overflow=max_size - min_size,
+            pool_timeout=float(pool_config.get("timeout_seconds") or 30),
+            pool_recycle=int(pool_config.get("recycle_seconds") or 1800),
+            pool_pre_ping=pool_config.get("pre_ping", True),
+            pool_use_lifo=True,
+            connect_args=connect_args,
+        )
+        _instrument(engine, engine.pool.metrics)
+        _ENGINES[key] = engine
+
+    logger.info(f"Created database pool for {db_config.get('host')} with {min_size}-{max_size} connections")
+    return engine
+
+class TableRowCount:
+    """
+    The row count of a bounded cache table, kept from this process's own inserts.
+
+    `pg_class.reltuples` only changes on ANALYZE/VACUUM, so it cannot size evictions. The
+    exact `count(*)` is taken on the first write and again every `refresh_seconds`, to pick
+    up rows written by other instances; in between, the count is advanced by the rows each
+    write actually inserted and reduced by the rows it evicted.
+    """
+
+    def __init__(self, table_name: str, refresh_seconds: float = 300, clock=time.monotonic):
+        self.table_name = table_name
+        self.refresh_seconds = refresh_seconds
+        self.clock = clock
+        self.rows = None
+        self.counted_at = 0.0
+        self._lock = threading.Lock()
+
+    def overflow(self, connection, inserted: int, max_entries: int) -> int:
+        """
+        Records `inserted` new rows and returns how many rows exceed `max_entries`.
+
+        Args:
+            connection: The connection of the transaction that inserted the rows.
+            inserted (int): Rows the write inserted, not counting conflicting keys.
+            max_entries (int): The table's size bound.
+        """
+        with self._lock:
+            if self.rows is None or self.clock() - self.counted_at >= self.refresh_seconds:
+                self.rows = connection.execute(sqlalchemy.text(f"SELECT count(*) FROM {self.table_name}")).scalar()
+                self.counted_at = self.clock()
+            else:
+                self.rows += inserted
+            return max(0, self.rows - max_entries)
+
+    def evicted(self, rows: int):
+        with self._lock:
+            self.rows = max(0, (self.rows or 0) - rows)
+
+def warm_up(engine: sqlalchemy.engine.Engine, connections: int):
+    """Opens `connections` pooled connections up front so the first queries skip the handshake."""
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    finally:
+        for connection in opened:
+            connection.close()
+
+def pool_status(engine: sqlalchemy.engine.Engine) -> Dict[str, Any]:
+    """Returns the pool occupancy together with its wait and query-time metrics."""
+    pool = engine.pool
+    status = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        status.update(metrics.snapshot())
+    return status
@@ -0,0 +1,111 @@
+from typing import Optional
+
+import sqlalchemy
+
+from app.core.response_cache import ResponseCache
+from app.core.config import Config
+from app.modules.pg_pool import TableRowCount, get_engine
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class PGResponseCache(ResponseCache):
+    """Response cache shared by every instance of the service through the pgvector database."""
+
+    def __init__(self, config: Config):
+        super().__init__()
+        db_config = config.get_database_config()
+        response_cache_config = config.get("response_cache", {})
+        cache_config = response_cache_config.get("shared", {})
+        self.table_name = cache_config.get("table_name", "response_cache")
+        self.max_entries = cache_config.get("max_entries", 100000)
+        # The shared tier expires entries with the memory tier unless it sets its own TTL
+        self.ttl_seconds = cache_config.get("ttl_seconds", response_cache_config.get("ttl_seconds", 3600))
+        self.engine = get_engine(db_config)
+        self.row_count = TableRowCount(self.table_name)
+
+        with self.engine.begin() as connection:
+            connection.execute(
+                sqlalchemy.text(
+                    f"""
+                    CREATE TABLE IF NOT EXISTS {self.table_name} (
+                        cache_key TEXT PRIMARY KEY,
+                        response TEXT NOT NULL,
+                        expires_at TIMESTAMPTZ NOT NULL
+                    )
+                    """
+                )
+            )
+            connection.execute(
+                sqlalchemy.text(
+                    f"CREATE INDEX IF NOT EXISTS {self.table_name}_expires_at ON {self.table_name} (expires_at)"
+                )
+            )
+            connection.execute(
+                sqlalchemy.text(
+                    f"CREATE TABLE IF NOT EXISTS {self.table_name}_generation ("
+                    "id INTEGER PRIMARY KEY CHECK (id = 0), generation BIGINT NOT NULL)"
+                )
+            )
+            connection.execute(
+                sqlalchemy.text(
+                    f"INSERT INTO {self.table_name}_generation (id, generation) VALUES (0, 0) ON CONFLICT DO NOTHING"
+                )
+            )
+
+        logger.info(f"Using Postgres response cache table {self.table_name} with max entries: {self.max_entries}")
+
+    def get(self, key: str) -> Optional[str]:
+        super().get(key)
+        with self.engine.connect() as connection:
+            row = connection.execute(
+                sqlalchemy.text(
+                    f"SELECT response FROM {self.table_name} WHERE cache_key = :key AND expires_at > now()"
+                ),
+                {"key": key},
+            ).fetchone()
+        self.record(row is not None)
+        return row[0] if row is not None else None
+
+    def put(self, key: str, response: str) -> None:
+        super().put(key, response)
+        evicted = 0
+        with self.engine.begin() as connection:
+            # xmax is 0 on a freshly inserted row and set on one updated by ON CONFLICT
+            inserted = connection.execute(
+                sqlalchemy.text(
+                    f"""
+                    INSERT INTO {self.table_name} (cache_key, response, expires_at)
+                    VALUES (:key, :response, now() + make_interval(secs => :ttl))
+                    ON CONFLICT (cache_key) DO UPDATE
+                    SET response = EXCLUDED.response, expires_at = EXCLUDED.expires_at
+                    RETURNING (xmax = 0) AS inserted
+                    """
+                ),
+                {"key": key, "response": response, "ttl": self.ttl_seconds},
+            ).scalar()
+            overflow = self.row_count.overflow(connection, int(bool(inserted)), self.max_entries)
+            if overflow:
+                evicted = connection.execute(
+                    sqlalchemy.text(
+                        f"DELETE FROM {self.table_name} WHERE cache_key IN ("
+                        f"SELECT cache_key FROM {self.table_name} ORDER BY expires_at LIMIT :overflow)"
+                    ),
+                    {"overflow": overflow},
+                ).rowcount
+        if evicted:
+            self.row_count.evicted(evicted)
+
+    def invalidate(self) -> None:
+        with self.engine.begin() as connection:
+            connection.execute(sqlalchemy.text(f"TRUNCATE {self.table_name}"))
+            connection.execute(
+                sqlalchemy.text(f"UPDATE {self.table_name}_generation SET generation = generation + 1")
+            )
+        self.row_count.rows = None  # Recounted on the next put
+
+    def generation(self) -> Optional[int]:
+        with self.engine.connect() as connection:
+            return connection.execute(
+                sqlalchemy.text(f"SELECT generation FROM {self.table_name}_generation")
+            ).scalar()
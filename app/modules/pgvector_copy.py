@@ -0,0 +1,179 @@
+import io
+import json
+import struct
+import sys
+import uuid
+from array import array
+from typing import List, Dict, Any, Optional, Iterable
+
+import sqlalchemy
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+COPY_TRAILER = struct.pack("!h", -1)
+_NULL_FIELD = struct.pack("!i", -1)
+
+def encode_vector(embedding: List[float]) -> bytes:
+    """Encodes an embedding in pgvector's binary format: int16 dims, int16 unused, big-endian float4s."""
+    values = array("f", embedding)
+    if sys.byteorder == "little":
+        values.byteswap()
+    return struct.pack("!hh", len(values), 0) + values.tobytes()
+
+def _field(value: Optional[bytes]) -> bytes:
+    if value is None:
+        return _NULL_FIELD
+    return struct.pack("!i", len(value)) + value
+
+def encode_copy_rows(rows: Iterable[tuple]) -> bytes:
+    """
+    Encodes rows for `COPY ... FROM STDIN (FORMAT binary)` into the staging table.
+
+    Args:
+        rows (Iterable[tuple]): (uuid, collection uuid, embedding, document, metadata, custom id) tuples.
+
+    Returns:
+        bytes: The complete binary COPY stream, header and trailer included.
+    """
+    buffer = io.BytesIO()
+    buffer.write(COPY_HEADER)
+    for row_uuid, collection_id, embedding, document, metadata, custom_id in rows:
+        buffer.write(struct.pack("!h", 6))
+        buffer.write(_field(row_uuid.bytes))
+        buffer.write(_field(collection_id.bytes))
+        buffer.write(_field(encode_vector(embedding)))
+        buffer.write(_field(document.encode() if document is not None else None))
+        buffer.write(_field(json.dumps(metadata).encode() if metadata is not None else None))
+        buffer.write(_field(custom_id.encode() if custom_id is not None else None))
+    buffer.write(COPY_TRAILER)
+    return buffer.getvalue()
+
+class PGCopyWriter:
+    """
+    Bulk upserts embeddings into langchain's `langchain_pg_embedding` table.
+
+    Rows are streamed with binary `COPY FROM STDIN` into a temporary staging table and then
+    merged into the collection with a single statement, all in one transaction. The merge
+    skips rows whose custom id is already stored and removes the rows of older versions of
+    the staged pages; merges into the same collection are serialized by an advisory lock.
+    """
+
+    def __init__(self, engine: sqlalchemy.engine.Engine, collection_name: str, batch_size: int = 5000):
+        self.engine = engine
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self._collection_id: Optional[uuid.UUID] = None
+        self._metadata_type: Optional[str] = None
+
+    def _resolve_target(self, cursor):
+        """Looks up the collection uuid and the metadata column type (json or jsonb) once."""
+        if self._collection_id is None:
+            cursor.execute("SELECT uuid FROM langchain_pg_collection WHERE name = %s", (self.collection_name,))
+            row = cursor.fetchone()
+            if row is None:
+                raise ValueError(f"Collection {self.collection_name} does not exist")
+            self._collection_id = uuid.UUID(str(row[0]))
+        if self._metadata_type is None:
+            cursor.execute(
+                "SELECT data_type FROM information_schema.columns "
+                "WHERE table_name = 'langchain_pg_embedding' AND column_name = 'cmetadata'"
+            )
+            self._metadata_type = cursor.fetchone()[0]
+
+    def _merge_statement(self) -> str:
+        return f"""
+            WITH staged AS (
+                SELECT DISTINCT ON (custom_id) uuid, collection_id, embedding, document,
+                       cmetadata::jsonb AS metadata, custom_id
+                FROM embedding_staging
+                ORDER BY custom_id
+            ),
+            stale AS (
+                DELETE FROM langchain_pg_embedding e
+                USING (SELECT DISTINCT metadata->>'id' AS page_id, metadata->>'version' AS version FROM staged) p
+                WHERE e.collection_id = %(collection_id)s
+                  AND e.cmetadata->>'id' = p.page_id
+                  AND (e.cmetadata->>'version') IS DISTINCT FROM p.version
+                RETURNING 1
+            ),
+            inserted AS (
+                INSERT INTO langchain_pg_embedding (uuid, collection_id, embedding, document, cmetadata, custom_id)
+                SELECT s.uuid, s.collection_id, s.embedding, s.document, s.metadata::{self._metadata_type}, s.custom_id
+                FROM staged s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM langchain_pg_embedding e
+                    WHERE e.collection_id = s.collection_id AND e.custom_id = s.custom_id
+                )
+                RETURNING 1
+            )
+            SELECT (SELECT COUNT(*) FROM inserted), (SELECT COUNT(*) FROM stale)
+        """
+
+    def write(
+            self,
+            texts: List[str],
+            embeddings: List[List[float]],
+            ids: List[str],
+            metadatas: Optional[List[Dict[str, Any]]] = None,
+    ) -> int:
+        """
+        Upserts the rows and returns how many were inserted.
+
+        Args:
+            texts (List[str]): Chunk texts.
+            embeddings (List[List[float]]): Chunk embeddings.
+            ids (List[str]): Stable chunk ids, stored as the custom id.
+            metadatas (List[Dict[str, Any]], optional): Chunk metadata.
+
+        Returns:
+            int: The number of new rows inserted into the collection.
+        """
+        if not len(texts) == len(embeddings) == len(ids):
+            raise ValueError("texts, embeddings and ids must have the same length")
+        metadatas = metadatas or [None] * len(texts)
+
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            self._resolve_target(cursor)
+            cursor.execute(
+                "CREATE TEMP TABLE embedding_staging ("
+                "uuid uuid, collection_id uuid, embedding vector, document text, cmetadata text, custom_id text"
+                ") ON COMMIT DROP"
+            )
+            for i in range(0, len(texts), self.batch_size):
+                rows = (
+                    (uuid.uuid4(), self._collection_id, embedding, text, metadata, custom_id)
+                    for text, embedding, metadata, custom_id in zip(
+                        texts[i:i + self.batch_size],
+                        embeddings[i:i + self.batch_size],
+                        metadatas[i:i + self.batch_size],
+                        ids[i:i + self.batch_size],
+                    )
+                )
+                cursor.copy_expert(
+                    "COPY embedding_staging FROM STDIN (FORMAT binary)", io.BytesIO(encode_copy_rows(rows))
+                )
+            # Concurrent writers of the collection would both pass the NOT EXISTS check for the same
+            # custom id; the lock serializes the merges (not the COPYs) until this transaction ends
+            cursor.execute(
+                "SELECT pg_advisory_xact_lock(hashtextextended(%(collection_id)s, 0))",
+                {"collection_id": str(self._collection_id)},
+            )
+            cursor.execute(self._merge_statement(), {"collection_id": str(self._collection_id)})
+            inserted, stale = cursor.fetchone()
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+        logger.info(
+            f"Bulk upserted {len(texts)} rows into collection {self.collection_name}: "
+            f"{inserted} new, {len(texts) - inserted} unchanged, {stale} stale rows removed"
+        )
+        return inserted
@@ -0,0 +1,216 @@
+import re
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import sqlalchemy
+
+from app.core.filters import FilterLike
+from app.modules.pg_pages import merged_metadata, page_filter_clause, page_join
+from app.modules.pgvector_index import PGVectorIndexManager, vector_literal
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class PGHybridRetriever:
+    """
+    Combines full-text and vector retrieval over one langchain pgvector collection.
+
+    Chunks get a stored `document_tsv` column with a GIN index next to their embeddings.
+    A query ranks its top candidates both by `ts_rank_cd` (a BM25-like score that rewards
+    exact terms such as ticket keys, error codes and hostnames) and by cosine distance,
+    and merges the two lists with reciprocal rank fusion. Both candidate lists, the fusion
+    and the metadata filters are evaluated in a single statement, so a hybrid query is one
+    database round-trip.
+    """
+
+    def __init__(self, engine: sqlalchemy.engine.Engine, collection_name: str,
+                 retrieval_config: Optional[Dict[str, Any]] = None,
+                 index_manager: Optional[PGVectorIndexManager] = None):
+        retrieval_config = retrieval_config or {}
+        self.engine = engine
+        self.collection_name = collection_name
+        self.index_manager = index_manager
+        self.candidates = int(retrieval_config.get("candidates") or 40)
+        self.rrf_k = int(retrieval_config.get("rrf_k") or 60)
+        # The "simple" configuration neither stems nor drops stop words, so identifiers stay intact
+        self.text_search_config = retrieval_config.get("text_search_config") or "simple"
+        self._collection_id: Optional[uuid.UUID] = None
+        self.text_index_ready = False
+
+    def _stored_text_search_config(self, connection) -> Optional[str]:
+        """The text search configuration `document_tsv` was generated with, or None if the column does not exist."""
+        row = connection.execute(sqlalchemy.text(
+            "SELECT pg_get_expr(d.adbin, d.adrelid) FROM pg_attribute a "
+            "JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum "
+            "WHERE a.attrelid = 'langchain_pg_embedding'::regclass AND a.attname = 'document_tsv' "
+            "AND NOT a.attisdropped"
+        )).fetchone()
+        if row is None:
+            return None
+        match = re.search(r"to_tsvector\('(?:pg_catalog\.)?([^']+)'", row[0])
+        return match.group(1) if match else None
+
+    def check_text_index(self) -> bool:
+        """
+        Checks that the `document_tsv` column was generated with the configured text search configuration.
+
+        Only reads the catalog, so it is safe on the query path; the column is added by `ensure_text_index`.
+
+        Returns:
+            bool: Whether the column exists, i.e. whether hybrid search can run.
+
+        Raises:
+            ValueError: If the column was generated with a different configuration than `text_search_config`,
+                which would make the stored vectors and `plainto_tsquery` silently disagree.
+        """
+        with self.engine.begin() as connection:
+            stored = self._stored_text_search_config(connection)
+        if stored is not None and stored != self.text_search_config:
+            raise ValueError(
+                f"langchain_pg_embedding.document_tsv was generated with text search configuration '{stored}' "
+                f"but retrieval.text_search_config is '{self.text_search_config}'; drop the column to regenerate it"
+            )
+        self.text_index_ready = stored is not None
+        return self.text_index_ready
+
+    def ensure_text_index(self):
+        """
+        Adds the generated `document_tsv` column and its GIN index if they are missing.
+
+        Adding the column rewrites `langchain_pg_embedding` once, so this runs after ingestion
+        (from `PGVectorStore.build_index`), not on startup; afterwards Postgres keeps the column
+        up to date on every insert, including COPY and langchain's ORM inserts.
+        """
+        exists = self.check_text_index()
+        with self.engine.begin() as connection:
+            if not exists:
+                connection.execute(sqlalchemy.text(
+                    "ALTER TABLE langchain_pg_embedding ADD COLUMN IF NOT EXISTS document_tsv tsvector "
+                    f"GENERATED ALWAYS AS (to_tsvector('{self.text_search_config}', coalesce(document, ''))) STORED"
+                ))
+            connection.execute(sqlalchemy.text(
+                "CREATE INDEX IF NOT EXISTS langchain_pg_embedding_document_tsv_idx "
+                "ON langchain_pg_embedding USING gin (document_tsv)"
+            ))
+        self.text_index_ready = True
+
+    def _resolve_collection(self, connection) -> uuid.UUID:
+        if self._collection_id is None:
+            row = connection.execute(
+                sqlalchemy.text("SELECT uuid FROM langchain_pg_collection WHERE name = :name"),
+                {"name": self.collection_name},
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Collection {self.collection_name} does not exist")
+            self._collection_id = uuid.UUID(str(row[0]))
+        return self._collection_id
+
+    def _vector_candidates(self, connection, collection_id: uuid.UUID, filters_sql: str,
+                           params: Dict[str, Any]) -> Tuple[str, Optional[int]]:
+        """
+        Selects (uuid, distance) of the `:candidates` nearest chunks that match the filters.
+
+        Without filters this is an ordered LIMIT over the ANN index. With filters the index
+        manager's planner decides, as for plain vector search: a broad filter post-filters a
+        longer ANN candidate list, a selective one pre-filters and computes exact distances,
+        since the index would return fewer matches than requested.
+
+        Returns:
+            Tuple[str, Optional[int]]: The subquery, and how many candidates the ANN scan must return
+                (None when the ANN index is not used).
+        """
+        pages = f" {page_join()}" if filters_sql else ""
+        exact = (
+            f"SELECT e.uuid, e.embedding <=> CAST(:embedding AS vector) AS distance "
+            f"FROM langchain_pg_embedding e{pages} WHERE e.collection_id = '{collection_id}'{filters_sql} "
+            f"ORDER BY distance LIMIT :candidates"
+        )
+        if self.index_manager is None:
+            return exact, None
+        scanned = params["candidates"]
+        if filters_sql:
+            strategy, scanned = self.index_manager.plan_filtered_search(
+                connection, collection_id, filters_sql, params, params["candidates"]
+            )
+            if strategy == "pre":
+                return exact, None
+
+        # The index manager's candidate scan, including the full-precision re-rank of binary-quantized candidates
+        params["ann_candidates"] = scanned
+        nearest = self.index_manager._ann_candidates(collection_id, ":embedding", ":ann_candidates")
+        if not filters_sql:
+            return nearest, scanned
+        # The page join sits outside the ANN scan, so the index scan stays a plain ordered LIMIT
+        return (
+            f"SELECT c.uuid, c.distance FROM ({nearest}) c {page_join('c')} "
+            f"WHERE TRUE{filters_sql} ORDER BY c.distance LIMIT :candidates"
+        ), scanned
+
+    def _statement(self, collection_id: uuid.UUID, vector_candidates: str, filters_sql: str) -> str:
+        # Terms are OR-ed: a chunk matching only the error code still ranks, chunks matching more rank higher
+        tsquery = (
+            f"CAST(replace(CAST(plainto_tsquery('{self.text_search_config}', :query) AS text), '&', '|') AS tsquery)"
+        )
+        # Filters are evaluated on the page metadata, so only filtered candidate lists join the pages
+        pages = f" {page_join()}" if filters_sql else ""
+        return f"""
+            WITH vector_candidates AS (
+                SELECT uuid, row_number() OVER (ORDER BY distance) AS rank
+                FROM ({vector_candidates}) nearest
+            ),
+            lexical_candidates AS (
+                SELECT uuid, row_number() OVER (ORDER BY score DESC) AS rank
+                FROM (
+                    SELECT e.uuid, ts_rank_cd(e.document_tsv, q) AS score
+                    FROM langchain_pg_embedding e{pages}, {tsquery} q
+                    WHERE e.collection_id = '{collection_id}' AND e.document_tsv @@ q{filters_sql}
+                    ORDER BY score DESC LIMIT :candidates
+                ) matches
+            ),
+            fused AS (
+                SELECT COALESCE(v.uuid, l.uuid) AS uuid,
+                       COALESCE(1.0 / (:rrf_k + v.rank), 0) + COALESCE(1.0 / (:rrf_k + l.rank), 0) AS score
+                FROM vector_candidates v FULL OUTER JOIN lexical_candidates l ON v.uuid = l.uuid
+            )
+            SELECT e.document, {merged_metadata()} AS metadata, f.score
+            FROM fused f JOIN langchain_pg_embedding e ON e.uuid = f.uuid {page_join()}
+            ORDER BY f.score DESC LIMIT :k
+        """
+
+    def search(self, query: str, embedding: List[float], k: int = 4,
+               filters: FilterLike = None) -> List[Tuple[str, Dict[str, Any], float]]:
+        """
+        Returns the k best chunks by reciprocal rank fusion of full-text and vector rankings.
+
+        Args:
+            query (str): The query text, matched against the chunks' full-text index.
+            embedding (List[float]): The query embedding.
+            k (int): The number of results.
+            filters (FilterLike, optional): Metadata filters, applied to both candidate lists in SQL
+                (pre- or post-filtering the vector candidates, see `_vector_candidates`).
+
+        Returns:
+            List[Tuple[str, Dict[str, Any], float]]: (document, metadata, fused score) tuples, best first.
+        """
+        params: Dict[str, Any] = {
+            "query": query,
+            "embedding": vector_literal(embedding),
+            "candidates": max(self.candidates, k),
+            "rrf_k": self.rrf_k,
+            "k": k,
+        }
+        filters_sql = page_filter_clause(filters, params)
+        with self.engine.begin() as connection:
+            collection_id = self._resolve_collection(connection)
+            if self.index_manager is not None and self.index_manager.dimensions is None:
+                self.index_manager.dimensions = len(embedding)
+            vector_candidates, scanned = self._vector_candidates(connection, collection_id, filters_sql, params)
+            if scanned is not None:
+                setting, value = self.index_manager.scan_settings(scanned)
+                # set_config(..., true) is SET LOCAL: it only lasts for this transaction
+                connection.execute(sqlalchemy.text("SELECT set_config(:setting, :value, true)"),
+                                   {"setting": setting, "value": str(value)})
+            rows = connection.execute(
+                sqlalchemy.text(self._statement(collection_id, vector_candidates, filters_sql)), params
+            ).fetchall()
+        return [(row[0], row[1], float(row[2])) for row in rows]
@@ -0,0 +1,385 @@
+import json
+import math
+import re
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import sqlalchemy
+
+from app.core.filters import FilterLike
+from app.modules.pg_pages import merged_metadata, page_filter_clause, page_join
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+INDEX_METHODS = ("hnsw", "ivfflat")
+FILTER_STRATEGIES = ("auto", "pre", "post")
+QUANTIZATIONS = ("none", "halfvec", "binary")
+
+def vector_literal(embedding: List[float]) -> str:
+    """Formats an embedding as a pgvector text literal."""
+    return "[" + ",".join(repr(float(value)) for value in embedding) + "]"
+
+def default_ivfflat_lists(rows: int) -> int:
+    """pgvector's guidance: rows / 1000 up to 1M rows, sqrt(rows) beyond."""
+    if rows <= 1_000_000:
+        return max(10, rows // 1000)
+    return int(math.sqrt(rows))
+
+class PGVectorIndexManager:
+    """
+    Builds and queries an ANN index (HNSW or IVFFlat) over one langchain pgvector collection.
+
+    langchain stores every collection in the same `langchain_pg_embedding` table with an
+    untyped `vector` column, so the index is a partial expression index on
+    `embedding::vector(<dimensions>)` restricted to the collection. Queries use the same
+    expression and predicate so the planner can pick the index; `exact_search` uses the
+    bare column instead, which always runs a sequential scan and serves as ground truth.
+
+    The index can hold reduced-precision vectors (`quantization`): "halfvec" indexes 16-bit
+    floats at half the size, "binary" indexes one bit per dimension (1/32 of the size) and
+    re-ranks `rerank_factor * k` Hamming-distance candidates by their full-precision cosine
+    distance. The table itself keeps full-precision vectors either way.
+    """
+
+    def __init__(self, engine: sqlalchemy.engine.Engine, collection_name: str, index_config: Optional[Dict[str, Any]] = None,
+                 prepared_statements: bool = True):
+        index_config = index_config or {}
+        self.engine = engine
+        self.collection_name = collection_name
+        self.prepared_statements = prepared_statements
+        self.method = (index_config.get("method") or "hnsw").lower()
+        if self.method not in INDEX_METHODS:
+            raise ValueError(f"Unsupported index method {self.method}, expected one of {INDEX_METHODS}")
+        self.m = int(index_config.get("m") or 16)
+        self.ef_construction = int(index_config.get("ef_construction") or 64)
+        self.lists = index_config.get("lists")
+        self.ef_search = int(index_config.get("ef_search") or 40)
+        self.probes = int(index_config.get("probes") or 10)
+        self.concurrently = index_config.get("concurrently", True)
+        self.maintenance_work_mem = index_config.get("maintenance_work_mem")
+        self.dimensions: Optional[int] = index_config.get("dimensions")
+        self.quantization = (index_config.get("quantization") or "none").lower()
+        if self.quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization {self.quantization}, expected one of {QUANTIZATIONS}")
+        self.rerank_factor = int(index_config.get("rerank_factor") or 4)
+        self.filter_strategy = (index_config.get("filter_strategy") or "auto").lower()
+        if self.filter_strategy not in FILTER_STRATEGIES:
+            raise ValueError(f"Unsupported filter strategy {self.filter_strategy}, expected one of {FILTER_STRATEGIES}")
+        self.filter_oversample = float(index_config.get("filter_oversample") or 2.0)
+        self.max_filter_candidates = int(index_config.get("max_filter_candidates") or 1000)
+        self._collection_id: Optional[uuid.UUID] = None
+
+    @property
+    def index_name(self) -> str:
+        slug = re.sub(r"[^a-z0-9]+", "_", self.collection_name.lower()).strip("_")
+        suffix = "" if self.quantization == "none" else f"_{self.quantization}"
+        return f"langchain_pg_embedding_{slug}_{self.method}{suffix}_idx"[:63]
+
+    def _resolve_collection(self, connection) -> uuid.UUID:
+        if self._collection_id is None:
+            row = connection.execute(
+                sqlalchemy.text("SELECT uuid FROM langchain_pg_collection WHERE name = :name"),
+                {"name": self.collection_name},
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Collection {self.collection_name} does not exist")
+            self._collection_id = uuid.UUID(str(row[0]))
+        return self._collection_id
+
+    def _resolve_dimensions(self, connection) -> Optional[int]:
+        if self.dimensions is None:
+            row = connection.execute(
+                sqlalchemy.text(
+                    "SELECT vector_dims(embedding) FROM langchain_pg_embedding "
+                    "WHERE collection_id = :collection_id LIMIT 1"
+                ),
+                {"collection_id": str(self._resolve_collection(connection))},
+            ).fetchone()
+            self.dimensions = int(row[0]) if row else None
+        return self.dimensions
+
+    def _index_statement(self, rows: int) -> str:
+        concurrently = "CONCURRENTLY " if self.concurrently else ""
+        if self.method == "hnsw":
+            options = f"WITH (m = {self.m}, ef_construction = {self.ef_construction})"
+        else:
+            options = f"WITH (lists = {int(self.lists or default_ivfflat_lists(rows))})"
+        expression, operator_class = {
+            "none": (f"embedding::vector({self.dimensions})", "vector_cosine_ops"),
+            "halfvec": (f"embedding::halfvec({self.dimensions})", "halfvec_cosine_ops"),
+            "binary": (f"binary_quantize(embedding)::bit({self.dimensions})", "bit_hamming_ops"),
+        }[self.quantization]
+        return (
+            f"CREATE INDEX {concurrently}IF NOT EXISTS {self.index_name} "
+            f"ON langchain_pg_embedding USING {self.method} (({expression}) {operator_class}) "
+            f"{options} WHERE collection_id = '{self._collection_id}'"
+        )
+
+    def index_status(self) -> Optional[Dict[str, Any]]:
+        """Returns the definition, validity and size of the collection's index, or None if it does not exist."""
+        with self.engine.connect() as connection:
+            row = connection.execute(
+                sqlalchemy.text(
+                    "SELECT pg_get_indexdef(i.indexrelid), i.indisvalid, pg_relation_size(i.indexrelid) FROM pg_index i "
+                    "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"
+                ),
+                {"name": self.index_name},
+            ).fetchone()
+        if row is None:
+            return None
+        return {"name": self.index_name, "definition": row[0], "valid": bool(row[1]), "size_bytes": row[2]}
+
+    def _drop_superseded_indexes(self, connection):
+        """
+        Drops the collection's other ANN indexes, e.g. the old one after `method` or `quantization` changed.
+
+        They are found by their partial-index predicate on the collection id, not by name, so
+        the indexes of a collection whose name merely shares a prefix are left alone.
+        """
+        names = [row[0] for row in connection.execute(
+            sqlalchemy.text(
+                "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                "JOIN pg_am a ON a.oid = c.relam "
+                "WHERE i.indrelid = 'langchain_pg_embedding'::regclass AND a.amname IN ('hnsw', 'ivfflat') "
+                "AND pg_get_expr(i.indpred, i.indrelid) LIKE :predicate AND c.relname <> :name"
+            ),
+            {"predicate": f"%'{self._resolve_collection(connection)}'%", "name": self.index_name},
+        ).fetchall()]
+        concurrently = "CONCURRENTLY " if self.concurrently else ""
+        for name in names:
+            connection.execute(sqlalchemy.text(f'DROP INDEX {concurrently}IF EXISTS "{name}"'))
+            logger.info(f"Dropped superseded index {name} of {self.collection_name}")
+
+    def ensure_index(self, rebuild: bool = False) -> bool:
+        """
+        Creates the collection's ANN index if it does not exist yet.
+
+        A concurrent build does not block writers, but it cannot run inside a transaction, so
+        the statements run on an autocommit connection. An index left invalid by an interrupted
+        concurrent build is dropped and rebuilt. Other ANN indexes of the collection, left by a
+        previous `method` or `quantization`, are dropped once the current index exists, so
+        writes do not keep maintaining them.
+
+        Args:
+            rebuild (bool): Drops and recreates an existing index, e.g. after changing its parameters.
+
+        Returns:
+            bool: True if an index was built, False if it already existed or the collection is empty.
+        """
+        status = self.index_status()
+        if status is not None and status["valid"] and not rebuild:
+            with self.engine.connect() as connection:
+                self._drop_superseded_indexes(connection.execution_options(isolation_level="AUTOCOMMIT"))
+            return False
+
+        with self.engine.connect() as connection:
+            connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+            collection_id = self._resolve_collection(connection)
+            if self._resolve_dimensions(connection) is None:
+                logger.warning(f"Collection {self.collection_name} is empty, skipping {self.method} index build")
+                return False
+            rows = connection.execute(
+                sqlalchemy.text("SELECT COUNT(*) FROM langchain_pg_embedding WHERE collection_id = :collection_id"),
+                {"collection_id": str(collection_id)},
+            ).scalar()
+
+            if status is not None:
+                concurrently = "CONCURRENTLY " if self.concurrently else ""
+                connection.execute(sqlalchemy.text(f"DROP INDEX {concurrently}IF EXISTS {self.index_name}"))
+            if self.maintenance_work_mem:
+                connection.execute(sqlalchemy.text(f"SET maintenance_work_mem = '{self.maintenance_work_mem}'"))
+
+            started = time.monotonic()
+            connection.execute(sqlalchemy.text(self._index_statement(rows)))
+            if self.maintenance_work_mem:
+                # The connection goes back to the shared pool
+                connection.execute(sqlalchemy.text("RESET maintenance_work_mem"))
+            self._drop_superseded_indexes(connection)
+        logger.info(
+            f"Built {self.method} index {self.index_name} over {rows} rows of {self.collection_name} "
+            f"in {time.monotonic() - started:.1f}s"
+        )
+        return True
+
+    def _search_settings(self, ef_search: Optional[int], probes: Optional[int]) -> Tuple[str, int]:
+        if self.method == "hnsw":
+            return "hnsw.ef_search", int(ef_search or self.ef_search)
+        return "ivfflat.probes", int(probes or self.probes)
+
+    def scan_settings(self, scanned: int, ef_search: Optional[int] = None,
+                      probes: Optional[int] = None) -> Tuple[str, int]:
+        """The per-query index setting for an ANN scan that has to return `scanned` candidates."""
+        if self.method == "hnsw":
+            # HNSW returns at most ef_search rows per scan
+            if self.quantization == "binary":
+                scanned *= self.rerank_factor
+            ef_search = max(int(ef_search or self.ef_search), scanned)
+        return self._search_settings(ef_search, probes)
+
+    def _distance(self, exact: bool = False, embedding: str = ":embedding") -> str:
+        if exact:
+            # The bare column does not match the index expression, so the planner cannot use the ANN index
+            return f"e.embedding <=> CAST({embedding} AS vector)"
+        return f"e.embedding::vector({self.dimensions}) <=> CAST({embedding} AS vector({self.dimensions}))"
+
+    def index_distance(self, embedding: str = ":embedding", dimensions: Optional[int] = None) -> str:
+        """The ordering expression the ANN index serves: cosine distance, or Hamming distance for binary indexes."""
+        dimensions = dimensions or self.dimensions
+        if self.quantization == "halfvec":
+            return f"e.embedding::halfvec({dimensions}) <=> CAST({embedding} AS halfvec({dimensions}))"
+        if self.quantization == "binary":
+            return (
+                f"binary_quantize(e.embedding)::bit({dimensions}) <~> "
+                f"binary_quantize(CAST({embedding} AS vector({dimensions})))"
+            )
+        return f"e.embedding::vector({dimensions}) <=> CAST({embedding} AS vector({dimensions}))"
+
+    def _ann_candidates(self, collection_id: uuid.UUID, embedding: str, limit: str) -> str:
+        """Selects (uuid, document, cmetadata, collection_id, distance) of the `limit` nearest chunks through the ANN index."""
+        if self.quantization != "binary":
+            return (
+                f"SELECT e.uuid, e.document, e.cmetadata, e.collection_id, {self.index_distance(embedding)} AS distance "
+                f"FROM langchain_pg_embedding e WHERE e.collection_id = '{collection_id}' "
+                f"ORDER BY distance LIMIT {limit}"
+            )
+        # Hamming distance on one bit per dimension is coarse: over-fetch, then re-rank at full precision
+        return (
+            f"SELECT e.uuid, e.document, e.cmetadata, e.collection_id, {self._distance(embedding=embedding)} AS distance FROM ("
+            f"SELECT e.uuid, e.document, e.cmetadata, e.collection_id, e.embedding FROM langchain_pg_embedding e "
+            f"WHERE e.collection_id = '{collection_id}' "
+            f"ORDER BY {self.index_distance(embedding)} LIMIT ({limit}) * {self.rerank_factor}) e "
+            f"ORDER BY distance LIMIT {limit}"
+        )
+
+    def _ann_query(self, collection_id: uuid.UUID, embedding: str, limit: str, filters_sql: str = "",
+                   k: Optional[str] = None) -> str:
+        """
+        Selects (document, metadata, distance) of the nearest chunks, with their page metadata joined in.
+
+        The page join sits outside the candidate subquery, so the ANN index scan stays a plain
+        ordered LIMIT; filters on the page metadata then drop candidates (post-filtering).
+        """
+        return (
+            f"SELECT c.document, {merged_metadata('c')} AS metadata, c.distance "
+            f"FROM ({self._ann_candidates(collection_id, embedding, limit)}) c {page_join('c')} "
+            f"WHERE TRUE{filters_sql} ORDER BY c.distance" + (f" LIMIT {k}" if k else "")
+        )
+
+    def _search_statement(self, connection, collection_id: uuid.UUID) -> str:
+        """
+        Returns the nearest-neighbour query, preparing it once per pooled connection when enabled.
+
+        Prepared statements live as long as the server session, so the name is remembered in the
+        pooled connection's `info` dict and the statement is re-prepared after a reconnect.
+        """
+        query = self._ann_query(collection_id, "{embedding}", "{k}")
+        if not self.prepared_statements:
+            return query.format(embedding=":embedding", k=":k")
+
+        name = f"similarity_{collection_id.hex[:16]}_{self.dimensions}_{self.quantization}"
+        prepared = connection.info.setdefault("prepared_statements", set())
+        if name not in prepared:
+            connection.execute(sqlalchemy.text(f"PREPARE {name} (text, int) AS " + query.format(embedding="$1", k="$2")))
+            prepared.add(name)
+        return f"EXECUTE {name}(:embedding, :k)"
+
+    def _estimated_rows(self, connection, collection_id: uuid.UUID, filters_sql: str, params: Dict[str, Any]) -> float:
+        """Returns the planner's row estimate for the collection narrowed by the filter, without running the query."""
+        plan = connection.execute(
+            sqlalchemy.text(
+                f"EXPLAIN (FORMAT JSON) SELECT 1 FROM langchain_pg_embedding e {page_join()} "
+                f"WHERE e.collection_id = '{collection_id}'{filters_sql}"
+            ),
+            params,
+        ).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return float(plan[0]["Plan"]["Plan Rows"])
+
+    def plan_filtered_search(self, connection, collection_id: uuid.UUID, filters_sql: str, params: Dict[str, Any],
+                             k: int) -> Tuple[str, int]:
+        """
+        Chooses between pre- and post-filtering a filtered nearest-neighbour query.
+
+        Post-filtering walks the ANN index for `k * oversample / selectivity` candidates and drops
+        those that fail the filter; it is the fast path for broad filters. Once a filter is so
+        selective that the candidate list would exceed `max_filter_candidates`, the ANN index
+        would return too few matches, so the query pre-filters instead: the metadata indexes
+        find the matching rows and their distances are computed exactly.
+
+        Returns:
+            Tuple[str, int]: "pre" or "post", and the number of ANN candidates for post-filtering.
+        """
+        if self.filter_strategy == "pre":
+            return "pre", 0
+        if self.filter_strategy == "post":
+            return "post", self.max_filter_candidates
+
+        total = self._estimated_rows(connection, collection_id, "", {})
+        matching = self._estimated_rows(connection, collection_id, filters_sql, params)
+        selectivity = min(1.0, matching / total) if total else 1.0
+        candidates = math.ceil(k * self.filter_oversample / max(selectivity, 1e-9))
+        if candidates > self.max_filter_candidates:
+            return "pre", 0
+        return "post", max(candidates, k)
+
+    def search(self, embedding: List[float], k: int = 4, ef_search: Optional[int] = None,
+               probes: Optional[int] = None, filters: FilterLike = None) -> List[Tuple[str, Dict[str, Any], float]]:
+        """
+        Returns the k nearest chunks by cosine distance using the ANN index.
+
+        Args:
+            embedding (List[float]): The query embedding.
+            k (int): The number of results.
+            ef_search (int, optional): HNSW candidate list size for this query. Defaults to the configured value.
+            probes (int, optional): IVFFlat lists probed for this query. Defaults to the configured value.
+            filters (FilterLike, optional): Metadata filters, pre- or post-applied in SQL (see `plan_filtered_search`).
+
+        Returns:
+            List[Tuple[str, Dict[str, Any], float]]: (document, metadata, distance) tuples, nearest first.
+        """
+        params: Dict[str, Any] = {"embedding": vector_literal(embedding), "k": k}
+        filters_sql = page_filter_clause(filters, params)
+        with self.engine.begin() as connection:
+            collection_id = self._resolve_collection(connection)
+            if self.dimensions is None:
+                self.dimensions = len(embedding)
+
+            if not filters_sql:
+                statement = self._search_statement(connection, collection_id)
+                strategy = None
+            else:
+                strategy, params["candidates"] = self.plan_filtered_search(connection, collection_id, filters_sql, params, k)
+                if strategy == "pre":
+                    statement = (
+                        f"SELECT e.document, {merged_metadata()} AS metadata, {self._distance(exact=True)} AS distance "
+                        f"FROM langchain_pg_embedding e {page_join()} "
+                        f"WHERE e.collection_id = '{collection_id}'{filters_sql} ORDER BY distance LIMIT :k"
+                    )
+                else:
+                    # The candidate LIMIT keeps the planner from pushing the filter below the index scan
+                    statement = self._ann_query(collection_id, ":embedding", ":candidates", filters_sql, k=":k")
+
+            if strategy != "pre":
+                setting, value = self.scan_settings(params.get("candidates") or k, ef_search, probes)
+                # set_config(..., true) is SET LOCAL: it only lasts for this transaction
+                connection.execute(sqlalchemy.text("SELECT set_config(:setting, :value, true)"),
+                                   {"setting": setting, "value": str(value)})
+            rows = connection.execute(sqlalchemy.text(statement), params).fetchall()
+        return [(row[0], row[1], float(row[2])) for row in rows]
+
+    def exact_search(self, embedding: List[float], k: int = 4) -> List[Tuple[str, Dict[str, Any], float]]:
+        """Returns the exact k nearest chunks with a sequential scan, bypassing the ANN index."""
+        with self.engine.connect() as connection:
+            collection_id = self._resolve_collection(connection)
+            rows = connection.execute(
+                sqlalchemy.text(
+                    f"SELECT e.document, {merged_metadata()} AS metadata, e.embedding <=> CAST(:embedding AS vector) AS distance "
+                    f"FROM langchain_pg_embedding e {page_join()} WHERE e.collection_id = :collection_id "
+                    "ORDER BY distance LIMIT :k"
+                ),
+                {"embedding": vector_literal(embedding), "collection_id": str(collection_id), "k": k},
+            ).fetchall()
+        return [(row[0], row[1], float(row[2])) for row in rows]
@@ -1,63 +1,277 @@
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Set
+import sqlalchemy
 from langchain_community.vectorstores.pgvector import PGVector as PostgresVectorStore
 from app.core.vectorstore import VectorStore
+from app.core.chunking import make_chunk_id
 from app.core.config import Config
+from app.core.filters import FilterLike
 from app.core.embeddings import Embeddings
-from app.core.aws_manager import AWSManager
+from app.modules.pg_pages import PGPageStore, merged_metadata, page_filter_clause, page_join
+from app.modules.pg_pool import connection_string, get_engine, pool_status, warm_up
+from app.modules.pgvector_copy import PGCopyWriter
+from app.modules.pgvector_hybrid import PGHybridRetriever
+from app.modules.pgvector_index import PGVectorIndexManager, vector_literal
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 class PGVectorStore(VectorStore):
-    def __init__(self, config: Config, embeddings: Embeddings, aws_manager: AWSManager):
+    def __init__(self, config: Config, embeddings: Embeddings):
         db_config = config.get_database_config()
-        self.connection_string = f"postgresql://{db_config.get('user')}:{db_config.get('password')}@{db_config.get('host')}:{db_config.get('port')}/{db_config.get('dbname')}"
         self.collection_name = db_config.get("collection_name", "default_collection")
         self.embedder = embeddings
-        self.rds_role_arn = db_config.get("assumed_role_arn")
+        self.write_mode = db_config.get("write_mode") or "copy"
+        self.metadata_indexes = db_config.get("metadata_indexes") or {}
+        pool_config = db_config.get("pool") or {}
 
-        logger.info(f"Using PGVector store with connection string: {self.connection_string} and role ARN: {self.rds_role_arn}")
-
-        # Get a new session for RDS, assuming a role if configured
-        rds_session = aws_manager.assume_role(self.rds_role_arn) if self.rds_role_arn else aws_manager.get_session()
+        logger.info(
+            f"Using PGVector store at {db_config.get('host')}:{db_config.get('port')}/{db_config.get('dbname')} "
+            f"with collection {self.collection_name}"
+        )
 
-        # Modify the connection string to include the SSL mode
-        self.connection_string = self.connection_string + "?sslmode=require"
+        # Reads, writes and the embedding cache share one long-lived pool per database
+        self.engine = get_engine(db_config)
+        warm_up(self.engine, int(pool_config.get("min_size") or 2))
 
         self.vector_store = PostgresVectorStore(
             collection_name=self.collection_name,
-            connection_string=self.connection_string,
+            connection_string=connection_string(db_config),
             embedding_function=self.embedder,
-            session=rds_session
+            connection=self.engine,
+        )
+        self.copy_writer = PGCopyWriter(self.engine, self.collection_name)
+        self.page_store = PGPageStore(self.engine, self.collection_name)
+        index_config = db_config.get("index") or {}
+        # Per-collection overrides, e.g. a binary-quantized index for one very large collection
+        index_config = {**index_config, **((index_config.get("collections") or {}).get(self.collection_name) or {})}
+        self.index_manager = (
+            PGVectorIndexManager(
+                self.engine, self.collection_name, index_config,
+                prepared_statements=pool_config.get("prepared_statements", True),
+            )
+            if (index_config.get("method") or "none") != "none" else None
+        )
+        retrieval_config = db_config.get("retrieval") or {}
+        self.hybrid_retriever = (
+            PGHybridRetriever(self.engine, self.collection_name, retrieval_config, self.index_manager)
+            if (retrieval_config.get("mode") or "vector") == "hybrid" else None
         )
+        self._ensure_indexes()
+
+    def _ensure_indexes(self):
+        """Creates the lookup indexes used by upserts, page deletes and metadata filters, and the pages table."""
+        with self.vector_store._make_session() as session:
+            session.execute(sqlalchemy.text(
+                "CREATE INDEX IF NOT EXISTS langchain_pg_embedding_custom_id_idx "
+                "ON langchain_pg_embedding (collection_id, custom_id)"
+            ))
+            session.execute(sqlalchemy.text(
+                "CREATE INDEX IF NOT EXISTS langchain_pg_embedding_page_id_idx "
+                "ON langchain_pg_embedding ((cmetadata->>'id'))"
+            ))
+            session.commit()
+        self.page_store.ensure_table(self.metadata_indexes.get("btree"))
+        # The full-text column is only added after ingestion (build_index); here it is only checked
+        if self.hybrid_retriever is not None and not self.hybrid_retriever.check_text_index():
+            logger.warning("The full-text column does not exist yet; queries use vector search until ingestion adds it")
 
-    def add_texts(self, texts: List[str], metadatas: List[Dict[str, Any]] = None, embeddings: List[List[float]] = None, batch_size: int = 100) -> None:
+    def add_texts(self, texts: List[str], metadatas: List[Dict[str, Any]] = None, embeddings: List[List[float]] = None, batch_size: int = 100, ids: List[str] = None) -> None:
         """
-        Adds text, metadata and embeddings to the PGVectorStore in batches.
+        Adds text, metadata and embeddings to the PGVectorStore in batches, skipping rows that are already stored.
 
         Args:
             texts (List[str]): List of texts to add.
             metadatas (List[Dict[str, Any]], optional): List of metadata dictionaries. Defaults to None.
             embeddings (List[List[float]], optional): List of embeddings. Defaults to None.
             batch_size (int): The size of each batch. Defaults to 100.
+            ids (List[str], optional): Stable chunk ids. Derived from the metadata when omitted.
         """
-        super().add_texts(texts, metadatas)
+        super().add_texts(texts, metadatas, ids)
+        self.upsert(texts, metadatas=metadatas, embeddings=embeddings, ids=ids, batch_size=batch_size)
 
-        ids = [i for i in range(len(texts))]
+    def upsert(self, texts: List[str], metadatas: List[Dict[str, Any]] = None, embeddings: List[List[float]] = None, ids: List[str] = None, batch_size: int = 100) -> None:
+        """
+        Writes only the chunks that are not stored yet and drops the chunks of older versions of the written pages.
+
+        The page metadata is written once per page to the pages table; each chunk row only keeps
+        the page reference.
+
+        Args:
+            texts (List[str]): List of texts to write.
+            metadatas (List[Dict[str, Any]], optional): List of metadata dictionaries. Defaults to None.
+            embeddings (List[List[float]], optional): List of embeddings. Computed when omitted.
+            ids (List[str], optional): Stable chunk ids. Derived from the metadata when omitted.
+            batch_size (int): The size of each ORM batch. Defaults to 100.
+        """
+        if ids is None or None in ids:
+            derived = self._derive_ids(texts, metadatas)
+            ids = derived if ids is None else [chunk_id or derived[i] for i, chunk_id in enumerate(ids)]
+        if metadatas:
+            metadatas = self.page_store.upsert(metadatas)
 
-        for i in range(0, len(texts), batch_size):
-            batch_texts = texts[i:i + batch_size]
-            batch_metadatas = metadatas[i:i + batch_size] if metadatas else None
-            batch_embeddings = embeddings[i:i + batch_size] if embeddings else None
-            batch_ids = ids[i:i + batch_size]
-            self.vector_store.add_embeddings_with_metadata(
+        if self.write_mode == "copy" and embeddings is not None:
+            # Stream all rows through COPY instead of row-by-row ORM inserts
+            self.copy_writer.write(texts, embeddings, ids, metadatas=metadatas)
+            return
+
+        existing_ids = self._existing_ids(ids)
+        new_rows = [i for i, chunk_id in enumerate(ids) if chunk_id not in existing_ids]
+        logger.info(f"Upserting {len(texts)} chunks: {len(new_rows)} new, {len(texts) - len(new_rows)} unchanged")
+        if metadatas:
+            self._delete_stale_versions(metadatas)
+
+        for i in range(0, len(new_rows), batch_size):
+            batch_rows = new_rows[i:i + batch_size]
+            batch_texts = [texts[row] for row in batch_rows]
+            batch_embeddings = (
+                [embeddings[row] for row in batch_rows] if embeddings else self.embedder.embed_documents(batch_texts)
+            )
+            self.vector_store.add_embeddings(
                 texts=batch_texts,
                 embeddings=batch_embeddings,
-                metadatas=batch_metadatas,
-                ids=batch_ids
+                metadatas=[metadatas[row] for row in batch_rows] if metadatas else None,
+                ids=[ids[row] for row in batch_rows],
             )
 
-    def similarity_search(self, query: str, k: int = 4) -> List[Tuple[str, float]]:
-        super().similarity_search(query, k)
-        results = self.vector_store.similarity_search_with_score(query, k)
-        return [(result.page_content, score) for result, score in results]
\ No newline at end of file
+    @staticmethod
+    def _derive_ids(texts: List[str], metadatas: List[Dict[str, Any]] = None) -> List[str]:
+        """Derives chunk ids for callers that do not pass them, numbering chunks per page within the call."""
+        ordinals: Dict[Any, int] = {}
+        ids = []
+        for i, text in enumerate(texts):
+            metadata = metadatas[i] if metadatas else {}
+            page_id = metadata.get("id")
+            ordinal = ordinals.get(page_id, 0)
+            ordinals[page_id] = ordinal + 1
+            ids.append(make_chunk_id(page_id, metadata.get("version"), ordinal, text))
+        return ids
+
+    def _existing_ids(self, ids: List[str]) -> Set[str]:
+        statement = sqlalchemy.text(
+            "SELECT e.custom_id FROM langchain_pg_embedding e JOIN langchain_pg_collection c "
+            "ON e.collection_id = c.uuid WHERE c.name = :collection_name AND e.custom_id = ANY(:ids)"
+        )
+        with self.vector_store._make_session() as session:
+            rows = session.execute(statement, {"collection_name": self.collection_name, "ids": ids})
+            return {row[0] for row in rows}
+
+    def _delete_stale_versions(self, metadatas: List[Dict[str, Any]]):
+        """Deletes the chunks of the given pages whose version differs from the one being written."""
+        versions = {
+            str(metadata["id"]): None if metadata.get("version") is None else str(metadata["version"])
+            for metadata in metadatas if metadata.get("id") is not None
+        }
+        if not versions:
+            return
+        statement = sqlalchemy.text(
+            "DELETE FROM langchain_pg_embedding e USING langchain_pg_collection c, "
+            "unnest(CAST(:page_ids AS TEXT[]), CAST(:versions AS TEXT[])) AS p(page_id, version) "
+            "WHERE e.collection_id = c.uuid AND c.name = :collection_name "
+            "AND e.cmetadata->>'id' = p.page_id AND (e.cmetadata->>'version') IS DISTINCT FROM p.version"
+        )
+        with self.vector_store._make_session() as session:
+            session.execute(statement, {
+                "collection_name": self.collection_name,
+                "page_ids": list(versions),
+                "versions": list(versions.values()),
+            })
+            session.commit()
+
+    def pool_metrics(self) -> Dict[str, Any]:
+        """Returns the connection pool occupancy, pool-wait and query-time metrics."""
+        return pool_status(self.engine)
+
+    def build_index(self, rebuild: bool = False) -> bool:
+        """
+        Builds the configured ANN index over the collection if it does not exist yet, and in hybrid
+        mode the full-text column and its index.
+
+        Args:
+            rebuild (bool): Recreates an existing index, e.g. after changing its parameters.
+
+        Returns:
+            bool: True if an index was built.
+        """
+        if self.hybrid_retriever is not None:
+            self.hybrid_retriever.ensure_text_index()
+        if self.index_manager is None:
+            return False
+        return self.index_manager.ensure_index(rebuild=rebuild)
+
+    def similarity_search(self, query: str, k: int = 4, ef_search: int = None, probes: int = None,
+                          filters: FilterLike = None) -> List[Tuple[str, float]]:
+        """
+        Returns the k chunks most relevant to the query with their score.
+
+        Args:
+            query (str): The query text.
+            k (int): The number of results. Defaults to 4.
+            ef_search (int, optional): HNSW candidate list size for this query only.
+            probes (int, optional): IVFFlat lists probed for this query only.
+            filters (FilterLike, optional): Metadata filter, applied in SQL.
+        """
+        super().similarity_search(query, k, filters)
+        return self.similarity_search_by_vector(
+            self.embedder.embed_query(query), k, query=query, ef_search=ef_search, probes=probes, filters=filters
+        )
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, query: str = None, ef_search: int = None,
+                                    probes: int = None, filters: FilterLike = None) -> List[Tuple[str, float]]:
+        """
+        Returns the k chunks most relevant to a query embedding with their score.
+
+        In hybrid mode, and when the query text is given, the score is the reciprocal rank fusion
+        of the full-text and vector rankings (higher is better); otherwise it is the cosine distance.
+
+        Args:
+            embedding (List[float]): The query embedding.
+            k (int): The number of results. Defaults to 4.
+            query (str, optional): The query text, matched against the full-text index in hybrid mode.
+            ef_search (int, optional): HNSW candidate list size for this query only.
+            probes (int, optional): IVFFlat lists probed for this query only.
+            filters (FilterLike, optional): Metadata filter, applied in SQL.
+        """
+        super().similarity_search_by_vector(embedding, k, query, filters)
+        if self.hybrid_retriever is not None and self.hybrid_retriever.text_index_ready and query:
+            results = self.hybrid_retriever.search(query, embedding, k, filters=filters)
+            return [(document, score) for document, _, score in results]
+
+        if self.index_manager is None and filters is not None:
+            return [(document, distance) for document, _, distance in self._exact_search(embedding, k, filters)]
+        if self.index_manager is None:
+            results = self.vector_store.similarity_search_with_score_by_vector(embedding, k)
+            return [(result.page_content, score) for result, score in results]
+
+        results = self.index_manager.search(embedding, k, ef_search=ef_search, probes=probes, filters=filters)
+        return [(document, distance) for document, _, distance in results]
+
+    def _exact_search(self, embedding: List[float], k: int, filters: FilterLike) -> List[Tuple[str, Dict[str, Any], float]]:
+        """Filtered exact search for collections without an ANN index: the metadata indexes narrow the rows first."""
+        params: Dict[str, Any] = {"embedding": vector_literal(embedding), "collection_name": self.collection_name, "k": k}
+        filters_sql = page_filter_clause(filters, params)
+        statement = sqlalchemy.text(
+            f"SELECT e.document, {merged_metadata()} AS metadata, e.embedding <=> CAST(:embedding AS vector) AS distance "
+            f"FROM langchain_pg_embedding e JOIN langchain_pg_collection c ON e.collection_id = c.uuid {page_join()} "
+            f"WHERE c.name = :collection_name{filters_sql} ORDER BY distance LIMIT :k"
+        )
+        with self.vector_store._make_session() as session:
+            rows = session.execute(statement, params).fetchall()
+        return [(row[0], row[1], float(row[2])) for row in rows]
+
+    def delete_by_page(self, page_ids: List[str]) -> None:
+        super().delete_by_page(page_ids)
+        if not page_ids:
+            return
+
+        statement = sqlalchemy.text(
+            "DELETE FROM langchain_pg_embedding e USING langchain_pg_collection c "
+            "WHERE e.collection_id = c.uuid AND c.name = :collection_name "
+            "AND e.cmetadata->>'id' = ANY(:page_ids)"
+        )
+        with self.vector_store._make_session() as session:
+            result = session.execute(
+                statement, {"collection_name": self.collection_name, "page_ids": page_ids}
+            )
+            self.page_store.delete(session, page_ids)
+            session.commit()
+        logger.info(f"Deleted {result.rowcount} chunks for {len(page_ids)} pages from {self.collection_name}")
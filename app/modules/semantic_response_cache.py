@@ -0,0 +1,92 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class SemanticResponseCache:
+    """
+    Serves a cached response when a new query's embedding is close enough to a cached one.
+
+    Query embeddings are kept L2-normalized in a preallocated ring buffer, so a lookup is a
+    single matrix-vector product and an insert overwrites the oldest slot once the buffer
+    is full. Entries also expire `ttl_seconds` after they were stored.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 5000, ttl_seconds: float = 3600):
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        if max_entries < 1:
+            raise ValueError("max_entries must be positive")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, dimensions: Optional[int]):
+        self._vectors = np.zeros((self.max_entries, dimensions), dtype=np.float32) if dimensions else None
+        self._expires_at = np.zeros(self.max_entries, dtype=np.float64)
+        self._responses: List[Optional[str]] = [None] * self.max_entries
+        self._next = 0
+        self._size = 0
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding: List[float]) -> Optional[str]:
+        """
+        Returns the response of the most similar cached query if its cosine similarity reaches the threshold.
+
+        Args:
+            embedding (List[float]): The embedding of the new query.
+
+        Returns:
+            Optional[str]: The cached response, or None.
+        """
+        query = self._normalize(embedding)
+        response = None
+        with self._lock:
+            if self._size and self._vectors.shape[1] == query.shape[0]:
+                similarities = self._vectors[:self._size] @ query
+                similarities[self._expires_at[:self._size] <= time.monotonic()] = -np.inf
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    response = self._responses[best]
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return response
+
+    def add(self, embedding: List[float], response: str) -> None:
+        """Caches the response of a query under its embedding."""
+        vector = self._normalize(embedding)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self._reset(vector.shape[0])
+            slot = self._next
+            self._vectors[slot] = vector
+            self._expires_at[slot] = time.monotonic() + self.ttl_seconds
+            self._responses[slot] = response
+            self._next = (slot + 1) % self.max_entries
+            self._size = max(self._size, slot + 1)
+
+    def invalidate(self) -> None:
+        """Drops every cached response."""
+        with self._lock:
+            self._reset(None)
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the hit and miss counters and the number of entries."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": self._size}
@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List
+
+from app.core.embedding_cache import EmbeddingCache
+from app.core.config import Config
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_MAX_LOOKUP_KEYS = 500
+
+class SQLiteEmbeddingCache(EmbeddingCache):
+    def __init__(self, config: Config):
+        super().__init__()
+        cache_config = config.get("embeddings", {}).get("cache", {})
+        self.path = cache_config.get("path", "data/embedding_cache.db")
+        self.max_entries = cache_config.get("max_entries", 1_000_000)
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    embedding BLOB NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS embedding_cache_accessed_at ON embedding_cache (accessed_at)"
+            )
+            (self._size,) = self.connection.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()
+
+        logger.info(f"Using SQLite embedding cache at {self.path} with max entries: {self.max_entries}")
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        super().get_many(keys)
+        found = {}
+        with self._lock, self.connection:
+            for i in range(0, len(keys), _MAX_LOOKUP_KEYS):
+                batch_keys = keys[i:i + _MAX_LOOKUP_KEYS]
+                placeholders = ",".join("?" * len(batch_keys))
+                rows = self.connection.execute(
+                    f"SELECT cache_key, embedding FROM embedding_cache WHERE cache_key IN ({placeholders})",
+                    batch_keys,
+                ).fetchall()
+                for cache_key, blob in rows:
+                    found[cache_key] = array("f", blob).tolist()
+                if rows:
+                    self.connection.execute(
+                        f"UPDATE embedding_cache SET accessed_at = ? WHERE cache_key IN ({placeholders})",
+                        [time.time(), *batch_keys],
+                    )
+        return found
+
+    def put_many(self, entries: Dict[str, List[float]]) -> None:
+        super().put_many(entries)
+        if not entries:
+            return
+        now = time.time()
+        with self._lock, self.connection:
+            # Keys are content addresses, so an existing entry never needs to be rewritten
+            cursor = self.connection.executemany(
+                "INSERT OR IGNORE INTO embedding_cache (cache_key, embedding, accessed_at) VALUES (?, ?, ?)",
+                [(key, array("f", embedding).tobytes(), now) for key, embedding in entries.items()],
+            )
+            self._size += cursor.rowcount
+            if self._size > self.max_entries:
+                overflow = self._size - self.max_entries
+                self.connection.execute(
+                    "DELETE FROM embedding_cache WHERE cache_key IN "
+                    "(SELECT cache_key FROM embedding_cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+                self._size -= overflow
+                logger.info(f"Evicted {overflow} entries from the embedding cache")
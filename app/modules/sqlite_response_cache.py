@@ -0,0 +1,94 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from app.core.response_cache import ResponseCache
+from app.core.config import Config
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    Response cache in a local SQLite file, shared by every process on the host.
+
+    Stands in for a Redis instance where running one is not worth it: lookups are local
+    file reads and WAL mode lets concurrent readers and a writer proceed together.
+    """
+
+    def __init__(self, config: Config):
+        super().__init__()
+        response_cache_config = config.get("response_cache", {})
+        cache_config = response_cache_config.get("shared", {})
+        self.path = cache_config.get("path", "data/response_cache.db")
+        self.max_entries = cache_config.get("max_entries", 100000)
+        # The shared tier expires entries with the memory tier unless it sets its own TTL
+        self.ttl_seconds = cache_config.get("ttl_seconds", response_cache_config.get("ttl_seconds", 3600))
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS response_cache_expires_at ON response_cache (expires_at)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache_generation ("
+                "id INTEGER PRIMARY KEY CHECK (id = 0), generation INTEGER NOT NULL)"
+            )
+            self.connection.execute("INSERT OR IGNORE INTO response_cache_generation (id, generation) VALUES (0, 0)")
+
+        logger.info(f"Using SQLite response cache at {self.path} with max entries: {self.max_entries}")
+
+    def get(self, key: str) -> Optional[str]:
+        super().get(key)
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT response FROM response_cache WHERE cache_key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        self.record(row is not None)
+        return row[0] if row is not None else None
+
+    def put(self, key: str, response: str) -> None:
+        super().put(key, response)
+        now = time.time()
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO response_cache (cache_key, response, expires_at) VALUES (?, ?, ?)",
+                (key, response, now + self.ttl_seconds),
+            )
+            (size,) = self.connection.execute("SELECT COUNT(*) FROM response_cache").fetchone()
+            if size > self.max_entries:
+                # Expired entries go first, then the ones closest to expiring
+                self.connection.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+                self.connection.execute(
+                    "DELETE FROM response_cache WHERE cache_key IN "
+                    "(SELECT cache_key FROM response_cache ORDER BY expires_at LIMIT "
+                    "max(0, (SELECT COUNT(*) FROM response_cache) - ?))",
+                    (self.max_entries,),
+                )
+
+    def invalidate(self) -> None:
+        with self._lock, self.connection:
+            self.connection.execute("DELETE FROM response_cache")
+            self.connection.execute("UPDATE response_cache_generation SET generation = generation + 1")
+
+    def generation(self) -> Optional[int]:
+        with self._lock:
+            (generation,) = self.connection.execute("SELECT generation FROM response_cache_generation").fetchone()
+        return generation
@@ -0,0 +1,63 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, List
+
+from app.core.watermark_store import WatermarkStore, PageWatermark
+from app.core.config import Config
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class SQLiteWatermarkStore(WatermarkStore):
+    def __init__(self, config: Config, namespace: str = "default"):
+        ingestion_config = config.get("ingestion", {})
+        self.path = ingestion_config.get("watermark_path", "data/watermarks.db")
+        self.namespace = namespace
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS page_watermarks (
+                    namespace TEXT NOT NULL,
+                    page_id TEXT NOT NULL,
+                    version INTEGER,
+                    content_hash TEXT NOT NULL,
+                    last_modified TEXT,
+                    PRIMARY KEY (namespace, page_id)
+                )
+                """
+            )
+
+        logger.info(f"Using SQLite watermark store at {self.path} for namespace: {self.namespace}")
+
+    def get_all(self) -> Dict[str, PageWatermark]:
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT page_id, version, content_hash, last_modified FROM page_watermarks WHERE namespace = ?",
+                (self.namespace,),
+            ).fetchall()
+        return {row[0]: PageWatermark(*row) for row in rows}
+
+    def upsert(self, watermarks: List[PageWatermark]) -> None:
+        super().upsert(watermarks)
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO page_watermarks (namespace, page_id, version, content_hash, last_modified) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(self.namespace, w.page_id, w.version, w.content_hash, w.last_modified) for w in watermarks],
+            )
+
+    def delete(self, page_ids: List[str]) -> None:
+        super().delete(page_ids)
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "DELETE FROM page_watermarks WHERE namespace = ? AND page_id = ?",
+                [(self.namespace, page_id) for page_id in page_ids],
+            )
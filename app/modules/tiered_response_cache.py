@@ -0,0 +1,82 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+from app.core.response_cache import ResponseCache
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class TieredResponseCache(ResponseCache):
+    """
+    Chains caches from fastest to slowest, e.g. in-process memory in front of a shared tier.
+
+    A hit in a slower tier is copied into the faster tiers in front of it, so a response
+    cached by one instance of the service is served from memory by the others after
+    their first lookup.
+
+    Invalidation reaches the other instances through the shared tiers' generation: at most
+    every `generation_check_seconds`, a lookup reads it, and if another instance has bumped
+    it since, the in-process tiers are cleared before they serve anything.
+    """
+
+    def __init__(self, tiers: List[ResponseCache], generation_check_seconds: float = 5.0, clock=time.monotonic):
+        super().__init__()
+        if not tiers:
+            raise ValueError("tiers must not be empty")
+        self.tiers = tiers
+        self.generation_check_seconds = generation_check_seconds
+        self.clock = clock
+        self._generation: Optional[int] = None
+        self._next_check = float("-inf")
+        self._generation_lock = threading.Lock()
+
+    def _check_generation(self):
+        """Clears the in-process tiers if a shared tier was invalidated since the last check."""
+        with self._generation_lock:
+            now = self.clock()
+            if now < self._next_check:
+                return
+            self._next_check = now + self.generation_check_seconds
+            generations = [tier.generation() for tier in self.tiers]
+            shared = [generation for generation in generations if generation is not None]
+            if not shared:
+                return
+            changed = self._generation is not None and max(shared) != self._generation
+            self._generation = max(shared)
+            if changed:
+                for tier, generation in zip(self.tiers, generations):
+                    if generation is None:
+                        tier.invalidate()
+        if changed:
+            logger.info("Shared response cache was invalidated by another instance, cleared the in-process tiers")
+
+    def get(self, key: str) -> Optional[str]:
+        super().get(key)
+        self._check_generation()
+        for depth, tier in enumerate(self.tiers):
+            response = tier.get(key)
+            if response is not None:
+                for faster_tier in self.tiers[:depth]:
+                    faster_tier.put(key, response)
+                self.record(True)
+                return response
+        self.record(False)
+        return None
+
+    def put(self, key: str, response: str) -> None:
+        super().put(key, response)
+        for tier in self.tiers:
+            tier.put(key, response)
+
+    def invalidate(self) -> None:
+        for tier in self.tiers:
+            tier.invalidate()
+        with self._generation_lock:
+            # Re-read on the next lookup; this instance's tiers are already empty
+            self._generation = None
+            self._next_check = float("-inf")
+
+    def tier_stats(self) -> List[Dict[str, int]]:
+        """Returns the hit and miss counters of every tier, fastest first."""
+        return [tier.stats() for tier in self.tiers]
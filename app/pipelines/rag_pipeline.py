@@ -1,25 +1,41 @@
+import asyncio
 import hashlib
-from typing import Dict, List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Any, Tuple
 from app.core.config import Config
 from app.core.document_loader import DocumentLoader
-from app.core.chunking import ChunkingStrategy
+from app.core.chunking import ChunkingStrategy, page_id_of
 from app.core.embeddings import Embeddings
 from app.core.vectorstore import VectorStore
 from app.core.llm import LLM
+from app.core.watermark_store import WatermarkStore, PageWatermark
+from app.core.response_cache import ResponseCache
+from app.modules.memory_response_cache import MemoryResponseCache
+from app.modules.semantic_response_cache import SemanticResponseCache
+from app.pipelines.streaming_ingestion import StreamingIngestion
 from app.utils.logger import get_logger
 from app.utils.error_handler import ErrorHandler
+from app.utils.telemetry import telemetry
 
 logger = get_logger(__name__)
 
+ERROR_RESPONSE = "An error occurred while generating the response."
+
 class RAGPipeline:
     def __init__(
             self,
             config: Config,
-            document_loader: DocumentLoader,
-            chunking_strategy: ChunkingStrategy,
+            document_loader: Optional[DocumentLoader],
+            chunking_strategy: Optional[ChunkingStrategy],
             embeddings: Embeddings,
             vector_store: VectorStore,
-            llm: LLM,
+            llm: Optional[LLM],
+            watermark_store: Optional[WatermarkStore] = None,
+            response_cache: Optional[ResponseCache] = None,
+            semantic_cache: Optional[SemanticResponseCache] = None,
     ):
         self.config = config
         self.document_loader = document_loader
@@ -27,52 +43,314 @@ class RAGPipeline:
         self.embeddings = embeddings
         self.vector_store = vector_store
         self.llm = llm
+        self.watermark_store = watermark_store
         self.error_handler = ErrorHandler()
-        self.response_cache: Dict[str, str] = {}
+        self.response_cache = response_cache if response_cache is not None else MemoryResponseCache()
+        self.semantic_cache = semantic_cache
+
+        query_config = config.get_query_config()
+        self.query_executor = ThreadPoolExecutor(
+            max_workers=query_config.get("max_concurrency", 8), thread_name_prefix="rag-query"
+        )
+        self.llm_semaphore = threading.BoundedSemaphore(query_config.get("llm_concurrency", 4))
 
     def ingest_data(self, batch_size: int = 100):
         """
-        Loads, chunks, and embeds documents in batches, and adds them to the vector store.
+        Streams documents from the loader, then chunks and embeds them in batches and adds them to the vector store.
         """
         try:
             logger.info("Starting data ingestion process...")
 
-            offset = 0
-            while True:
-                logger.info(f"Loading documents with offset: {offset}")
-                documents = self.document_loader.load(limit=batch_size, offset=offset)
-                if not documents:
-                    logger.warning("No more documents found.")
-                    break
-
-                all_chunks = []
-                for doc in documents:
-                    chunks = self.chunking_strategy.chunk_document(doc)
-                    all_chunks.extend(chunks)
-
-                if not all_chunks:
-                    logger.warning("No chunks generated for this batch.")
-                    offset += batch_size
-                    continue
-
-                texts = [chunk["page_content"] for chunk in all_chunks]
-                metadatas = [chunk["metadata"] for chunk in all_chunks]
-
-                logger.info(
-                    f"Embedding and adding {len(texts)} chunks from batch {offset} to {offset + batch_size}..."
-                )
+            document_count = 0
+            with telemetry.span("ingest") as ingest_span:
+                pages = iter(self.document_loader.iter_pages())
+                while True:
+                    with telemetry.span("load"):
+                        batch = list(islice(pages, batch_size))
+                    if not batch:
+                        break
+                    document_count += len(batch)
+                    telemetry.add("rag_documents_total", len(batch))
+                    self._ingest_batch(batch, document_count)
+                ingest_span.set_attribute("documents", document_count)
 
-                # Embed the documents and add them to the vector store
-                embeddings = self.embeddings.embed_documents(texts)
-                self.vector_store.add_texts(texts, metadatas=metadatas, embeddings=embeddings)
+            if document_count == 0:
+                logger.warning("No documents found.")
+                return
+
+            self.invalidate_responses()
+            logger.info(f"Data ingestion of {document_count} documents completed successfully.")
+
+        except Exception as e:
+            self.error_handler.handle_error(e)
+
+    def _ingest_batch(self, documents: List[Dict[str, Any]], document_count: int):
+        """Chunks, embeds and writes one batch of documents."""
+        with telemetry.span("chunk", documents=len(documents)):
+            all_chunks = []
+            for chunks in self.chunking_strategy.chunk_documents(documents):
+                all_chunks.extend(chunks)
+        telemetry.add("rag_chunks_total", len(all_chunks))
+
+        if not all_chunks:
+            logger.warning("No chunks generated for this batch.")
+            return
+
+        # One metadata dict per page, referenced (not copied) by each of its chunks
+        pages = {page_id_of(doc["metadata"]): doc["metadata"] for doc in documents}
+        texts = [chunk.page_content for chunk in all_chunks]
+        metadatas = [pages[chunk.page_id] for chunk in all_chunks]
+        ids = [chunk.chunk_id for chunk in all_chunks]
+
+        logger.info(
+            f"Embedding and adding {len(texts)} chunks from documents {document_count - len(documents)} to {document_count}..."
+        )
+
+        # Embed the documents and add them to the vector store
+        with telemetry.span("embed", texts=len(texts)):
+            embeddings = self.embeddings.embed_documents(texts)
+        with telemetry.span("write", rows=len(texts)):
+            self.vector_store.add_texts(texts, metadatas=metadatas, embeddings=embeddings, ids=ids)
+
+    def ingest_streaming(
+            self,
+            batch_size: int = 100,
+            queue_size: int = 4,
+            embed_workers: int = 2,
+            write_workers: int = 1,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Ingests the source with load, chunk, embed and write running concurrently.
+
+        Args:
+            batch_size (int): Number of chunks per embed/write batch.
+            queue_size (int): Capacity of each queue between stages, in items.
+            embed_workers (int): Number of batches embedded concurrently.
+            write_workers (int): Number of batches written to the vector store concurrently.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Per-stage throughput and per-queue depth metrics.
+        """
+        try:
+            logger.info("Starting streaming data ingestion process...")
+            ingestion = StreamingIngestion(
+                self.document_loader.iter_pages(),
+                self.chunking_strategy,
+                self.embeddings,
+                self.vector_store,
+                embed_batch_size=batch_size,
+                queue_size=queue_size,
+                embed_workers=embed_workers,
+                write_workers=write_workers,
+            )
+            metrics = ingestion.run()
+            self.invalidate_responses()
+            logger.info("Streaming data ingestion completed successfully.")
+            return metrics
+
+        except Exception as e:
+            self.error_handler.handle_error(e)
+            return {}
+
+    def ingest_incremental(self, batch_size: int = 100):
+        """
+        Ingests only the pages that are new or changed since the last run and removes
+        the chunks of pages that no longer exist in the source.
 
-                offset += batch_size
+        Pages are compared against the watermark store by version and last-modified
+        timestamp; pages whose content hash did not change are not re-embedded.
+        """
+        try:
+            if self.watermark_store is None:
+                raise ValueError("Incremental ingestion requires a watermark store.")
+
+            logger.info("Starting incremental data ingestion process...")
+
+            with telemetry.span("list_versions"):
+                current_versions = self.document_loader.list_page_versions()
+            watermarks = self.watermark_store.get_all()
+
+            removed_page_ids = [page_id for page_id in watermarks if page_id not in current_versions]
+            if removed_page_ids:
+                logger.info(f"Removing {len(removed_page_ids)} pages deleted from the source.")
+                self.vector_store.delete_by_page(removed_page_ids)
+                self.watermark_store.delete(removed_page_ids)
+
+            changed_page_ids = [
+                page_id for page_id, version in current_versions.items()
+                if page_id not in watermarks
+                or watermarks[page_id].version != version["version"]
+                or watermarks[page_id].last_modified != version["last_modified"]
+            ]
+            logger.info(
+                f"{len(changed_page_ids)} of {len(current_versions)} pages are new or changed."
+            )
 
-            logger.info("Data ingestion completed successfully.")
+            rewritten_count = 0
+            for i in range(0, len(changed_page_ids), batch_size):
+                batch_page_ids = changed_page_ids[i:i + batch_size]
+                with telemetry.span("load", pages=len(batch_page_ids)):
+                    documents = self.document_loader.load_pages(batch_page_ids)
+                telemetry.add("rag_documents_total", len(documents))
+                rewritten_count += self._ingest_changed_documents(documents, current_versions, watermarks)
+
+            if removed_page_ids or rewritten_count:
+                self.invalidate_responses()
+
+            logger.info("Incremental data ingestion completed successfully.")
 
         except Exception as e:
             self.error_handler.handle_error(e)
 
+    def _ingest_changed_documents(
+            self,
+            documents: List[Dict[str, Any]],
+            current_versions: Dict[str, Dict[str, Any]],
+            watermarks: Dict[str, PageWatermark],
+    ) -> int:
+        """Re-chunks, re-embeds and rewrites the given pages, then advances their watermarks.
+
+        Returns:
+            int: The number of pages whose content changed.
+        """
+        new_watermarks = []
+        rewritten_page_ids = []
+        changed_documents = []
+        for doc in documents:
+            page_id = str(doc["metadata"]["id"])
+            version = current_versions.get(page_id, {})
+            content_hash = hashlib.sha256(doc["page_content"].encode()).hexdigest()
+            new_watermarks.append(
+                PageWatermark(
+                    page_id=page_id,
+                    version=version.get("version"),
+                    content_hash=content_hash,
+                    last_modified=version.get("last_modified"),
+                )
+            )
+            if page_id in watermarks and watermarks[page_id].content_hash == content_hash:
+                continue  # Version bumped without a content change, nothing to re-embed
+
+            doc["metadata"]["version"] = version.get("version")
+            rewritten_page_ids.append(page_id)
+            changed_documents.append(doc)
+
+        with telemetry.span("chunk", documents=len(changed_documents)):
+            all_chunks = []
+            for chunks in self.chunking_strategy.chunk_documents(changed_documents, ordered=False):
+                all_chunks.extend(chunks)
+        telemetry.add("rag_chunks_total", len(all_chunks))
+
+        stale_page_ids = [page_id for page_id in rewritten_page_ids if page_id in watermarks]
+        if stale_page_ids:
+            self.vector_store.delete_by_page(stale_page_ids)
+
+        if all_chunks:
+            pages = {page_id_of(doc["metadata"]): doc["metadata"] for doc in changed_documents}
+            texts = [chunk.page_content for chunk in all_chunks]
+            metadatas = [pages[chunk.page_id] for chunk in all_chunks]
+            ids = [chunk.chunk_id for chunk in all_chunks]
+
+            logger.info(f"Embedding and adding {len(texts)} chunks from {len(rewritten_page_ids)} changed pages...")
+
+            with telemetry.span("embed", texts=len(texts)):
+                embeddings = self.embeddings.embed_documents(texts)
+            with telemetry.span("write", rows=len(texts)):
+                self.vector_store.add_texts(texts, metadatas=metadatas, embeddings=embeddings, ids=ids)
+
+        self.watermark_store.upsert(new_watermarks)
+        return len(rewritten_page_ids)
+
+    def invalidate_responses(self):
+        """Drops cached responses, which may cite content the last ingestion run changed."""
+        self.response_cache.invalidate()
+        if self.semantic_cache is not None:
+            self.semantic_cache.invalidate()
+        logger.info("Invalidated cached responses after ingestion.")
+
+    def _cache_key(self, query: str) -> str:
+        return ResponseCache.make_key(query)
+
+    def _build_prompt(self, query: str, relevant_docs: List[Tuple[str, float]]) -> str:
+        context = "\n".join([doc[0] for doc in relevant_docs])
+        prompt_template = self.config.get(
+            "prompt_template", "Context:\n{context}\n\nQuestion:\n{query}\n\nAnswer:"
+        )
+        return prompt_template.format(context=context, query=query)
+
+    def _prompt(self, query: str, relevant_docs: List[Tuple[str, float]]) -> str:
+        """Builds the prompt as a timed stage, counting its estimated tokens."""
+        with telemetry.span("prompt", chunks=len(relevant_docs)):
+            prompt = self._build_prompt(query, relevant_docs)
+        # Roughly four characters per token, as Bedrock bills them
+        telemetry.add("rag_llm_prompt_tokens_total", max(1, len(prompt) // 4))
+        return prompt
+
+    def _cache_response(self, query: str, response: str, embedding: Optional[List[float]] = None):
+        self.response_cache.put(self._cache_key(query), response)
+        if self.semantic_cache is not None and embedding is not None:
+            self.semantic_cache.add(embedding, response)
+
+    def _answer(self, query: str, relevant_docs: List[Tuple[str, float]], embedding: Optional[List[float]] = None) -> str:
+        """Builds the prompt from the retrieved chunks, calls the LLM and caches the response."""
+        prompt = self._prompt(query, relevant_docs)
+
+        # Bound the LLM calls in flight, whichever thread or coroutine is asking
+        with self.llm_semaphore:
+            with telemetry.span("llm", prompt_chars=len(prompt)):
+                response = self.llm.generate_text(prompt)
+
+        self._cache_response(query, response, embedding)
+        return response
+
+    def _retrieve(self, query: str) -> Tuple[Optional[str], List[Tuple[str, float]], Optional[List[float]]]:
+        """
+        Looks the query up in the response caches, then retrieves its context.
+
+        Returns:
+            Tuple: (cached response or None, relevant chunks, query embedding if one was computed).
+            Exact cache hits return before the query is embedded.
+        """
+        with telemetry.span("retrieve") as span:
+            cached = self.response_cache.get(self._cache_key(query))
+            if cached is not None:
+                logger.info("Returning cached response.")
+                telemetry.add("rag_cache_hits_total", cache="response")
+                span.set_attribute("cache_hit", "response")
+                return cached, [], None
+            telemetry.add("rag_cache_misses_total", cache="response")
+
+            # Embed once: the vector serves the semantic cache, the vector search and the cache entry
+            started = time.perf_counter()
+            with telemetry.span("embed_query"):
+                embedding = self.embeddings.embed_query(query)
+            embedded_at = time.perf_counter()
+
+            # Check for a similar cached query first when the semantic cache is enabled
+            cached = self._semantic_lookup(query, embedding)
+            if cached is not None:
+                span.set_attribute("cache_hit", "semantic")
+                return cached, [], embedding
+            with telemetry.span("search"):
+                relevant_docs = self.vector_store.similarity_search_by_vector(embedding, k=4, query=query)
+            span.set_attribute("chunks", len(relevant_docs))
+        logger.info(
+            f"Retrieved {len(relevant_docs)} chunks (embedding {(embedded_at - started) * 1000:.0f} ms, "
+            f"search {(time.perf_counter() - embedded_at) * 1000:.0f} ms)"
+        )
+        return None, relevant_docs, embedding
+
+    def _semantic_lookup(self, query: str, embedding: List[float]) -> Optional[str]:
+        """Returns the response of a near-identical cached query, promoting it to the exact cache."""
+        if self.semantic_cache is None:
+            return None
+        response = self.semantic_cache.lookup(embedding)
+        telemetry.add("rag_cache_hits_total" if response is not None else "rag_cache_misses_total", cache="semantic")
+        if response is not None:
+            logger.info("Returning semantically cached response.")
+            self.response_cache.put(self._cache_key(query), response)
+        return response
+
     def generate_response(self, query: str) -> str:
         """
         Generates a response to a query using the RAG pipeline.
@@ -86,31 +364,141 @@ class RAGPipeline:
         try:
             logger.info(f"Generating response for query: {query}")
 
-            # 1. Check if the response is already cached
-            query_hash = hashlib.sha256(query.encode()).hexdigest()
-            if query_hash in self.response_cache:
-                logger.info("Returning cached response.")
-                return self.response_cache[query_hash]
+            with telemetry.span("generate_response"):
+                # 1. Check the caches and retrieve relevant documents
+                cached, relevant_docs, embedding = self._retrieve(query)
+                if cached is not None:
+                    return cached
 
-            # 2. Retrieve relevant documents
-            relevant_docs = self.vector_store.similarity_search(query, k=4)
-            context = "\n".join([doc[0] for doc in relevant_docs])
+                # 2. Build the prompt and generate the response
+                response = self._answer(query, relevant_docs, embedding)
 
-            # 3. Build the prompt
-            prompt_template = self.config.get(
-                "prompt_template", "Context:\n{context}\n\nQuestion:\n{query}\n\nAnswer:"
-            )
-            prompt = prompt_template.format(context=context, query=query)
+            logger.info("Response generated successfully.")
+            return response
 
-            # 4. Generate the response
-            response = self.llm.generate_text(prompt)
+        except Exception as e:
+            self.error_handler.handle_error(e)
+            return ERROR_RESPONSE
 
-            # 5. Cache the response
-            self.response_cache[query_hash] = response
+    def stream_response(self, query: str) -> Iterator[str]:
+        """
+        Generates a response to a query, yielding it piece by piece as the LLM produces it.
 
-            logger.info("Response generated successfully.")
-            return response
+        The complete response is cached once the stream finishes. Time to first token and
+        total latency, both measured from the start of the request, are logged separately.
+
+        Args:
+            query (str): The user's query.
+
+        Yields:
+            str: The next piece of the response. A cached response is yielded in one piece.
+        """
+        started = time.perf_counter()
+        streamed = False
+        try:
+            logger.info(f"Streaming response for query: {query}")
+            cached, relevant_docs, embedding = self._retrieve(query)
+            if cached is not None:
+                yield cached
+                return
+
+            prompt = self._prompt(query, relevant_docs)
+            retrieved_at = time.perf_counter()
+            parts = []
+            with self.llm_semaphore:
+                # The stream yields to the caller, so it is recorded as a span once it ends
+                llm_started_ns = time.time_ns()
+                first_token_ms = None
+                for part in self.llm.stream_text(prompt):
+                    if not streamed:
+                        first_token_ms = (time.perf_counter() - started) * 1000
+                        logger.info(
+                            f"Time to first token: {first_token_ms:.0f} ms "
+                            f"(retrieval {(retrieved_at - started) * 1000:.0f} ms)"
+                        )
+                        streamed = True
+                    parts.append(part)
+                    yield part
+                telemetry.record("llm", llm_started_ns, prompt_chars=len(prompt), time_to_first_token_ms=first_token_ms or 0.0)
+
+            # Only a complete response is cached; an abandoned stream never gets here
+            self._cache_response(query, "".join(parts), embedding)
+            logger.info(f"Response streamed successfully in {(time.perf_counter() - started) * 1000:.0f} ms.")
 
         except Exception as e:
             self.error_handler.handle_error(e)
-            return "An error occurred while generating the response."
\ No newline at end of file
+            if not streamed:
+                yield ERROR_RESPONSE
+
+    def _respond_by_vector(self, query: str, embedding: List[float]) -> str:
+        try:
+            cached = self._semantic_lookup(query, embedding)
+            if cached is not None:
+                return cached
+            relevant_docs = self.vector_store.similarity_search_by_vector(embedding, k=4, query=query)
+            return self._answer(query, relevant_docs, embedding)
+        except Exception as e:
+            self.error_handler.handle_error(e)
+            return ERROR_RESPONSE
+
+    def generate_responses(self, queries: List[str]) -> List[str]:
+        """
+        Generates responses to several queries at once.
+
+        Cached and repeated queries are answered once. The remaining queries are embedded
+        together (in a single Bedrock request when the model supports it), then their vector
+        searches and LLM calls run concurrently on the query pool.
+
+        Args:
+            queries (List[str]): The user's queries.
+
+        Returns:
+            List[str]: The responses, in the order of the queries.
+        """
+        logger.info(f"Generating responses for {len(queries)} queries")
+        keys = [self._cache_key(query) for query in queries]
+        responses: Dict[str, str] = {}
+        pending: Dict[str, str] = {}
+        for key, query in zip(keys, queries):
+            if key in responses or key in pending:
+                continue
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                responses[key] = cached
+            else:
+                pending[key] = query
+
+        if pending:
+            try:
+                embeddings = self.embeddings.embed_queries(list(pending.values()))
+            except Exception as e:
+                self.error_handler.handle_error(e)
+                embeddings = None
+
+            if embeddings is None:
+                responses.update({key: ERROR_RESPONSE for key in pending})
+            else:
+                futures = {
+                    key: self.query_executor.submit(self._respond_by_vector, query, embedding)
+                    for (key, query), embedding in zip(pending.items(), embeddings)
+                }
+                responses.update({key: future.result() for key, future in futures.items()})
+
+        logger.info(f"Generated {len(pending)} responses, {len(queries) - len(pending)} served from cache")
+        return [responses[key] for key in keys]
+
+    async def agenerate_response(self, query: str) -> str:
+        """
+        Generates a response without blocking the event loop.
+
+        The blocking Bedrock and Postgres calls run on the query pool, so concurrent callers
+        overlap up to `query.max_concurrency`, with LLM calls capped at `query.llm_concurrency`.
+
+        Args:
+            query (str): The user's query.
+
+        Returns:
+            str: The generated response.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.query_executor, self.generate_response, query)
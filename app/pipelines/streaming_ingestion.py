@@ -0,0 +1,261 @@
+import queue
+import threading
+import time
+from itertools import count
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from app.core.chunking import Chunk, ChunkingStrategy
+from app.core.embeddings import Embeddings
+from app.core.vectorstore import VectorStore
+from app.utils.logger import get_logger
+from app.utils.telemetry import telemetry
+
+logger = get_logger(__name__)
+
+_END = object()
+
+
+class StageMetrics:
+    """Counters for one pipeline stage. Updated by the stage's workers, read by anyone."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_seconds = 0.0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def record(self, items_in: int, items_out: int, busy_seconds: float):
+        with self._lock:
+            self.items_in += items_in
+            self.items_out += items_out
+            self.busy_seconds += busy_seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = ((self.finished_at or time.monotonic()) - self.started_at) if self.started_at else 0.0
+            return {
+                "items_in": self.items_in,
+                "items_out": self.items_out,
+                "busy_seconds": round(self.busy_seconds, 3),
+                "items_per_sec": round(self.items_out / elapsed, 2) if elapsed else 0.0,
+                # Fraction of wall time the stage was working rather than waiting on its neighbours
+                "utilization": round(self.busy_seconds / elapsed, 3) if elapsed else 0.0,
+            }
+
+
+class MeteredQueue:
+    """A bounded queue that tracks its current and peak depth."""
+
+    def __init__(self, name: str, maxsize: int, stop_event: threading.Event):
+        self.name = name
+        self.queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self.peak_depth = 0
+        self.stop_event = stop_event
+
+    def put(self, item: Any):
+        # Block while full (backpressure) but give up if the pipeline is aborting
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                self.peak_depth = max(self.peak_depth, self.queue.qsize())
+                return
+            except queue.Full:
+                continue
+
+    def get(self) -> Any:
+        while not self.stop_event.is_set():
+            try:
+                return self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"depth": self.queue.qsize(), "peak_depth": self.peak_depth, "capacity": self.queue.maxsize}
+
+
+class StreamingIngestion:
+    """
+    Runs load -> chunk -> embed -> write as concurrent stages connected by bounded queues.
+
+    Each stage runs in its own worker thread(s), so Confluence fetches, chunking, Bedrock
+    calls and pgvector inserts overlap. Because every queue is bounded, a slow stage blocks
+    the stages upstream of it and memory stays flat regardless of the size of the space.
+    """
+
+    def __init__(
+            self,
+            documents: Iterable[Dict[str, Any]],
+            chunking_strategy: ChunkingStrategy,
+            embeddings: Embeddings,
+            vector_store: VectorStore,
+            embed_batch_size: int = 100,
+            queue_size: int = 4,
+            embed_workers: int = 2,
+            write_workers: int = 1,
+    ):
+        self.documents = documents
+        self.chunking_strategy = chunking_strategy
+        self.embeddings = embeddings
+        self.vector_store = vector_store
+        self.embed_batch_size = embed_batch_size
+        self.stop_event = threading.Event()
+        self.errors: List[BaseException] = []
+
+        self.stage_metrics = {name: StageMetrics(name) for name in ("load", "chunk", "embed", "write")}
+        self.queues = {
+            name: MeteredQueue(name, queue_size, self.stop_event)
+            for name in ("documents", "chunk_batches", "embedded_batches")
+        }
+        self.workers = {"load": 1, "chunk": 1, "embed": embed_workers, "write": write_workers}
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Returns per-stage throughput and per-queue depth. Safe to call while running."""
+        return {
+            "stages": {name: metrics.snapshot() for name, metrics in self.stage_metrics.items()},
+            "queues": {name: q.snapshot() for name, q in self.queues.items()},
+        }
+
+    def _load(self, emit: Callable[[Any], None]):
+        metrics = self.stage_metrics["load"]
+        iterator: Iterator[Dict[str, Any]] = iter(self.documents)
+        while not self.stop_event.is_set():
+            started = time.monotonic()
+            document = next(iterator, _END)
+            metrics.record(0, 0 if document is _END else 1, time.monotonic() - started)
+            if document is _END:
+                return
+            emit(document)
+
+    def _chunk(self, inbox: MeteredQueue, emit: Callable[[Any], None]):
+        metrics = self.stage_metrics["chunk"]
+        waited = [0.0]
+        # Metadata of the documents being chunked, by position in the stream rather than page id,
+        # so documents without an id do not collide
+        pages: Dict[int, Dict[str, Any]] = {}
+        sequence = count()
+
+        def documents() -> Iterator[Dict[str, Any]]:
+            # Time spent waiting on the loader is not chunking time
+            while True:
+                started = time.monotonic()
+                document = inbox.get()
+                waited[0] += time.monotonic() - started
+                if document is _END:
+                    return
+                pages[next(sequence)] = document["metadata"]
+                yield document
+
+        # Each batch carries a reference to the page metadata of every chunk, not a copy
+        batch: List[Chunk] = []
+        batch_metadatas: List[Dict[str, Any]] = []
+        started = time.monotonic()
+        # Ordered, so the n-th list of chunks belongs to the n-th document, including documents with no chunks
+        for position, chunks in enumerate(self.chunking_strategy.chunk_documents(documents(), ordered=True)):
+            metadata = pages.pop(position)
+            metrics.record(1, len(chunks), time.monotonic() - started - waited[0])
+            telemetry.add("rag_documents_total")
+            telemetry.add("rag_chunks_total", len(chunks))
+            for chunk in chunks:
+                batch.append(chunk)
+                batch_metadatas.append(metadata)
+                if len(batch) >= self.embed_batch_size:
+                    emit((batch, batch_metadatas))
+                    batch, batch_metadatas = [], []
+            started, waited[0] = time.monotonic(), 0.0
+        if batch:
+            emit((batch, batch_metadatas))
+
+    def _embed(self, inbox: MeteredQueue, emit: Callable[[Any], None]):
+        metrics = self.stage_metrics["embed"]
+        while True:
+            item = inbox.get()
+            if item is _END:
+                return
+            batch, metadatas = item
+            started = time.monotonic()
+            texts = [chunk.page_content for chunk in batch]
+            ids = [chunk.chunk_id for chunk in batch]
+            with telemetry.span("embed", texts=len(texts)):
+                vectors = self.embeddings.embed_documents(texts)
+            metrics.record(len(texts), len(vectors), time.monotonic() - started)
+            emit((texts, metadatas, ids, vectors))
+
+    def _write(self, inbox: MeteredQueue, emit: Callable[[Any], None]):
+        metrics = self.stage_metrics["write"]
+        while True:
+            item = inbox.get()
+            if item is _END:
+                return
+            texts, metadatas, ids, vectors = item
+            started = time.monotonic()
+            with telemetry.span("write", rows=len(texts)):
+                self.vector_store.add_texts(texts, metadatas=metadatas, embeddings=vectors, ids=ids)
+            metrics.record(len(texts), len(texts), time.monotonic() - started)
+
+    def _start_stage(self, name: str, target: Callable, inbox: Optional[MeteredQueue],
+                     outbox: Optional[MeteredQueue]) -> List[threading.Thread]:
+        """Starts the workers of a stage. The last worker to finish closes the outbox."""
+        remaining = [self.workers[name]]
+        lock = threading.Lock()
+        emit = outbox.put if outbox is not None else (lambda item: None)
+
+        def run():
+            try:
+                if inbox is None:
+                    target(emit)
+                else:
+                    target(inbox, emit)
+            except BaseException as e:
+                self.errors.append(e)
+                self.stop_event.set()
+            finally:
+                if inbox is not None and not self.stop_event.is_set():
+                    inbox.put(_END)  # Let sibling workers see the end of the stream too
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    self.stage_metrics[name].finished_at = time.monotonic()
+                    if outbox is not None:
+                        outbox.put(_END)
+
+        self.stage_metrics[name].started_at = time.monotonic()
+        threads = [
+            threading.Thread(target=run, name=f"ingest-{name}-{i}", daemon=True)
+            for i in range(self.workers[name])
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def run(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Runs the pipeline to completion.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The final metrics, as returned by `metrics`.
+
+        Raises:
+            The first exception raised by any stage, after all stages have stopped.
+        """
+        threads = []
+        threads += self._start_stage("load", self._load, None, self.queues["documents"])
+        threads += self._start_stage("chunk", self._chunk, self.queues["documents"], self.queues["chunk_batches"])
+        threads += self._start_stage("embed", self._embed, self.queues["chunk_batches"], self.queues["embedded_batches"])
+        threads += self._start_stage("write", self._write, self.queues["embedded_batches"], None)
+        for thread in threads:
+            thread.join()
+
+        metrics = self.metrics()
+        for name, stage in metrics["stages"].items():
+            logger.info(
+                f"Stage {name}: {stage['items_out']} items, {stage['items_per_sec']} items/sec, "
+                f"utilization {stage['utilization']:.0%}"
+            )
+        if self.errors:
+            raise self.errors[0]
+        return metrics
@@ -0,0 +1,51 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket that refills continuously at `rate` tokens per second."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, amount: float = 1) -> float:
+        """
+        Blocks until `amount` tokens are available and consumes them.
+
+        Requests larger than the bucket capacity are allowed once the bucket is full,
+        so a single oversized request cannot block forever.
+
+        Args:
+            amount (float): The number of tokens to consume.
+
+        Returns:
+            float: The total time spent waiting, in seconds.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                needed = min(amount, self.capacity)
+                if self.tokens >= needed:
+                    self.tokens -= amount
+                    return waited
+                delay = (needed - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def set_rate(self, rate: float):
+        """Changes the refill rate, keeping the tokens accumulated so far."""
+        with self._lock:
+            self._refill()
+            self.rate = rate
@@ -0,0 +1,55 @@
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import List, Tuple
+
+
+class StartupProfiler:
+    """
+    Records where cold-start time goes: how long each startup stage takes and which packages it imports.
+
+    Stages are timed with `stage()`; imports are attributed to the stage that first loaded them, grouped
+    by top-level package. When disabled, `stage()` only yields, so the driver can always wrap its stages.
+    For a per-module breakdown of import time, run the driver under `python -X importtime`.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.stages: List[Tuple[str, float, Counter]] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        """Times the enclosed block as the named stage."""
+        if not self.enabled:
+            yield
+            return
+        modules_before = set(sys.modules)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            imported = Counter(module.partition(".")[0] for module in set(sys.modules) - modules_before)
+            self.stages.append((name, elapsed, imported))
+
+    def report(self, top_packages: int = 5) -> str:
+        """
+        Formats the recorded stages, slowest first, with the packages each one imported.
+
+        Args:
+            top_packages (int): The number of packages listed per stage, by modules imported.
+
+        Returns:
+            str: The report.
+        """
+        total = time.perf_counter() - self.started
+        lines = [f"Startup profile: {total * 1000:.0f} ms since the driver was imported"]
+        for name, elapsed, imported in sorted(self.stages, key=lambda stage: stage[1], reverse=True):
+            packages = ", ".join(f"{package} ({count})" for package, count in imported.most_common(top_packages))
+            lines.append(
+                f"  {name:<20} {elapsed * 1000:8.1f} ms  {sum(imported.values()):4d} modules imported"
+                + (f": {packages}" if packages else "")
+            )
+        return "\n".join(lines)
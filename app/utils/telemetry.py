@@ -0,0 +1,367 @@
+import json
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Upper bounds of the stage duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STAGE_DURATION_METRIC = "rag_stage_duration_seconds"
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+class Span:
+    """A timed operation. Nested spans share their root's trace id; the parent is the span open on this context."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+
+class _NoopSpan:
+    """Returned by `Telemetry.span` when no exporter is configured; every operation is a no-op."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class _ActiveSpan:
+    __slots__ = ("telemetry", "span", "token")
+
+    def __init__(self, telemetry: "Telemetry", name: str, attributes: Dict[str, Any]):
+        self.telemetry = telemetry
+        self.span = Span(name, _current_span.get(), attributes)
+
+    def __enter__(self) -> Span:
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self.token)
+        self.span.end_ns = time.time_ns()
+        if exc is not None:
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        self.telemetry._end(self.span)
+        return False
+
+
+class MetricsRegistry:
+    """Thread-safe counters and stage duration histograms, rendered in the Prometheus text exposition format."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counters: Dict[str, Dict[LabelSet, float]] = {}
+        # name -> labels -> (bucket counts, sum, count)
+        self.histograms: Dict[str, Dict[LabelSet, List]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, value: float, labels: LabelSet = ()):
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0.0) + value
+
+    def observe(self, name: str, value: float, labels: LabelSet = ()):
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            for name, series in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for labels, (counts, total, count) in sorted(series.items()):
+                    cumulative = 0
+                    for bound, bucket_count in zip(self.buckets, counts):
+                        cumulative += bucket_count
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: LabelSet) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class PrometheusExporter:
+    """
+    Exposes the metrics registry to Prometheus.
+
+    The text exposition is written to `path` on every flush (atomically, so the node_exporter
+    textfile collector never reads a partial file) and, when `port` is set, served on
+    `/metrics` for long-lived workers.
+    """
+
+    def __init__(self, registry: MetricsRegistry, path: Optional[str] = None, port: Optional[int] = None):
+        self.registry = registry
+        self.path = path
+        self.server = None
+        if port:
+            self.server = ThreadingHTTPServer(("", int(port)), self._handler())
+            threading.Thread(target=self.server.serve_forever, name="prometheus-exporter", daemon=True).start()
+            logger.info(f"Serving Prometheus metrics on port {port}")
+
+    def _handler(self):
+        registry = self.registry
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return MetricsHandler
+
+    def export(self, span: Span):
+        pass
+
+    def flush(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            f.write(self.registry.render())
+        os.replace(temporary, self.path)
+
+    def shutdown(self):
+        self.flush()
+        if self.server is not None:
+            self.server.shutdown()
+
+
+class OTLPJsonFileExporter:
+    """
+    Writes finished spans as OpenTelemetry traces in the OTLP/JSON encoding.
+
+    Each flush appends one `ExportTraceServiceRequest` per line, the format read by the
+    OpenTelemetry Collector's `otlpjsonfile` receiver, so spans can be forwarded to any
+    tracing backend without an OpenTelemetry SDK in this process.
+    """
+
+    def __init__(self, path: str, service_name: str, max_buffered: int = 1000):
+        self.path = path
+        self.service_name = service_name
+        self.max_buffered = max_buffered
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+            full = len(self.spans) >= self.max_buffered
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            spans, self.spans = self.spans, []
+        if not spans:
+            return
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "app.utils.telemetry"},
+                    "spans": [self._encode(span) for span in spans],
+                }],
+            }]
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(request) + "\n")
+
+    @staticmethod
+    def _encode(span: Span) -> Dict[str, Any]:
+        encoded = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id:
+            encoded["parentSpanId"] = span.parent_id
+        return encoded
+
+    def shutdown(self):
+        self.flush()
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+
+class Telemetry:
+    """
+    Process-wide spans and counters for the pipeline stages, exported to Prometheus and as OTLP traces.
+
+    Nothing is recorded until `configure` is given an exporter: `span` then returns a shared
+    no-op span and `add` returns immediately, so instrumented code costs a function call.
+    Every ended span is also observed in the `rag_stage_duration_seconds{stage=...}` histogram.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.registry = MetricsRegistry()
+        self.exporters: List[Any] = []
+
+    def configure(self, telemetry_config) -> "Telemetry":
+        """
+        Sets up the exporters named in the `telemetry` config section.
+
+        Args:
+            telemetry_config: The section, as returned by `Config.get_telemetry_config`.
+
+        Returns:
+            Telemetry: This instance.
+        """
+        self.shutdown()
+        self.exporters = []
+        names = telemetry_config.get("exporters") or ()
+        if "prometheus" in names:
+            prometheus_config = telemetry_config.get("prometheus") or {}
+            self.exporters.append(
+                PrometheusExporter(self.registry, prometheus_config.get("path"), prometheus_config.get("port"))
+            )
+        if "otel" in names:
+            otel_config = telemetry_config.get("otel") or {}
+            self.exporters.append(OTLPJsonFileExporter(
+                otel_config.get("path") or "data/spans.jsonl", telemetry_config.get("service_name") or "confluence-rag"
+            ))
+        self.enabled = bool(self.exporters)
+        return self
+
+    def span(self, name: str, **attributes: Any):
+        """
+        Times the enclosed block as a span of the current trace.
+
+        Args:
+            name (str): The stage name, e.g. "embed"; also the `stage` label of the duration histogram.
+            **attributes: Span attributes, e.g. the number of texts in a batch.
+        """
+        if not self.enabled:
+            return NOOP_SPAN
+        return _ActiveSpan(self, name, attributes)
+
+    def record(self, name: str, start_ns: int, **attributes: Any):
+        """
+        Records an operation that started at `start_ns` (from `time.time_ns()`) and ends now as a span.
+
+        For work that cannot sit inside a `with` block, such as a generator yielding to its caller.
+        """
+        if not self.enabled:
+            return
+        span = Span(name, _current_span.get(), attributes)
+        span.start_ns, span.end_ns = start_ns, time.time_ns()
+        self._end(span)
+
+    def add(self, name: str, value: float = 1, **labels: Any):
+        """
+        Increments a counter, e.g. `add("rag_chunks_total", 120)`.
+
+        Args:
+            name (str): The Prometheus metric name, ending in `_total`.
+            value (float): The increment.
+            **labels: The metric labels.
+        """
+        if not self.enabled:
+            return
+        self.registry.add(name, value, tuple(sorted((key, str(label)) for key, label in labels.items())))
+
+    def _end(self, span: Span):
+        self.registry.observe(STAGE_DURATION_METRIC, span.duration, (("stage", span.name),))
+        for exporter in self.exporters:
+            exporter.export(span)
+
+    def flush(self):
+        for exporter in self.exporters:
+            exporter.flush()
+
+    def shutdown(self):
+        """Flushes and stops the exporters."""
+        for exporter in self.exporters:
+            try:
+                exporter.shutdown()
+            except Exception as e:
+                logger.warning(f"Could not flush {type(exporter).__name__}: {e}")
+
+
+telemetry = Telemetry()
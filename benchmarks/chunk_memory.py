@@ -0,0 +1,84 @@
+"""Measures what per-chunk metadata copies cost against page-level metadata shared by reference.
+
+Reports the peak Python heap while holding every chunk of a synthetic space as the former
+per-chunk dicts and as `Chunk` records with one metadata dict per page, and the bytes of
+metadata JSON written per chunk when it is inlined versus stored once per page.
+
+Usage:
+    python -m benchmarks.chunk_memory --documents 2000
+"""
+import argparse
+import json
+import random
+import tracemalloc
+
+from app.core.chunking import page_reference
+from app.modules.markdown_recursive_splitter import MarkdownRecursiveChunking
+from benchmarks.chunking import StubConfig, make_corpus
+
+
+def with_confluence_metadata(corpus, seed: int = 7):
+    rng = random.Random(seed)
+    for document in corpus:
+        page_id = document["metadata"]["id"]
+        document["metadata"].update({
+            "title": f"Runbook {page_id}: database failover and replica recovery",
+            "space": rng.choice(["OPS", "DEV", "SEC"]),
+            "source": f"https://example.atlassian.net/wiki/spaces/OPS/pages/{page_id}",
+            "last_modified": "2024-03-05T10:00:00.000Z",
+            "labels": rng.sample(["runbook", "database", "oncall", "network", "postgres"], 2),
+            "ancestors": [str(rng.randint(1, 10 ** 6)) for _ in range(rng.randint(1, 5))],
+        })
+    return corpus
+
+
+def measure_peak(build) -> int:
+    tracemalloc.start()
+    held = build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-chunk metadata copies against shared page metadata.")
+    parser.add_argument("--documents", type=int, default=1000)
+    args = parser.parse_args()
+
+    corpus = with_confluence_metadata(make_corpus(args.documents))
+    chunking = MarkdownRecursiveChunking(StubConfig({}))
+    per_document = [chunking.chunk_document(document) for document in corpus]
+    chunks = sum(len(document_chunks) for document_chunks in per_document)
+
+    # Chunks as the pipeline used to carry them: a dict per chunk with its own metadata copy
+    # (as after a process-pool round trip or a JSON row), versus records referring to the page
+    dict_peak = measure_peak(lambda: [
+        {"page_content": chunk.page_content, "metadata": dict(document["metadata"]), "chunk_id": chunk.chunk_id}
+        for document, document_chunks in zip(corpus, per_document) for chunk in document_chunks
+    ])
+    record_peak = measure_peak(lambda: (
+        [chunk.__class__(chunk.page_content, chunk.page_id, chunk.chunk_id)
+         for document_chunks in per_document for chunk in document_chunks],
+        {document["metadata"]["id"]: document["metadata"] for document in corpus},
+    ))
+
+    inline_bytes = sum(
+        len(json.dumps(document["metadata"])) * len(document_chunks) for document, document_chunks in zip(corpus, per_document)
+    )
+    shared_bytes = sum(
+        len(json.dumps(page_reference(document["metadata"]))) * len(document_chunks) + len(json.dumps(document["metadata"]))
+        for document, document_chunks in zip(corpus, per_document)
+    )
+    print(json.dumps({
+        "documents": len(corpus),
+        "chunks": chunks,
+        "dict_chunks_peak_bytes": dict_peak,
+        "record_chunks_peak_bytes": record_peak,
+        "inline_metadata_bytes": inline_bytes,
+        "page_table_metadata_bytes": shared_bytes,
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Measures MarkdownRecursiveChunking throughput serially and over process pools of several sizes.
+
+The synthetic corpus mixes headings, prose, tables and code blocks, with a long tail of
+large pages like the ones that dominate chunking time in real spaces.
+
+Usage:
+    python -m benchmarks.chunking --documents 2000 --workers 0 2 4 8
+"""
+import argparse
+import json
+import random
+import time
+
+from app.modules.markdown_recursive_splitter import MarkdownRecursiveChunking
+
+WORDS = ["database", "failover", "replica", "deploy", "rollback", "latency", "queue", "cluster", "token", "schema"]
+
+
+class StubConfig:
+    def __init__(self, chunking_config):
+        self.chunking_config = chunking_config
+
+    def get(self, key, default=None):
+        return self.chunking_config if key == "chunking" else default
+
+
+def make_markdown(rng: random.Random, sections: int) -> str:
+    parts = []
+    for section in range(sections):
+        parts.append(f"## Section {section}\n")
+        parts.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 200))) + "\n")
+        if rng.random() < 0.3:
+            rows = [f"| {rng.choice(WORDS)} | {rng.randint(0, 999)} | {rng.choice(WORDS)} |" for _ in range(rng.randint(5, 40))]
+            parts.append("| name | value | owner |\n| --- | --- | --- |\n" + "\n".join(rows) + "\n")
+        if rng.random() < 0.3:
+            lines = [f"    {rng.choice(WORDS)}_{i} = run('{rng.choice(WORDS)}')" for i in range(rng.randint(5, 60))]
+            parts.append("```python\n" + "\n".join(lines) + "\n```\n")
+    return "\n".join(parts)
+
+
+def make_corpus(documents: int, seed: int = 42):
+    rng = random.Random(seed)
+    # Mostly small pages with a long tail of very large ones
+    return [
+        {"page_content": make_markdown(rng, min(int(rng.paretovariate(1.2) * 3), 200)), "metadata": {"id": str(i), "version": 1}}
+        for i in range(documents)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial and process-pool Markdown chunking.")
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4])
+    parser.add_argument("--task-size", type=int, default=8)
+    parser.add_argument("--unordered", action="store_true", help="Yield results as tasks complete.")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.documents)
+    characters = sum(len(document["page_content"]) for document in corpus)
+    for workers in args.workers:
+        chunking = MarkdownRecursiveChunking(StubConfig({"workers": workers, "task_size": args.task_size}))
+        # Start the pool outside the timed run, as a long ingestion amortizes it
+        list(chunking.chunk_documents(corpus[:workers]))
+        started = time.perf_counter()
+        chunks = sum(len(result) for result in chunking.chunk_documents(corpus, ordered=not args.unordered))
+        seconds = time.perf_counter() - started
+        chunking.close()
+        print(json.dumps({
+            "workers": workers,
+            "task_size": args.task_size,
+            "ordered": not args.unordered,
+            "documents": len(corpus),
+            "chunks": chunks,
+            "seconds": round(seconds, 3),
+            "documents_per_sec": round(len(corpus) / seconds, 1),
+            "mb_per_sec": round(characters / seconds / 1e6, 2),
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compares two `benchmarks.suite` result files and fails on regressions.
+
+Prints one JSON line per metric that changed by more than the threshold in the worse
+direction, and exits with status 1 if there is any.
+
+Usage:
+    python -m benchmarks.suite --output base.json && git checkout feature && python -m benchmarks.suite --output head.json
+    python -m benchmarks.compare base.json head.json --threshold 0.1
+"""
+import argparse
+import json
+import sys
+
+# Metrics compared between runs, and whether higher values are better
+METRICS = {
+    "docs_per_s": True,
+    "chunks_per_s": True,
+    "qps": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "max_rss_mb": False,
+}
+
+
+def compare(base: dict, head: dict, threshold: float) -> list:
+    changes = []
+    for scenario, head_result in head["results"].items():
+        base_result = base["results"].get(scenario)
+        if base_result is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if metric not in head_result or not base_result.get(metric):
+                continue
+            change = (head_result[metric] - base_result[metric]) / base_result[metric]
+            changes.append({
+                "scenario": scenario,
+                "metric": metric,
+                "base": base_result[metric],
+                "head": head_result[metric],
+                "change": round(change, 3),
+                "regression": (-change if higher_is_better else change) > threshold,
+            })
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change tolerated, e.g. 0.1 for 10%%.")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    if base.get("params") != head.get("params"):
+        print(json.dumps({"warning": "the runs used different parameters", "base": base.get("params"),
+                          "head": head.get("params")}))
+
+    changes = compare(base, head, args.threshold)
+    for change in changes:
+        print(json.dumps(change))
+    if any(change["regression"] for change in changes):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
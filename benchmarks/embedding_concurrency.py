@@ -0,0 +1,99 @@
+"""Measures BedrockEmbeddings throughput against a local bedrock-runtime stub.
+
+Usage:
+    python -m benchmarks.embedding_concurrency --chunks 400 --latency-ms 50
+"""
+import argparse
+import io
+import json
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+from app.modules.bedrock_embedding import BedrockEmbeddings
+
+
+class StubBedrockRuntime:
+    """Mimics `invoke_model` of bedrock-runtime with a fixed latency and a TPS quota."""
+
+    def __init__(self, latency: float, max_requests_per_second: float, dimensions: int = 1536):
+        self.latency = latency
+        self.max_requests_per_second = max_requests_per_second
+        self.dimensions = dimensions
+        self.throttled = 0
+        self._window_start = time.monotonic()
+        self._window_requests = 0
+        self._lock = threading.Lock()
+
+    def invoke_model(self, modelId, body, **kwargs):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start, self._window_requests = now, 0
+            self._window_requests += 1
+            if self._window_requests > self.max_requests_per_second:
+                self.throttled += 1
+                raise ClientError({"Error": {"Code": "ThrottlingException"}}, "InvokeModel")
+        time.sleep(self.latency)
+        seed = len(json.loads(body)["inputText"])
+        embedding = [float((seed + i) % 7) for i in range(self.dimensions)]
+        return {"body": io.BytesIO(json.dumps({"embedding": embedding}).encode())}
+
+
+class StubConfig:
+    def __init__(self, embeddings_config):
+        self.embeddings_config = embeddings_config
+
+    def get_embeddings_config(self):
+        return self.embeddings_config
+
+
+class StubAWSManager:
+    def __init__(self, client):
+        self.client = client
+
+    def get_client(self, service_name, assumed_role_arn=None):
+        return self.client
+
+
+def run(chunks: int, latency: float, quota: float, concurrency: int) -> dict:
+    client = StubBedrockRuntime(latency=latency, max_requests_per_second=quota)
+    config = StubConfig(
+        {
+            "model_id": "amazon.titan-embed-text-v1",
+            "max_concurrency": concurrency,
+            "requests_per_second": quota,
+            "tokens_per_minute": 10_000_000,
+        }
+    )
+    embeddings = BedrockEmbeddings(config, StubAWSManager(client))
+    texts = [f"chunk {i} " * 20 for i in range(chunks)]
+
+    started = time.perf_counter()
+    embeddings.embed_documents(texts)
+    elapsed = time.perf_counter() - started
+    embeddings.executor.shutdown()
+
+    return {
+        "concurrency": concurrency,
+        "chunks_per_sec": round(chunks / elapsed, 1),
+        "seconds": round(elapsed, 2),
+        "throttled": client.throttled,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent Bedrock embedding throughput.")
+    parser.add_argument("--chunks", type=int, default=400)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--quota", type=float, default=200, help="Stub requests/sec quota before throttling.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    for concurrency in args.concurrency:
+        print(json.dumps(run(args.chunks, args.latency_ms / 1000, args.quota, concurrency)))
+
+
+if __name__ == "__main__":
+    main()
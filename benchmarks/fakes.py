@@ -0,0 +1,220 @@
+"""Local stand-ins for Bedrock and Confluence, used by the benchmark suite.
+
+`FakeBedrockServer` speaks the bedrock-runtime `InvokeModel` REST protocol, so the real
+boto3 clients, AWSManager, BedrockEmbeddings and BedrockLLM talk to it unchanged once
+`AWS_ENDPOINT_URL_BEDROCK_RUNTIME` points at it. Responses are deterministic: embeddings are
+derived from a hash of the text, and latency jitter and throttling come from a seeded RNG.
+`SyntheticConfluenceLoader` serves a generated space through the DocumentLoader interface.
+
+Usage (the suite starts the server itself; standalone it prints its port and serves until killed):
+    python -m benchmarks.fakes --latency-ms 40 --throttle-rate 0.05
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List
+
+from app.core.document_loader import DocumentLoader
+from benchmarks.chunking import make_markdown
+
+INVOKE_PATH = re.compile(r"^/model/(?P<model_id>[^/]+)/invoke$")
+SPACES = ["OPS", "DEV", "SEC", "DATA"]
+LABELS = ["runbook", "database", "oncall", "network", "postgres", "howto", "architecture"]
+
+
+def fake_embedding(text: str, dimensions: int) -> List[float]:
+    """A unit vector seeded by the text, so the same text always gets the same embedding."""
+    rng = random.Random(hashlib.sha256(text.encode()).digest())
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [round(value / norm, 6) for value in vector]
+
+
+class FakeBedrockServer:
+    """
+    Serves `InvokeModel` for Titan and Cohere embedding models and Anthropic text completions.
+
+    Args:
+        latency_ms (float): Base latency of every request.
+        jitter_ms (float): Uniform jitter added to the latency.
+        llm_latency_ms (float): Base latency of text completions, which are much slower than embeddings.
+        throttle_rate (float): Fraction of requests rejected with ThrottlingException.
+        max_requests_per_second (float): A TPS quota; requests over it within a second are throttled. 0 disables it.
+        dimensions (int): The embedding dimensions.
+        seed (int): Seeds latency jitter and throttling.
+    """
+
+    def __init__(self, latency_ms: float = 40, jitter_ms: float = 10, llm_latency_ms: float = 400,
+                 throttle_rate: float = 0.0, max_requests_per_second: float = 0, dimensions: int = 256,
+                 seed: int = 42, port: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.llm_latency_ms = llm_latency_ms
+        self.throttle_rate = throttle_rate
+        self.max_requests_per_second = max_requests_per_second
+        self.dimensions = dimensions
+        self.requests = 0
+        self.throttled = 0
+        self._rng = random.Random(seed)
+        self._window_start = time.monotonic()
+        self._window_requests = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+
+    @property
+    def endpoint_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "FakeBedrockServer":
+        threading.Thread(target=self.server.serve_forever, name="fake-bedrock", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    def _admit(self) -> tuple:
+        """Decides, in arrival order, whether a request is throttled and how long it takes."""
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start, self._window_requests = now, 0
+            self._window_requests += 1
+            throttled = self._rng.random() < self.throttle_rate or (
+                self.max_requests_per_second and self._window_requests > self.max_requests_per_second
+            )
+            if throttled:
+                self.throttled += 1
+            return throttled, self._rng.uniform(0, self.jitter_ms)
+
+    def respond(self, model_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        if "inputText" in body:
+            return {"embedding": fake_embedding(body["inputText"], self.dimensions),
+                    "inputTextTokenCount": max(1, len(body["inputText"]) // 4)}
+        if "texts" in body:
+            return {"embeddings": [fake_embedding(text, self.dimensions) for text in body["texts"]]}
+        prompt = body.get("prompt", "")
+        return {"completion": f" Answer drawn from {len(prompt)} characters of context.", "stop_reason": "stop_sequence"}
+
+    def _handler(self):
+        fake = self
+
+        class BedrockHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; with Nagle on, delayed ACKs add ~40 ms to each response
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                match = INVOKE_PATH.match(self.path)
+                if match is None:
+                    return self._send(404, {"message": f"Unknown path {self.path}"}, "ResourceNotFoundException")
+                throttled, jitter_ms = fake._admit()
+                if throttled:
+                    return self._send(429, {"message": "Too many requests, please wait before trying again."},
+                                      "ThrottlingException")
+                is_completion = "prompt" in body or "messages" in body
+                time.sleep(((fake.llm_latency_ms if is_completion else fake.latency_ms) + jitter_ms) / 1000)
+                self._send(200, fake.respond(match.group("model_id"), body))
+
+            def _send(self, status: int, payload: Dict[str, Any], error_type: str = None):
+                encoded = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(encoded)))
+                if error_type:
+                    self.send_header("x-amzn-ErrorType", error_type)
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def log_message(self, format, *args):
+                pass
+
+        return BedrockHandler
+
+
+def make_space(pages: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Generates a Confluence space: Markdown pages with a long tail of large ones, and Confluence-like metadata."""
+    rng = random.Random(seed)
+    space = []
+    for i in range(pages):
+        page_id = str(100000 + i)
+        space.append({
+            "page_content": make_markdown(rng, min(int(rng.paretovariate(1.2) * 3), 200)),
+            "metadata": {
+                "id": page_id,
+                "version": rng.randint(1, 20),
+                "title": f"Runbook {page_id}",
+                "space": rng.choice(SPACES),
+                "labels": rng.sample(LABELS, 2),
+                "last_modified": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00.000Z",
+                "source": f"https://example.atlassian.net/wiki/spaces/OPS/pages/{page_id}",
+            },
+        })
+    return space
+
+
+class SyntheticConfluenceLoader(DocumentLoader):
+    """Serves a generated space, with a fixed latency per REST page of `limit` documents."""
+
+    def __init__(self, space: List[Dict[str, Any]], latency_ms: float = 0, limit: int = 50):
+        self.space = space
+        self.by_id = {document["metadata"]["id"]: document for document in space}
+        self.latency = latency_ms / 1000
+        self.limit = limit
+
+    def load(self, **kwargs) -> List[Dict[str, Any]]:
+        return list(self.iter_pages())
+
+    def iter_pages(self, **kwargs) -> Iterator[Dict[str, Any]]:
+        for i, document in enumerate(self.space):
+            if i % self.limit == 0:
+                time.sleep(self.latency)
+            yield {"page_content": document["page_content"], "metadata": dict(document["metadata"])}
+
+    def list_page_versions(self) -> Dict[str, Dict[str, Any]]:
+        time.sleep(self.latency * math.ceil(len(self.space) / self.limit))
+        return {
+            page_id: {"version": document["metadata"]["version"], "last_modified": document["metadata"]["last_modified"]}
+            for page_id, document in self.by_id.items()
+        }
+
+    def load_pages(self, page_ids: List[str]) -> List[Dict[str, Any]]:
+        time.sleep(self.latency * math.ceil(len(page_ids) / self.limit))
+        return [
+            {"page_content": self.by_id[page_id]["page_content"], "metadata": dict(self.by_id[page_id]["metadata"])}
+            for page_id in page_ids if page_id in self.by_id
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake bedrock-runtime endpoint.")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--llm-latency-ms", type=float, default=400)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=float, default=0)
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    server = FakeBedrockServer(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, llm_latency_ms=args.llm_latency_ms,
+        throttle_rate=args.throttle_rate, max_requests_per_second=args.max_rps,
+        dimensions=args.dimensions, seed=args.seed, port=args.port,
+    )
+    print(json.dumps({"endpoint_url": server.endpoint_url}), flush=True)
+    server.server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Load-tests the RAGPipeline query paths against stubbed Bedrock and Postgres.
+
+Compares sequential `generate_response` calls, batched `generate_responses` and concurrent
+`agenerate_response` coroutines, reporting QPS and p50/p95/p99 latency per query.
+
+Usage:
+    python -m benchmarks.query_load --queries 200 --embed-ms 30 --search-ms 10 --llm-ms 400
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from typing import List
+
+from app.pipelines.rag_pipeline import RAGPipeline
+
+
+class StubQueryConfig:
+    def __init__(self, max_concurrency: int, llm_concurrency: int):
+        self.query_config = {"max_concurrency": max_concurrency, "llm_concurrency": llm_concurrency}
+
+    def get_query_config(self):
+        return self.query_config
+
+    def get(self, key, default=None):
+        return default
+
+
+class StubEmbeddings:
+    """One Bedrock round trip per call, whether it embeds one query or a batch."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def embed_query(self, text):
+        time.sleep(self.latency)
+        return [float(len(text))]
+
+    def embed_queries(self, texts):
+        time.sleep(self.latency)
+        return [[float(len(text))] for text in texts]
+
+
+class StubVectorStore:
+    """Mimics a pooled Postgres: searches take a fixed time and at most `pool_size` run at once."""
+
+    def __init__(self, latency: float, pool_size: int, embeddings: StubEmbeddings):
+        self.latency = latency
+        self.pool = threading.BoundedSemaphore(pool_size)
+        self.embeddings = embeddings
+
+    def similarity_search(self, query, k=4):
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k)
+
+    def similarity_search_by_vector(self, embedding, k=4, query=None):
+        with self.pool:
+            time.sleep(self.latency)
+        return [(f"chunk {i}", 0.1 * i) for i in range(k)]
+
+
+class StubLLM:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def generate_text(self, prompt, **kwargs):
+        time.sleep(self.latency)
+        return "answer"
+
+
+def percentiles(latencies: List[float]) -> dict:
+    ordered = sorted(latencies)
+
+    def at(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 1)
+
+    return {"p50_ms": at(0.50), "p95_ms": at(0.95), "p99_ms": at(0.99)}
+
+
+def build_pipeline(args) -> RAGPipeline:
+    embeddings = StubEmbeddings(args.embed_ms / 1000)
+    return RAGPipeline(
+        StubQueryConfig(args.max_concurrency, args.llm_concurrency),
+        document_loader=None,
+        chunking_strategy=None,
+        embeddings=embeddings,
+        vector_store=StubVectorStore(args.search_ms / 1000, args.pool_size, embeddings),
+        llm=StubLLM(args.llm_ms / 1000),
+    )
+
+
+def run_sequential(args, queries) -> dict:
+    pipeline = build_pipeline(args)
+    latencies = []
+    started = time.perf_counter()
+    for query in queries:
+        query_started = time.perf_counter()
+        pipeline.generate_response(query)
+        latencies.append(time.perf_counter() - query_started)
+    return {"mode": "sequential", "qps": round(len(queries) / (time.perf_counter() - started), 1), **percentiles(latencies)}
+
+
+def run_batched(args, queries) -> dict:
+    pipeline = build_pipeline(args)
+    latencies = []
+    started = time.perf_counter()
+    for i in range(0, len(queries), args.batch_size):
+        batch_started = time.perf_counter()
+        batch = queries[i:i + args.batch_size]
+        pipeline.generate_responses(batch)
+        # Every query of a batch completes when the batch does
+        latencies.extend([time.perf_counter() - batch_started] * len(batch))
+    return {"mode": "batched", "qps": round(len(queries) / (time.perf_counter() - started), 1), **percentiles(latencies)}
+
+
+def run_async(args, queries) -> dict:
+    pipeline = build_pipeline(args)
+    latencies = []
+
+    async def one(query):
+        query_started = time.perf_counter()
+        await pipeline.agenerate_response(query)
+        latencies.append(time.perf_counter() - query_started)
+
+    async def all_queries():
+        await asyncio.gather(*(one(query) for query in queries))
+
+    started = time.perf_counter()
+    asyncio.run(all_queries())
+    return {"mode": "async", "qps": round(len(queries) / (time.perf_counter() - started), 1), **percentiles(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the RAG query paths.")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--embed-ms", type=float, default=30)
+    parser.add_argument("--search-ms", type=float, default=10)
+    parser.add_argument("--llm-ms", type=float, default=400)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--llm-concurrency", type=int, default=8)
+    parser.add_argument("--skip-sequential", action="store_true", help="The sequential baseline is slow on big runs.")
+    args = parser.parse_args()
+
+    queries = [f"question number {i}" for i in range(args.queries)]
+    if not args.skip_sequential:
+        print(json.dumps(run_sequential(args, queries)))
+    print(json.dumps(run_batched(args, queries)))
+    print(json.dumps(run_async(args, queries)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import datetime
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.core.aws_manager import AWSManager
+
+ROLE_ARN = "arn:aws:iam::123456789012:role/BedrockRole"
+
+
+def sts_response(expires_in: datetime.timedelta, key_id: str = "AKIA1"):
+    return {
+        "Credentials": {
+            "AccessKeyId": key_id,
+            "SecretAccessKey": "secret",
+            "SessionToken": "token",
+            "Expiration": datetime.datetime.now(datetime.timezone.utc) + expires_in,
+        }
+    }
+
+
+@patch.dict("os.environ", {"AWS_ACCESS_KEY_ID": "base", "AWS_SECRET_ACCESS_KEY": "base"})
+class TestAWSManager(unittest.TestCase):
+    def setUp(self):
+        self.manager = AWSManager(None, "us-east-1", {"max_pool_connections": 32, "role_session_duration": 900})
+        self.sts = MagicMock()
+        self.sts.assume_role.return_value = sts_response(datetime.timedelta(hours=1))
+        self.manager._clients[("sts", None, "us-east-1")] = self.sts
+
+    def test_clients_are_cached_per_service_role_and_region(self):
+        client = self.manager.get_client("bedrock-runtime", assumed_role_arn=ROLE_ARN)
+
+        self.assertIs(self.manager.get_client("bedrock-runtime", assumed_role_arn=ROLE_ARN), client)
+        self.assertIsNot(self.manager.get_client("bedrock-runtime"), client)
+        self.assertIsNot(self.manager.get_client("bedrock-runtime", ROLE_ARN, region_name="us-west-2"), client)
+        self.assertEqual(client.meta.config.max_pool_connections, 32)
+        self.assertEqual(client.meta.config.retries["mode"], "standard")
+
+    def test_role_is_assumed_once_across_services(self):
+        embeddings = self.manager.get_client("bedrock-runtime", assumed_role_arn=ROLE_ARN)
+        self.sts.assume_role.assert_not_called()  # credentials are fetched on first use
+
+        self.manager.get_client("bedrock", assumed_role_arn=ROLE_ARN)
+        for _ in range(3):
+            embeddings._request_signer._credentials.get_frozen_credentials()
+
+        self.sts.assume_role.assert_called_once_with(
+            RoleArn=ROLE_ARN, RoleSessionName="AssumedSession", DurationSeconds=900
+        )
+
+    def test_credentials_are_renewed_before_expiry(self):
+        self.sts.assume_role.side_effect = [
+            sts_response(datetime.timedelta(minutes=5), "AKIA1"),
+            sts_response(datetime.timedelta(hours=1), "AKIA2"),
+        ]
+        credentials = self.manager.assume_role(ROLE_ARN).get_credentials()
+
+        self.assertEqual(credentials.get_frozen_credentials().access_key, "AKIA1")
+        # The first credentials are inside the mandatory refresh window, so the next use renews them
+        self.assertEqual(credentials.get_frozen_credentials().access_key, "AKIA2")
+        self.assertEqual(credentials.get_frozen_credentials().access_key, "AKIA2")
+        self.assertEqual(self.sts.assume_role.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
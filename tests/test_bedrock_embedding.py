@@ -0,0 +1,124 @@
+import io
+import json
+import threading
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+
+from botocore.exceptions import ClientError
+
+from app.core.config import Config
+from app.core.aws_manager import AWSManager
+from app.modules.bedrock_embedding import BedrockEmbeddings
+from app.utils.rate_limiter import TokenBucket
+
+
+def embedding_response(value):
+    return {"body": io.BytesIO(json.dumps({"embedding": [value]}).encode())}
+
+
+class TestBedrockEmbeddings(unittest.TestCase):
+    def setUp(self):
+        self.config = MagicMock(spec=Config)
+        self.config.get_embeddings_config.return_value = {
+            "model_id": "test_model_id",
+            "max_concurrency": 4,
+            "requests_per_second": 1000,
+            "max_retries": 2,
+        }
+        self.client = MagicMock()
+        self.aws_manager = MagicMock(spec=AWSManager)
+        self.aws_manager.get_client.return_value = self.client
+
+    def test_embed_documents_preserves_order_under_concurrency(self):
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def invoke_model(modelId, body, **kwargs):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            text = json.loads(body)["inputText"]
+            time.sleep(0.01 * (5 - int(text)))  # later texts finish first
+            with lock:
+                active.pop()
+            return embedding_response(float(text))
+
+        self.client.invoke_model.side_effect = invoke_model
+        embeddings = BedrockEmbeddings(self.config, self.aws_manager)
+
+        result = embeddings.embed_documents(["1", "2", "3", "4"])
+
+        self.assertEqual(result, [[1.0], [2.0], [3.0], [4.0]])
+        self.assertGreater(max(peak), 1)
+        self.assertLessEqual(max(peak), 4)
+
+    @patch("app.modules.bedrock_embedding.time.sleep")
+    def test_throttling_is_retried_and_slows_down(self, mock_sleep):
+        throttled = ClientError({"Error": {"Code": "ThrottlingException"}}, "InvokeModel")
+        self.client.invoke_model.side_effect = [throttled, embedding_response(0.5)]
+        embeddings = BedrockEmbeddings(self.config, self.aws_manager)
+
+        self.assertEqual(embeddings.embed_query("text"), [0.5])
+        self.assertEqual(embeddings.throttle_count, 1)
+        self.assertLess(embeddings.request_bucket.rate, 1000)
+        mock_sleep.assert_called_once()
+
+    def test_one_throttle_event_halves_the_rate_once(self):
+        embeddings = BedrockEmbeddings(self.config, self.aws_manager)
+
+        # Four workers whose requests were all issued at 1000 rps are throttled together
+        for _ in range(4):
+            embeddings._on_throttled(1000)
+
+        self.assertEqual(embeddings.throttle_count, 4)
+        self.assertEqual(embeddings.request_bucket.rate, 500)
+
+    def test_other_errors_are_not_retried(self):
+        self.client.invoke_model.side_effect = ClientError(
+            {"Error": {"Code": "ValidationException"}}, "InvokeModel"
+        )
+        embeddings = BedrockEmbeddings(self.config, self.aws_manager)
+
+        with self.assertRaises(ClientError):
+            embeddings.embed_query("text")
+        self.assertEqual(self.client.invoke_model.call_count, 1)
+
+    def test_cohere_models_embed_batches_of_texts(self):
+        self.config.get_embeddings_config.return_value = {"model_id": "cohere.embed-english-v3", "max_concurrency": 2}
+        self.client.invoke_model.side_effect = lambda modelId, body, **kwargs: {"body": io.BytesIO(
+            json.dumps({"embeddings": [[float(text)] for text in json.loads(body)["texts"]]}).encode()
+        )}
+        embeddings = BedrockEmbeddings(self.config, self.aws_manager)
+
+        with patch.dict("app.modules.bedrock_embedding.BATCH_EMBEDDING_MODELS", {"cohere.embed": 2}):
+            result = embeddings.embed_documents(["1", "2", "3"])
+
+        self.assertEqual(result, [[1.0], [2.0], [3.0]])
+        bodies = [json.loads(call[1]["body"]) for call in self.client.invoke_model.call_args_list]
+        self.assertEqual(sorted(body["texts"] for body in bodies), [["1", "2"], ["3"]])
+        self.assertEqual({body["input_type"] for body in bodies}, {"search_document"})
+
+    def test_cohere_query_is_embedded_as_a_search_query(self):
+        self.config.get_embeddings_config.return_value = {"model_id": "cohere.embed-english-v3"}
+        self.client.invoke_model.return_value = {"body": io.BytesIO(json.dumps({"embeddings": [[0.5]]}).encode())}
+        embeddings = BedrockEmbeddings(self.config, self.aws_manager)
+
+        self.assertEqual(embeddings.embed_query("deploy"), [0.5])
+
+        body = json.loads(self.client.invoke_model.call_args[1]["body"])
+        self.assertEqual(body, {"texts": ["deploy"], "input_type": "search_query"})
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_acquire_waits_for_refill(self):
+        bucket = TokenBucket(rate=100, capacity=1)
+        bucket.acquire()
+        started = time.monotonic()
+        bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.005)
+
+
+if __name__ == "__main__":
+    unittest.main()
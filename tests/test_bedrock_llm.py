@@ -0,0 +1,37 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+from app.core.config import Config
+from app.core.aws_manager import AWSManager
+from app.modules.bedrock_llm import BedrockLLM
+
+
+class TestBedrockLLM(unittest.TestCase):
+    def setUp(self):
+        self.config = MagicMock(spec=Config)
+        self.config.get_llm_config.return_value = {
+            "model_id": "anthropic.claude-v2",
+            "model_kwargs": {"max_tokens_to_sample": 256},
+        }
+        self.aws_manager = MagicMock(spec=AWSManager)
+
+    @patch("app.modules.bedrock_llm.Bedrock")
+    def test_stream_text_yields_non_empty_chunks(self, mock_bedrock):
+        mock_bedrock.return_value.stream.return_value = iter(["", "Hello", " world"])
+        llm = BedrockLLM(self.config, self.aws_manager)
+
+        chunks = list(llm.stream_text("prompt"))
+
+        self.assertEqual(chunks, ["Hello", " world"])
+        mock_bedrock.return_value.stream.assert_called_once_with("prompt")
+
+    @patch("app.modules.bedrock_llm.Bedrock")
+    def test_stream_text_rejects_non_string_prompt(self, mock_bedrock):
+        llm = BedrockLLM(self.config, self.aws_manager)
+
+        with self.assertRaises(TypeError):
+            list(llm.stream_text(["prompt"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import MagicMock
+
+from app.core.chunking import make_chunk_id
+from app.core.config import Config
+from app.modules.markdown_recursive_splitter import MarkdownRecursiveChunking
+
+
+class TestChunkIds(unittest.TestCase):
+    def setUp(self):
+        self.config = MagicMock(spec=Config)
+        self.config.get.return_value = {
+            "markdown_chunk_size": 40, "markdown_chunk_overlap": 0,
+            "recursive_chunk_size": 40, "recursive_chunk_overlap": 0,
+        }
+        self.chunking = MarkdownRecursiveChunking(self.config)
+        self.document = {
+            "page_content": "# Title\n\nFirst paragraph of the page.\n\n## Section\n\nSecond paragraph of the page.",
+            "metadata": {"id": "42", "version": 3},
+        }
+
+    def test_chunk_ids_are_stable_across_runs(self):
+        first = [chunk.chunk_id for chunk in self.chunking.chunk_document(self.document)]
+        second = [chunk.chunk_id for chunk in self.chunking.chunk_document(self.document)]
+
+        self.assertGreater(len(first), 1)
+        self.assertEqual(first, second)
+        self.assertEqual(len(set(first)), len(first))
+
+    def test_chunk_id_changes_with_version_and_content(self):
+        chunk_id = make_chunk_id("42", 3, 0, "text")
+
+        self.assertEqual(chunk_id, make_chunk_id("42", 3, 0, "text"))
+        self.assertNotEqual(chunk_id, make_chunk_id("42", 4, 0, "text"))
+        self.assertNotEqual(chunk_id, make_chunk_id("42", 3, 0, "other text"))
+        self.assertNotEqual(chunk_id, make_chunk_id("42", 3, 1, "text"))
+
+    def test_process_pool_matches_serial_chunking(self):
+        self.config.get.return_value = {**self.config.get.return_value, "workers": 2, "task_size": 2, "max_pending_tasks": 2}
+        pooled = MarkdownRecursiveChunking(self.config)
+        documents = [
+            {"page_content": f"# Page {i}\n\n" + "Some paragraph text. " * (i + 1), "metadata": {"id": str(i), "version": 1}}
+            for i in range(7)
+        ]
+        try:
+            serial = [self.chunking.chunk_document(document) for document in documents]
+
+            self.assertEqual(list(pooled.chunk_documents(iter(documents))), serial)
+            unordered = list(pooled.chunk_documents(documents, ordered=False))
+            self.assertEqual(sorted(map(str, unordered)), sorted(map(str, serial)))
+            with self.assertRaises(ValueError):
+                list(pooled.chunk_documents([{"metadata": {}}]))
+        finally:
+            pooled.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,185 @@
+import dataclasses
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.core import config as config_module
+from app.core.config import Config
+from app.core.secret_cache import SecretCache
+
+CONFLUENCE_SECRET = json.dumps({"username": "u", "api_key": "k"})
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestConfigSecrets(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".yaml")
+        with os.fdopen(handle, "w") as f:
+            f.write(
+                "secrets:\n  ttl_seconds: 60\n"
+                "database:\n  secret_name: test/db\n  host: db\n  pool:\n    max_size: 4\n"
+                "confluence:\n  secret_name: test/confluence\n  spaces: [OPS]\n"
+            )
+        self.addCleanup(os.remove, self.path)
+        self.clock = FakeClock()
+        patcher = patch.object(config_module, "_secret_cache", SecretCache(clock=self.clock))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = MagicMock()
+        self.client.batch_get_secret_value.return_value = {
+            "SecretValues": [
+                {"Name": "test/db", "ARN": "arn:db", "SecretString": json.dumps({"password": "p1"})},
+                {"Name": "test/confluence", "ARN": "arn:confluence", "SecretString": CONFLUENCE_SECRET},
+            ]
+        }
+
+    def _config(self):
+        config = Config(self.path)
+        config.__dict__["secret_manager"] = self.client
+        return config
+
+    def test_session_and_client_are_created_on_first_secret_lookup(self):
+        with patch.object(Config, "_create_session") as create_session:
+            config = Config(self.path)
+            create_session.assert_not_called()
+
+            client = create_session.return_value.client.return_value
+            client.batch_get_secret_value.return_value = self.client.batch_get_secret_value.return_value
+            self.assertEqual(config.get_secret("test/confluence", "username"), "u")
+            create_session.assert_called_once()
+
+    def test_first_lookup_fetches_every_configured_secret_in_one_batch(self):
+        first, second = self._config(), self._config()
+
+        self.assertEqual(first.get_confluence_config().username, "u")
+        self.assertEqual(first.get_confluence_config().api_key, "k")
+        self.assertEqual(second.get_database_config().password, "p1")
+
+        self.client.batch_get_secret_value.assert_called_once_with(SecretIdList=["test/confluence", "test/db"])
+        self.client.get_secret_value.assert_not_called()
+
+    def test_falls_back_to_single_lookups_when_batching_is_denied(self):
+        self.client.batch_get_secret_value.side_effect = Exception("AccessDenied")
+        self.client.get_secret_value.side_effect = lambda SecretId: {
+            "test/db": {"SecretString": json.dumps({"password": "p1"})},
+            "test/confluence": {"SecretString": CONFLUENCE_SECRET},
+        }[SecretId]
+        config = self._config()
+
+        self.assertEqual(config.get_secret("test/confluence", "api_key"), "k")
+        self.assertEqual(config.get_secret("test/db", "password"), "p1")
+        self.assertEqual(self.client.get_secret_value.call_count, 2)
+
+    def test_secret_without_key_is_returned_as_stored(self):
+        config = self._config()
+
+        self.assertEqual(config.get_secret("test/confluence"), CONFLUENCE_SECRET)
+        self.assertEqual(config.get_secret("test/confluence", "username"), "u")
+
+    def test_fetch_does_not_block_lookups_of_other_secrets(self):
+        config = self._config()
+        self.assertEqual(config.get_secret("test/db", "password"), "p1")
+        self.clock.now += 61
+        # Only test/db expires; test/confluence stays fresh
+        cache = config_module._secret_cache
+        cache._entries["test/confluence"] = cache._entries["test/confluence"]._replace(expires_at=1000)
+        started, release = threading.Event(), threading.Event()
+        timed_out = []
+
+        def slow_fetch(SecretId):
+            started.set()
+            timed_out.append(not release.wait(2))
+            return {"SecretString": json.dumps({"password": "p2"})}
+
+        self.client.get_secret_value.side_effect = slow_fetch
+        refreshes = [threading.Thread(target=config.get_secret, args=("test/db", "password")) for _ in range(3)]
+        for thread in refreshes:
+            thread.start()
+        started.wait(5)
+
+        # Served while the refresh of test/db is in flight
+        self.assertEqual(config.get_secret("test/confluence", "username"), "u")
+        release.set()
+        for thread in refreshes:
+            thread.join(5)
+        self.assertEqual(config.get_secret("test/db", "password"), "p2")
+        self.assertEqual(self.client.get_secret_value.call_count, 1)
+        self.assertEqual(timed_out, [False])
+
+    def test_sections_are_frozen_memoized_and_rebuilt_after_rotation(self):
+        config = self._config()
+
+        database = config.get_database_config()
+        self.assertIs(config.get_database_config(), database)
+        self.assertEqual(database.get("host"), "db")
+        self.assertEqual(database["pool"]["max_size"], 4)
+        self.assertEqual(config.get_confluence_config().spaces, ("OPS",))
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            database.password = "other"
+        with self.assertRaises(TypeError):
+            database.pool["max_size"] = 8
+
+        # The secret is rotated, and the cached value expires
+        self.client.batch_get_secret_value.side_effect = Exception("AccessDenied")
+        self.client.get_secret_value.return_value = {"SecretString": json.dumps({"password": "p2"})}
+        self.clock.now += 61
+
+        self.assertEqual(config.get_database_config().password, "p2")
+        self.assertIs(config.get_database_config(), config.get_database_config())
+
+    def test_expired_secret_is_served_when_refresh_fails(self):
+        config = self._config()
+        self.assertEqual(config.get_secret("test/db", "password"), "p1")
+
+        self.client.batch_get_secret_value.side_effect = Exception("throttled")
+        self.client.get_secret_value.side_effect = Exception("throttled")
+        self.clock.now += 61
+
+        self.assertEqual(config.get_secret("test/db", "password"), "p1")
+
+    def test_failed_refresh_keeps_memoized_section_and_backs_off(self):
+        config = self._config()
+        database = config.get_database_config()
+
+        self.client.batch_get_secret_value.side_effect = Exception("throttled")
+        self.client.get_secret_value.side_effect = Exception("throttled")
+        self.clock.now += 61
+
+        self.assertIs(config.get_database_config(), database)
+        self.assertIs(config.get_database_config(), database)
+        self.assertEqual(self.client.get_secret_value.call_count, 1)
+
+        # Retried after 5s, then after 10s
+        self.clock.now += 6
+        self.assertIs(config.get_database_config(), database)
+        self.clock.now += 6
+        self.assertIs(config.get_database_config(), database)
+        self.assertEqual(self.client.get_secret_value.call_count, 2)
+
+        self.client.get_secret_value.side_effect = None
+        self.client.get_secret_value.return_value = {"SecretString": json.dumps({"password": "p2"})}
+        self.clock.now += 5
+        self.assertEqual(config.get_database_config().password, "p2")
+
+    def test_sections_resolved_without_their_secret_are_retried(self):
+        self.client.batch_get_secret_value.side_effect = Exception("AccessDenied")
+        self.client.get_secret_value.side_effect = [Exception("throttled"), {"SecretString": json.dumps({"password": "p1"})}]
+        config = self._config()
+
+        self.assertIsNone(config.get_database_config().password)
+        self.assertEqual(config.get_database_config().password, "p1")
+
+
+if __name__ == "__main__":
+    unittest.main()
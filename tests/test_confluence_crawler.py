@@ -0,0 +1,168 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+from urllib.parse import urlparse, parse_qs
+
+from app.core.config import Config
+from app.modules.confluence_crawler import ConfluenceCrawler
+
+SPACES = {"ALPHA": ["a1", "a2", "a3"], "BETA": ["b1", "b2"]}
+
+
+class FakeConfluenceHandler(BaseHTTPRequestHandler):
+    """Serves /rest/api/content with cursor pagination and rate limits the first request per space."""
+
+    throttled = set()
+    requests = []
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        with self.lock:
+            self.requests.append((url.path, params))
+        if url.path == "/rest/api/content/search":
+            space = params["cql"].split("=")[1].strip('"')
+        elif url.path == "/rest/api/content":
+            space = params["spaceKey"]
+        else:
+            space = None
+        if space not in SPACES:
+            self._send_json(404, {"message": "Not found"})
+            return
+
+        with self.lock:
+            first_request = space not in self.throttled
+            self.throttled.add(space)
+        if first_request:
+            self._send_json(429, {"message": "Rate limited"}, {"Retry-After": "0"})
+            return
+
+        start = int(params.get("start", 0))
+        limit = int(params.get("limit", 25))
+        page_ids = SPACES[space][start:start + limit]
+        links = {}
+        if start + limit < len(SPACES[space]):
+            links["next"] = f"{url.path}?{url.query.split('&start=')[0]}&start={start + limit}"
+        self._send_json(200, {
+            "results": [
+                {
+                    "id": page_id,
+                    "title": f"Page {page_id}",
+                    "status": "current",
+                    "version": {"number": 1, "when": "2024-01-01T00:00:00Z"},
+                    "space": {"key": space},
+                    "body": {"storage": {"value": f"<p>Content of {page_id}</p>"}},
+                    "_links": {"webui": f"/pages/{page_id}"},
+                }
+                for page_id in page_ids
+            ],
+            "_links": links,
+        })
+
+
+class TestConfluenceCrawler(unittest.TestCase):
+    def setUp(self):
+        FakeConfluenceHandler.throttled = set()
+        FakeConfluenceHandler.requests = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeConfluenceHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.config = MagicMock(spec=Config)
+        self.config.get_confluence_config.return_value = {
+            "url": f"http://127.0.0.1:{self.server.server_port}",
+            "username": "test_username",
+            "api_key": "test_api_key",
+            "limit": 2,
+            "include_restricted_content": True,
+            "crawler_workers": 2,
+            "max_retries": 2,
+        }
+
+    def test_crawls_spaces_in_parallel_and_honors_retry_after(self):
+        crawler = ConfluenceCrawler(self.config, spaces=["ALPHA", "BETA"])
+
+        documents = crawler.load()
+
+        self.assertEqual(
+            sorted(doc["metadata"]["id"] for doc in documents), ["a1", "a2", "a3", "b1", "b2"]
+        )
+        self.assertEqual({doc["metadata"]["space"] for doc in documents}, {"ALPHA", "BETA"})
+        self.assertIn("Content of a1", next(d for d in documents if d["metadata"]["id"] == "a1")["page_content"])
+        stats = crawler.pages_per_second()
+        self.assertEqual(stats[("space", "ALPHA")]["pages"], 3)
+        self.assertEqual(stats[("space", "BETA")]["pages"], 2)
+        self.assertIsNone(stats[("space", "ALPHA")]["error"])
+        # Each space was throttled once and retried: 2 + 1 result pages plus one 429 per space
+        self.assertEqual(len(FakeConfluenceHandler.requests), 5)
+
+    def test_crawls_cql_queries(self):
+        crawler = ConfluenceCrawler(self.config, spaces=[], cql_queries=['space="BETA"'])
+
+        documents = crawler.load()
+
+        self.assertEqual(sorted(doc["metadata"]["id"] for doc in documents), ["b1", "b2"])
+        self.assertEqual(FakeConfluenceHandler.requests[-1][0], "/rest/api/content/search")
+
+    def test_shard_errors_fail_the_crawl_after_the_other_shards(self):
+        crawler = ConfluenceCrawler(self.config, spaces=["ALPHA", "MISSING"])
+        documents = []
+
+        with self.assertRaises(RuntimeError):
+            for document in crawler.iter_pages():
+                documents.append(document)
+
+        self.assertEqual(len(documents), 3)
+        self.assertIsNotNone(crawler.pages_per_second()[("space", "MISSING")]["error"])
+        self.assertIsNone(crawler.pages_per_second()[("space", "ALPHA")]["error"])
+
+    def test_space_and_cql_shards_with_the_same_value_keep_separate_stats(self):
+        crawler = ConfluenceCrawler(self.config, spaces=["BETA"], cql_queries=["BETA"])
+        crawler._make_loader = lambda kind, value: MagicMock(iter_pages=lambda: iter(
+            [{"page_content": "", "metadata": {"id": f"{kind}-{i}"}} for i in range(2 if kind == "space" else 1)]
+        ))
+
+        crawler.load()
+
+        stats = crawler.pages_per_second()
+        self.assertEqual((stats[("space", "BETA")]["pages"], stats[("cql", "BETA")]["pages"]), (2, 1))
+
+    def test_lists_versions_and_loads_pages_across_shards(self):
+        crawler = ConfluenceCrawler(self.config, spaces=["ALPHA"], cql_queries=['space="BETA"'])
+
+        versions = crawler.list_page_versions()
+        with patch("app.modules.confluence_crawler.ConfluenceDocumentLoader.load_pages",
+                   side_effect=lambda page_ids: [{"page_content": "", "metadata": {"id": i}} for i in page_ids]):
+            documents = crawler.load_pages(["a1", "b2", "a3"])
+
+        self.assertEqual(sorted(versions), ["a1", "a2", "a3", "b1", "b2"])
+        self.assertEqual(versions["b1"], {"version": 1, "last_modified": "2024-01-01T00:00:00Z"})
+        self.assertEqual([document["metadata"]["id"] for document in documents], ["a1", "b2", "a3"])
+
+    def test_listing_fails_when_a_shard_fails(self):
+        crawler = ConfluenceCrawler(self.config, spaces=["ALPHA", "MISSING"])
+
+        # A partial listing would make incremental ingestion delete the missing shard's pages
+        with self.assertRaises(Exception):
+            crawler.list_page_versions()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+from langchain_core.documents import Document
+
+from app.core.config import Config
+from app.core.embeddings import Embeddings
+from app.core.filters import Range
+from app.modules.confluence_loader import ConfluenceDocumentLoader
+from app.modules.local_vector_store import LocalVectorStore
+from app.modules.markdown_recursive_splitter import MarkdownRecursiveChunking
+from app.modules.sqlite_watermark_store import SQLiteWatermarkStore
+from app.pipelines.rag_pipeline import RAGPipeline
+
+
+def result_page(page_ids, next_cursor=None):
+    links = {"next": next_cursor} if next_cursor else {}
+    return {
+        "results": [{"id": page_id, "title": page_id, "version": {"number": 2}} for page_id in page_ids],
+        "_links": links,
+    }
+
+
+class TestConfluenceDocumentLoader(unittest.TestCase):
+    def setUp(self):
+        self.config = MagicMock(spec=Config)
+        self.config.get_confluence_config.return_value = {
+            "url": "https://confluence.test",
+            "username": "test_username",
+            "api_key": "test_api_key",
+            "space_key": "TEST",
+            "limit": 2,
+            "prefetch": 1,
+            "include_restricted_content": True,
+        }
+        patcher = patch("app.modules.confluence_loader.ConfluenceLoader")
+        self.langchain_loader = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        self.langchain_loader.process_page.side_effect = lambda page, *args: Document(
+            page_content=f"content {page['id']}", metadata={"id": page["id"]}
+        )
+        self.responses = {
+            None: result_page(["1", "2"], "/rest/api/content?cursor=b"),
+            "/rest/api/content?cursor=b": result_page(["3", "4"], "/rest/api/content?cursor=c"),
+            "/rest/api/content?cursor=c": result_page(["5"]),
+        }
+        self.langchain_loader.confluence.get.side_effect = (
+            lambda path, params=None: self.responses[None if params else path]
+        )
+
+    def test_iter_pages_follows_next_links_once(self):
+        loader = ConfluenceDocumentLoader(self.config)
+
+        documents = list(loader.iter_pages())
+
+        self.assertEqual([doc["metadata"]["id"] for doc in documents], ["1", "2", "3", "4", "5"])
+        self.assertEqual(documents[0]["metadata"]["version"], 2)
+        self.assertEqual(self.langchain_loader.confluence.get.call_count, 3)
+        self.assertIsNone(loader.cursor)
+
+    def test_iter_pages_resumes_from_cursor(self):
+        loader = ConfluenceDocumentLoader(self.config)
+        pages = loader.iter_pages()
+        for _ in range(3):
+            next(pages)
+        pages.close()
+        self.assertEqual(loader.cursor, "/rest/api/content?cursor=b")
+
+        resumed = ConfluenceDocumentLoader(self.config).iter_pages(cursor=loader.cursor)
+
+        self.assertEqual([doc["metadata"]["id"] for doc in resumed], ["3", "4", "5"])
+
+    def test_iter_pages_raises_fetch_errors(self):
+        self.langchain_loader.confluence.get.side_effect = RuntimeError("Confluence unavailable")
+        loader = ConfluenceDocumentLoader(self.config)
+
+        with self.assertRaises(RuntimeError):
+            list(loader.iter_pages())
+        self.assertEqual(loader.load(), [])
+
+    def test_restricted_pages_are_left_out_of_listing_and_loading(self):
+        self.config.get_confluence_config.return_value["include_restricted_content"] = False
+        restricted = {"read": {"restrictions": {"user": {"results": [{"username": "admin"}]}, "group": {"results": []}}}}
+        public = {"read": {"restrictions": {"user": {"results": []}, "group": {"results": []}}}}
+        pages = [
+            {"id": "1", "title": "1", "status": "current", "version": {"number": 1}, "restrictions": public},
+            {"id": "2", "title": "2", "status": "current", "version": {"number": 1}, "restrictions": restricted},
+        ]
+        self.langchain_loader.confluence.get.side_effect = lambda path, params=None: {"results": pages}
+        loader = ConfluenceDocumentLoader(self.config)
+
+        self.assertEqual(list(loader.list_page_versions()), ["1"])
+        self.assertEqual([doc["metadata"]["id"] for doc in loader.iter_pages()], ["1"])
+        self.assertIn("restrictions.read.restrictions.user", self.langchain_loader.confluence.get.call_args[1]["params"]["expand"])
+        self.langchain_loader.is_public_page.assert_not_called()
+
+    def test_incrementally_ingested_pages_keep_filterable_metadata(self):
+        pages = [
+            {
+                "id": page_id, "title": page_id, "space": {"key": space}, "ancestors": [{"id": "100"}],
+                "version": {"number": 3, "when": when},
+                "metadata": {"labels": {"results": [{"name": "runbook"}]}},
+            }
+            for page_id, space, when in [("1", "OPS", "2024-05-01T00:00:00Z"), ("2", "DEV", "2023-01-01T00:00:00Z")]
+        ]
+
+        def get(path, params=None):
+            if path == "rest/api/content/search":
+                return {"results": [page for page in pages if f'"{page["id"]}"' in params["cql"]]}
+            return {"results": pages}
+
+        self.langchain_loader.confluence.get.side_effect = get
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.config.get.side_effect = lambda key, default=None: {
+            "chunking": {"workers": 0},
+            "ingestion": {"watermark_path": os.path.join(directory.name, "watermarks.db")},
+        }.get(key, default)
+        self.config.get_query_config.return_value = {}
+        self.config.get_vector_store_config.return_value = {
+            "local": {"path": os.path.join(directory.name, "store"), "index": {"method": "none"}}
+        }
+        embeddings = MagicMock(spec=Embeddings)
+        embeddings.embed_documents.side_effect = lambda texts: [[1.0, 0.0] for _ in texts]
+        store = LocalVectorStore(self.config, embeddings)
+        pipeline = RAGPipeline(
+            self.config, ConfluenceDocumentLoader(self.config), MarkdownRecursiveChunking(self.config),
+            embeddings, store, None, watermark_store=SQLiteWatermarkStore(self.config),
+        )
+
+        pipeline.ingest_incremental()
+
+        for filters in [{"space": "OPS"}, {"labels": "runbook", "space": "OPS"},
+                        Range("last_modified", gte="2024-01-01")]:
+            results = store.similarity_search_by_vector([1.0, 0.0], k=4, filters=filters)
+            self.assertEqual([document for document, _ in results], ["content 1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
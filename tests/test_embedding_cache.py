@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+from app.core.config import Config
+from app.core.aws_manager import AWSManager
+from app.core.embedding_cache import EmbeddingCache
+from app.modules.bedrock_embedding import BedrockEmbeddings
+from app.modules.memory_embedding_cache import MemoryEmbeddingCache
+from app.modules.pg_embedding_cache import PGEmbeddingCache
+from app.modules.sqlite_embedding_cache import SQLiteEmbeddingCache
+
+
+class TestSQLiteEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config = MagicMock(spec=Config)
+        self.config.get.return_value = {
+            "cache": {"path": os.path.join(self.temp_dir.name, "cache.db"), "max_entries": 2}
+        }
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_make_key_normalizes_whitespace_and_scopes_by_model(self):
+        self.assertEqual(EmbeddingCache.make_key("m", "a  b\n"), EmbeddingCache.make_key("m", "a b"))
+        self.assertNotEqual(EmbeddingCache.make_key("m1", "a b"), EmbeddingCache.make_key("m2", "a b"))
+
+    def test_round_trip_and_lru_eviction(self):
+        cache = SQLiteEmbeddingCache(self.config)
+        cache.put_many({"a": [0.5, 1.0]})
+        cache.put_many({"b": [2.0, 3.0]})
+        cache.get_many(["a"])  # "b" is now the least recently used entry
+        cache.put_many({"c": [4.0, 5.0]})
+
+        self.assertEqual(cache.get_many(["a", "b", "c"]), {"a": [0.5, 1.0], "c": [4.0, 5.0]})
+
+        reopened = SQLiteEmbeddingCache(self.config)
+        self.assertEqual(reopened.get_many(["a"]), {"a": [0.5, 1.0]})
+
+
+class TestPGEmbeddingCache(unittest.TestCase):
+    @patch("app.modules.pg_embedding_cache.get_engine")
+    def test_consecutive_puts_over_the_limit_only_evict_the_overflow(self, mock_get_engine):
+        config = MagicMock(spec=Config)
+        config.get.return_value = {"cache": {"max_entries": 10}}
+        connection = mock_get_engine.return_value.begin.return_value.__enter__.return_value
+        cache = PGEmbeddingCache(config)
+
+        def result(rowcount=None, scalar=None):
+            return MagicMock(rowcount=rowcount, scalar=MagicMock(return_value=scalar))
+
+        # The first write counts the table: 12 rows after inserting 3, so 2 are evicted
+        connection.execute.side_effect = [result(rowcount=3), result(scalar=12), result(rowcount=2)]
+        cache.put_many({"a": [0.1], "b": [0.2], "c": [0.3]})
+        # The second inserts 1 new key of 2 and evicts exactly that one, without recounting
+        connection.execute.side_effect = [result(rowcount=1), result(rowcount=1)]
+        cache.put_many({"c": [0.3], "d": [0.4]})
+
+        evictions = [call for call in connection.execute.call_args_list if "DELETE" in str(call[0][0])]
+        self.assertEqual([call[0][1] for call in evictions], [{"overflow": 2}, {"overflow": 1}])
+        counts = [call for call in connection.execute.call_args_list if "count(*)" in str(call[0][0])]
+        self.assertEqual(len(counts), 1)
+        self.assertEqual(cache.row_count.rows, 10)
+
+
+class TestBedrockEmbeddingsCache(unittest.TestCase):
+    def test_embed_documents_only_sends_misses(self):
+        config = MagicMock(spec=Config)
+        config.get_embeddings_config.return_value = {"model_id": "test_model_id"}
+        cache = MagicMock(spec=EmbeddingCache)
+        cached_key = EmbeddingCache.make_key("test_model_id", "cached")
+        cache.get_many.return_value = {cached_key: [1.0]}
+
+        embeddings = BedrockEmbeddings(config, MagicMock(spec=AWSManager), cache=cache)
+        with patch.object(embeddings, "_embed_concurrently", return_value=[[2.0], [3.0]]) as mock_embed:
+            result = embeddings.embed_documents(["new 1", "cached", "new 2", "new 1"])
+
+        mock_embed.assert_called_once_with(["new 1", "new 2"])
+        self.assertEqual(result, [[2.0], [1.0], [3.0], [2.0]])
+        cache.put_many.assert_called_once()
+        cache.record.assert_called_once_with(hits=2, misses=2)
+
+    def test_repeated_queries_are_embedded_once(self):
+        config = MagicMock(spec=Config)
+        config.get_embeddings_config.return_value = {"model_id": "test_model_id"}
+        query_cache = MemoryEmbeddingCache(max_entries=2)
+
+        embeddings = BedrockEmbeddings(config, MagicMock(spec=AWSManager), query_cache=query_cache)
+        with patch.object(embeddings, "_invoke", side_effect=lambda text: [float(len(text))]) as mock_invoke:
+            first = embeddings.embed_query("how do I deploy?")
+            again = embeddings.embed_query("how do I  deploy?")
+            embeddings.embed_queries(["a", "bb"])
+
+        self.assertEqual(first, again)
+        self.assertEqual(mock_invoke.call_count, 3)
+        self.assertEqual(query_cache.stats(), {"hits": 1, "misses": 3})
+        self.assertEqual(len(query_cache), 2)  # The least recently used query was evicted
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import datetime
+import json
+import unittest
+
+from app.core.filters import And, Eq, Exists, In, Range, as_filter
+from app.modules.pg_filters import metadata_filter_clause
+
+
+class TestMetadataFilters(unittest.TestCase):
+    def setUp(self):
+        self.metadata = {
+            "space": "OPS",
+            "version": 7,
+            "labels": ["runbook", "database"],
+            "ancestors": ["100", "200"],
+            "last_modified": "2024-03-05T10:00:00.000Z",
+        }
+
+    def test_matches_scalar_and_list_fields(self):
+        self.assertTrue(Eq("space", "OPS").matches(self.metadata))
+        self.assertTrue(Eq("labels", "runbook").matches(self.metadata))
+        self.assertFalse(Eq("labels", "network").matches(self.metadata))
+        self.assertTrue(In("ancestors", ["999", "200"]).matches(self.metadata))
+        self.assertTrue(Exists("labels").matches(self.metadata))
+        self.assertFalse(Exists("owner").matches(self.metadata))
+
+    def test_ranges_compare_numbers_and_iso_dates(self):
+        self.assertTrue(Range("version", gte=5, lt=8).matches(self.metadata))
+        self.assertFalse(Range("version", gt=7).matches(self.metadata))
+        self.assertTrue(Range("last_modified", gte=datetime.date(2024, 3, 1)).matches(self.metadata))
+        self.assertFalse(Range("last_modified", lt="2024-01-01").matches(self.metadata))
+        self.assertFalse(Range("owner", gte=1).matches(self.metadata))
+        with self.assertRaises(ValueError):
+            Range("version")
+
+    def test_combines_and_normalizes_shorthand(self):
+        combined = Eq("space", "OPS") & Range("version", gte=7) & Exists("labels")
+        self.assertIsInstance(combined, And)
+        self.assertEqual(len(combined.filters), 3)
+        self.assertTrue(combined.matches(self.metadata))
+
+        self.assertEqual(as_filter({"space": "OPS"}), Eq("space", "OPS"))
+        self.assertEqual(as_filter({"space": "OPS", "id": ["1", "2"]}), And((Eq("space", "OPS"), In("id", ("1", "2")))))
+        self.assertIsNone(as_filter({}))
+
+    def test_compiles_to_indexed_sql_predicates(self):
+        params = {}
+        clause = metadata_filter_clause(
+            Eq("labels", "runbook") & Range("last_modified", gte=datetime.date(2024, 1, 1)) & Range("version", lt=10)
+            & Exists("ancestors"),
+            params,
+        )
+
+        self.assertIn("CAST(e.cmetadata AS jsonb) @> CAST(:filter_0 AS jsonb)", clause)
+        self.assertIn("(e.cmetadata->>'last_modified') >= :filter_2", clause)
+        self.assertIn("CAST(e.cmetadata->>'version' AS numeric) < :filter_3", clause)
+        self.assertIn("CAST(e.cmetadata AS jsonb) ? 'ancestors'", clause)
+        self.assertEqual(json.loads(params["filter_1"]), {"labels": ["runbook"]})
+        self.assertEqual(params["filter_2"], "2024-01-01")
+        self.assertEqual(metadata_filter_clause(None, params), "")
+
+    def test_rejects_unsafe_field_names(self):
+        with self.assertRaises(ValueError):
+            metadata_filter_clause(Exists("x'; DROP TABLE t; --"), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import ANY, MagicMock, patch
+
+import numpy as np
+
+from app.core.config import Config
+from app.core.embeddings import Embeddings
+from app.core.filters import Eq, Range
+from app.modules.local_vector_store import LocalVectorStore
+
+
+class TestLocalVectorStore(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.store_config = {"path": self.path, "compact_threshold": 0.5, "index": {"method": "none"}}
+        self.config = MagicMock(spec=Config)
+        self.config.get_vector_store_config.return_value = {"backend": "local", "local": self.store_config}
+        self.embeddings = MagicMock(spec=Embeddings)
+        self.embeddings.embed_query.side_effect = lambda text: [1.0, 0.0, 0.0] if "alpha" in text else [0.0, 1.0, 0.0]
+        self.store = LocalVectorStore(self.config, self.embeddings)
+
+        self.vectors = [[1.0, 0.0, 0.0], [0.9, 0.1, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+        self.store.add_texts(
+            ["alpha", "alpha prime", "beta", "gamma"],
+            metadatas=[
+                {"id": "1", "version": 1, "space": "OPS"},
+                {"id": "2", "version": 1, "space": "DEV"},
+                {"id": "3", "version": 1, "space": "OPS"},
+                {"id": "4", "version": 1, "space": "OPS"},
+            ],
+            embeddings=self.vectors,
+            ids=["c1", "c2", "c3", "c4"],
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_exact_top_k_by_cosine_distance(self):
+        results = self.store.similarity_search("alpha", k=2)
+
+        self.assertEqual([document for document, _ in results], ["alpha", "alpha prime"])
+        self.assertAlmostEqual(results[0][1], 0.0, places=5)
+        self.embeddings.embed_documents.assert_not_called()
+
+    def test_filters_apply_before_top_k(self):
+        results = self.store.similarity_search_by_vector([1.0, 0.0, 0.0], k=2, filters=Eq("space", "OPS"))
+        self.assertEqual([document for document, _ in results], ["alpha", "beta"])
+
+        results = self.store.similarity_search_by_vector([1.0, 0.0, 0.0], k=4, filters=Range("id", gte="3"))
+        self.assertEqual(sorted(document for document, _ in results), ["beta", "gamma"])
+
+    def test_append_is_idempotent_and_replaces_old_page_versions(self):
+        self.store.add_texts(["alpha"], metadatas=[{"id": "1", "version": 1}], embeddings=[self.vectors[0]], ids=["c1"])
+        self.assertEqual(self.store.count(), 4)
+
+        self.store.add_texts(["alpha v2"], metadatas=[{"id": "1", "version": 2}], embeddings=[[1.0, 0.0, 0.0]], ids=["c5"])
+
+        self.assertEqual(self.store.count(), 4)
+        self.assertEqual(self.store.similarity_search("alpha", k=1)[0][0], "alpha v2")
+
+    def test_page_metadata_is_stored_once_and_joined_back(self):
+        page = {"id": "9", "version": 2, "space": "OPS", "title": "Runbook", "labels": ["database"]}
+        self.store.add_texts(["delta one", "delta two"], metadatas=[page, page], embeddings=[[1.0, 1.0, 0.0]] * 2,
+                             ids=["d1", "d2"])
+
+        stored = self.store.connection.execute("SELECT metadata FROM chunks WHERE page_id = '9'").fetchall()
+        self.assertEqual([json.loads(row[0]) for row in stored], [{"id": "9", "version": 2}] * 2)
+        results = self.store.search([1.0, 1.0, 0.0], k=2, filters=Eq("labels", "database"))
+        self.assertEqual([metadata for _, metadata, _ in results], [page, page])
+
+        self.store.delete_by_page(["9"])
+        self.assertNotIn("9", self.store.page_metadata)
+
+    def test_deletes_tombstone_and_compact_past_threshold(self):
+        self.store.delete_by_page(["1"])
+        self.assertEqual(self.store.size, 4)  # Tombstoned, not yet compacted
+        self.assertNotIn("alpha", [document for document, _ in self.store.similarity_search("alpha", k=4)])
+
+        self.store.delete_by_page(["2", "3"])
+
+        self.assertEqual(self.store.size, 1)
+        self.assertEqual(self.store.similarity_search("beta", k=4), [("gamma", ANY)])
+
+    def test_reopens_from_disk(self):
+        self.store.delete_by_page(["4"])
+        self.store.flush()
+
+        reopened = LocalVectorStore(self.config, self.embeddings)
+
+        self.assertEqual(reopened.count(), 3)
+        self.assertEqual(reopened.similarity_search("beta", k=1)[0][0], "beta")
+
+    def test_hnsw_graph_matches_exact_search(self):
+        self.store_config["path"] = os.path.join(self.path, "hnsw")
+        self.store_config["index"] = {"method": "hnsw", "min_rows": 100, "m": 8, "ef_construction": 64, "ef_search": 64}
+        store = LocalVectorStore(self.config, self.embeddings)
+        rng = np.random.default_rng(7)
+        vectors = rng.normal(size=(300, 16)).tolist()
+        store.add_texts([f"chunk {i}" for i in range(300)], embeddings=vectors, ids=[f"r{i}" for i in range(300)])
+
+        self.assertTrue(store.build_index())
+        approximate = store.search(vectors[10], k=5)
+        store.graph = None
+        exact = store.search(vectors[10], k=5)
+
+        self.assertEqual(approximate[0][0], "chunk 10")
+        self.assertGreaterEqual(len({r[0] for r in approximate} & {r[0] for r in exact}), 4)
+
+    def test_appends_persist_vectors_and_rebuild_graph_without_flush(self):
+        self.store_config["path"] = os.path.join(self.path, "appends")
+        self.store_config["index"] = {"method": "hnsw", "min_rows": 100, "m": 8}
+        store = LocalVectorStore(self.config, self.embeddings)
+        vectors = np.random.default_rng(3).normal(size=(150, 8)).tolist()
+        store.add_texts([f"chunk {i}" for i in range(120)], embeddings=vectors[:120], ids=[f"r{i}" for i in range(120)])
+        store.build_index()
+
+        with patch.object(store, "flush") as flush:
+            store.add_texts([f"chunk {i}" for i in range(120, 150)], embeddings=vectors[120:],
+                            ids=[f"r{i}" for i in range(120, 150)])
+            flush.assert_not_called()  # The graph is not rewritten per batch
+        reopened = LocalVectorStore(self.config, self.embeddings)
+
+        self.assertEqual(len(reopened.graph), 150)
+        store.flush()
+        saved = LocalVectorStore(self.config, self.embeddings)
+        self.assertEqual(saved.graph.neighbours, store.graph.neighbours)
+        self.assertEqual((saved.graph.entry_point, saved.graph.max_level), (store.graph.entry_point, store.graph.max_level))
+        self.assertEqual(reopened.search(vectors[140], k=1)[0][0], "chunk 140")
+
+    def test_stale_graph_is_rebuilt_on_load(self):
+        self.store_config["path"] = os.path.join(self.path, "stale")
+        self.store_config["index"] = {"method": "hnsw", "min_rows": 100, "m": 8}
+        store = LocalVectorStore(self.config, self.embeddings)
+        vectors = np.random.default_rng(5).normal(size=(120, 8)).tolist()
+        store.add_texts([f"chunk {i}" for i in range(120)], embeddings=vectors, ids=[f"r{i}" for i in range(120)])
+        store.build_index()
+        store.graph = None
+        store.add_texts(["late"], embeddings=[vectors[0]], ids=["late"])  # Appended without updating the saved graph
+
+        reopened = LocalVectorStore(self.config, self.embeddings)
+
+        self.assertEqual(len(reopened.graph), 121)
+
+    def test_int8_quantization_keeps_ranking_and_survives_compaction(self):
+        self.store_config["path"] = os.path.join(self.path, "int8")
+        self.store_config["quantization"] = "int8"
+        store = LocalVectorStore(self.config, self.embeddings)
+        rng = np.random.default_rng(11)
+        vectors = rng.normal(size=(200, 32))
+        store.add_texts([f"chunk {i}" for i in range(200)], metadatas=[{"id": str(i)} for i in range(200)],
+                        embeddings=vectors.tolist(), ids=[f"r{i}" for i in range(200)])
+
+        self.assertEqual(store.matrix.dtype, np.int8)
+        normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        expected = [f"chunk {i}" for i in np.argsort(1.0 - normalized @ normalized[3])[:10]]
+        found = [document for document, _, _ in store.search(vectors[3], k=10)]
+        self.assertEqual(found[0], "chunk 3")
+        self.assertGreaterEqual(len(set(found) & set(expected)), 9)
+
+        stored = np.array(store.matrix[:90]), np.array(store.scales[:90])
+        store.delete_by_page([str(i) for i in range(90, 200)])
+        self.assertEqual(store.size, 90)
+        # Compaction moves the quantized rows as they are instead of quantizing them a second time
+        np.testing.assert_array_equal(store.matrix[:90], stored[0])
+        np.testing.assert_array_equal(store.scales[:90], stored[1])
+        self.assertEqual(store.search(vectors[3], k=1)[0][0], "chunk 3")
+
+        store.flush()
+        self.store_config["quantization"] = "none"
+        with self.assertRaises(ValueError):
+            LocalVectorStore(self.config, self.embeddings)
+
+
+if __name__ == "__main__":
+    unittest.main()
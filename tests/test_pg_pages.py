@@ -0,0 +1,46 @@
+import json
+import unittest
+from unittest.mock import MagicMock
+
+from app.modules.pg_pages import PGPageStore
+
+
+class TestPGPageStore(unittest.TestCase):
+    def setUp(self):
+        self.engine = MagicMock()
+        self.connection = MagicMock()
+        self.engine.begin.return_value.__enter__.return_value = self.connection
+        self.store = PGPageStore(self.engine, "docs")
+
+    def _calls(self):
+        return [(str(call[0][0]), call[0][1] if len(call[0]) > 1 else None)
+                for call in self.connection.execute.call_args_list]
+
+    def test_upsert_writes_each_page_once_and_returns_page_references(self):
+        page = {"id": 7, "version": 3, "space": "OPS", "labels": ["runbook"]}
+        loose = {"source": "upload"}
+
+        references = self.store.upsert([page, page, page, loose])
+
+        self.assertEqual(references, [{"id": 7, "version": 3}] * 3 + [loose])
+        (sql, params), = self._calls()
+        self.assertIn("ON CONFLICT (collection_id, page_id) DO UPDATE", sql)
+        self.assertEqual(params["page_ids"], ["7"])
+        self.assertEqual(json.loads(params["metadatas"][0]), page)
+
+    def test_new_table_takes_over_inline_metadata(self):
+        self.connection.execute.return_value.scalar.side_effect = [None, "json"]
+        self.connection.execute.return_value.rowcount = 2
+
+        self.store.ensure_table({"version": "numeric"})
+
+        statements = [sql for sql, _ in self._calls()]
+        self.assertTrue(any("CREATE TABLE IF NOT EXISTS langchain_pg_page" in sql for sql in statements))
+        self.assertTrue(any("langchain_pg_page_metadata_gin_idx" in sql for sql in statements))
+        self.assertTrue(any("CAST(metadata->>'version' AS numeric)" in sql for sql in statements))
+        self.assertTrue(any(sql.startswith("UPDATE langchain_pg_embedding") and "AS json)" in sql for sql in statements))
+        self.assertIn("DROP INDEX IF EXISTS langchain_pg_embedding_meta_version_idx", statements)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import patch
+
+import sqlalchemy
+
+from app.modules import pg_pool
+from app.modules.pg_pool import TimedQueuePool, connection_string, get_engine, pool_status, warm_up
+
+
+class TestPGPool(unittest.TestCase):
+    def setUp(self):
+        pg_pool._ENGINES.clear()
+        self.db_config = {
+            "user": "postgres", "password": "secret", "host": "db", "port": 5432, "dbname": "vector_db",
+            "pool": {"min_size": 3, "max_size": 8, "recycle_seconds": 600, "statement_timeout_ms": 5000,
+                     "keepalives_idle_seconds": 60},
+        }
+
+    def tearDown(self):
+        pg_pool._ENGINES.clear()
+
+    @patch("app.modules.pg_pool._instrument")
+    @patch("app.modules.pg_pool.sqlalchemy.create_engine")
+    def test_get_engine_configures_and_shares_one_pool(self, mock_create_engine, mock_instrument):
+        engine = get_engine(self.db_config)
+
+        self.assertIs(get_engine(dict(self.db_config)), engine)
+        mock_create_engine.assert_called_once()
+        mock_instrument.assert_called_once()
+        url = mock_create_engine.call_args[0][0]
+        kwargs = mock_create_engine.call_args[1]
+        self.assertEqual(url.query, {"sslmode": "require"})
+        self.assertIs(kwargs["poolclass"], TimedQueuePool)
+        self.assertEqual(kwargs["pool_size"], 3)
+        self.assertEqual(kwargs["max_overflow"], 5)
+        self.assertEqual(kwargs["pool_recycle"], 600)
+        self.assertTrue(kwargs["pool_pre_ping"])
+        self.assertEqual(kwargs["connect_args"]["options"], "-c statement_timeout=5000")
+        self.assertEqual(kwargs["connect_args"]["keepalives_idle"], 60)
+
+    def test_credentials_with_reserved_characters_are_escaped(self):
+        self.db_config.update(user="app@corp", password="p@ss:w/rd%1")
+
+        url = sqlalchemy.engine.make_url(connection_string(self.db_config))
+
+        self.assertEqual((url.username, url.password, url.host, url.port), ("app@corp", "p@ss:w/rd%1", "db", 5432))
+        self.assertEqual(url.database, "vector_db")
+
+    def test_pool_records_wait_and_query_time(self):
+        engine = sqlalchemy.create_engine("sqlite://", poolclass=TimedQueuePool, pool_size=2, max_overflow=0)
+        pg_pool._instrument(engine, engine.pool.metrics)
+
+        warm_up(engine, 2)
+        with engine.connect() as connection:
+            connection.execute(sqlalchemy.text("SELECT 1"))
+            connection.execute(sqlalchemy.text("SELECT 2"))
+
+        status = pool_status(engine)
+        self.assertEqual(status["checkouts"], 3)
+        self.assertEqual(status["queries"], 2)
+        self.assertEqual(status["idle"], 2)
+        self.assertEqual(status["checked_out"], 0)
+
+    def test_failed_statements_do_not_skew_later_timings(self):
+        engine = sqlalchemy.create_engine("sqlite://", poolclass=TimedQueuePool, pool_size=1, max_overflow=0)
+        pg_pool._instrument(engine, engine.pool.metrics)
+
+        with engine.connect() as connection:
+            with self.assertRaises(sqlalchemy.exc.OperationalError):
+                connection.execute(sqlalchemy.text("SELECT * FROM missing_table"))
+            self.assertNotIn("query_started_at", connection.info)
+            connection.execute(sqlalchemy.text("SELECT 1"))
+
+        self.assertEqual(pool_status(engine)["queries"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import json
+import struct
+import unittest
+import uuid
+from unittest.mock import MagicMock
+
+from app.modules.pgvector_copy import PGCopyWriter, encode_copy_rows, encode_vector, COPY_HEADER, COPY_TRAILER
+
+
+def decode_copy_rows(data):
+    """Parses a binary COPY stream back into lists of raw field values."""
+    assert data.startswith(COPY_HEADER) and data.endswith(COPY_TRAILER)
+    position, rows = len(COPY_HEADER), []
+    while True:
+        (field_count,) = struct.unpack_from("!h", data, position)
+        position += 2
+        if field_count == -1:
+            return rows
+        fields = []
+        for _ in range(field_count):
+            (length,) = struct.unpack_from("!i", data, position)
+            position += 4
+            fields.append(None if length == -1 else data[position:position + length])
+            position += max(length, 0)
+        rows.append(fields)
+
+
+class TestPGCopyEncoding(unittest.TestCase):
+    def test_encode_vector_uses_pgvector_binary_layout(self):
+        encoded = encode_vector([1.0, -2.5, 0.25])
+
+        self.assertEqual(struct.unpack("!hh", encoded[:4]), (3, 0))
+        self.assertEqual(struct.unpack("!3f", encoded[4:]), (1.0, -2.5, 0.25))
+
+    def test_encode_copy_rows_round_trip(self):
+        row_uuid, collection_id = uuid.uuid4(), uuid.uuid4()
+
+        rows = decode_copy_rows(
+            encode_copy_rows([(row_uuid, collection_id, [0.5, 1.5], "chunk", {"id": "1"}, None)])
+        )
+
+        self.assertEqual(len(rows), 1)
+        fields = rows[0]
+        self.assertEqual(uuid.UUID(bytes=fields[0]), row_uuid)
+        self.assertEqual(uuid.UUID(bytes=fields[1]), collection_id)
+        self.assertEqual(fields[2], encode_vector([0.5, 1.5]))
+        self.assertEqual(fields[3], b"chunk")
+        self.assertEqual(json.loads(fields[4]), {"id": "1"})
+        self.assertIsNone(fields[5])
+
+
+class TestPGCopyWriter(unittest.TestCase):
+    def setUp(self):
+        self.engine = MagicMock()
+        self.connection = self.engine.raw_connection.return_value
+        self.cursor = self.connection.cursor.return_value
+        self.cursor.fetchone.side_effect = [(str(uuid.uuid4()),), ("jsonb",), (2, 1)]
+
+    def test_write_copies_in_batches_and_merges_once(self):
+        writer = PGCopyWriter(self.engine, "test_collection", batch_size=2)
+
+        inserted = writer.write(["a", "b", "c"], [[0.1], [0.2], [0.3]], ["1", "2", "3"], metadatas=[{}, {}, {}])
+
+        self.assertEqual(inserted, 2)
+        self.assertEqual(self.cursor.copy_expert.call_count, 2)
+        copied = [decode_copy_rows(call[0][1].getvalue()) for call in self.cursor.copy_expert.call_args_list]
+        self.assertEqual([len(rows) for rows in copied], [2, 1])
+        merges = [call[0][0] for call in self.cursor.execute.call_args_list if "INSERT INTO" in call[0][0]]
+        self.assertEqual(len(merges), 1)
+        statements = [call[0][0] for call in self.cursor.execute.call_args_list]
+        lock = next(i for i, statement in enumerate(statements) if "pg_advisory_xact_lock" in statement)
+        self.assertLess(lock, statements.index(merges[0]))
+        self.assertIn("s.metadata::jsonb", merges[0])
+        self.assertIn("NOT EXISTS", merges[0])
+        self.assertEqual([row[5] for rows in copied for row in rows], [b"1", b"2", b"3"])
+        self.connection.commit.assert_called_once()
+        self.connection.close.assert_called_once()
+
+    def test_write_rolls_back_on_error(self):
+        self.cursor.copy_expert.side_effect = RuntimeError("COPY failed")
+        writer = PGCopyWriter(self.engine, "test_collection")
+
+        with self.assertRaises(RuntimeError):
+            writer.write(["a"], [[0.1]], ["1"])
+        self.connection.rollback.assert_called_once()
+        self.connection.commit.assert_not_called()
+
+    def test_write_rejects_mismatched_ids(self):
+        writer = PGCopyWriter(self.engine, "test_collection")
+
+        with self.assertRaises(ValueError):
+            writer.write(["a", "b"], [[0.1], [0.2]], ["1"])
+        self.engine.raw_connection.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+import uuid
+from unittest.mock import MagicMock
+
+from app.modules.pgvector_hybrid import PGHybridRetriever
+from app.modules.pgvector_index import PGVectorIndexManager
+
+
+class TestPGHybridRetriever(unittest.TestCase):
+    def setUp(self):
+        self.collection_id = uuid.uuid4()
+        self.engine = MagicMock()
+        self.connection = MagicMock()
+        self.engine.begin.return_value.__enter__.return_value = self.connection
+        self.connection.execute.side_effect = self._execute
+        self.stored_expression = None
+        self.plan_rows = {"unfiltered": 100000.0, "filtered": 100000.0}
+
+    def _execute(self, statement, params=None):
+        result = MagicMock()
+        if str(statement).startswith("EXPLAIN"):
+            rows = self.plan_rows["filtered" if "p.metadata AS jsonb" in str(statement) else "unfiltered"]
+            result.scalar.return_value = [{"Plan": {"Plan Rows": rows}}]
+        elif "FROM langchain_pg_collection" in str(statement):
+            result.fetchone.return_value = (str(self.collection_id),)
+        elif "pg_get_expr" in str(statement):
+            result.fetchone.return_value = None if self.stored_expression is None else (self.stored_expression,)
+        else:
+            result.fetchall.return_value = [("JIRA-1234 is fixed", {"id": "1"}, 0.032)]
+        return result
+
+    def _calls(self):
+        return [(str(call[0][0]), call[0][1] if len(call[0]) > 1 else None)
+                for call in self.connection.execute.call_args_list]
+
+    def test_fuses_lexical_and_vector_rankings_in_one_statement(self):
+        index_manager = PGVectorIndexManager(self.engine, "docs", {"method": "hnsw", "ef_search": 80, "dimensions": 3})
+        retriever = PGHybridRetriever(self.engine, "docs", {"candidates": 20, "rrf_k": 50}, index_manager)
+
+        results = retriever.search("JIRA-1234 outage", [0.1, 0.2, 0.3], k=2)
+
+        self.assertEqual(results, [("JIRA-1234 is fixed", {"id": "1"}, 0.032)])
+        calls = self._calls()
+        self.assertIn(("SELECT set_config(:setting, :value, true)", {"setting": "hnsw.ef_search", "value": "80"}), calls)
+        sql, params = [call for call in calls if "vector_candidates" in call[0]][0]
+        self.assertIn("FULL OUTER JOIN lexical_candidates", sql)
+        self.assertIn("ts_rank_cd(e.document_tsv, q)", sql)
+        self.assertIn("plainto_tsquery('simple', :query)", sql)
+        self.assertIn("e.embedding::vector(3) <=> CAST(:embedding AS vector(3))", sql)
+        self.assertEqual(params["query"], "JIRA-1234 outage")
+        self.assertEqual((params["candidates"], params["rrf_k"], params["k"]), (20, 50, 2))
+
+    def test_filters_apply_to_both_candidate_lists(self):
+        retriever = PGHybridRetriever(self.engine, "docs")
+
+        retriever.search("deploy", [0.1, 0.2], k=4, filters={"space": "OPS", "id": ["1", "2"]})
+
+        sql, params = [call for call in self._calls() if "vector_candidates" in call[0]][0]
+        self.assertEqual(sql.count("CAST(p.metadata AS jsonb) @> CAST(:filter_5 AS jsonb)"), 2)
+        self.assertEqual(sql.count("CAST(p.metadata AS jsonb) @> CAST(:filter_9 AS jsonb)"), 2)
+        # Filters read the page metadata, joined once per candidate list and once for the results
+        self.assertEqual(sql.count("LEFT JOIN langchain_pg_page p"), 3)
+        self.assertEqual((params["filter_5"], params["filter_9"]), ('{"space": "OPS"}', '{"id": "2"}'))
+        self.assertIn("e.embedding <=> CAST(:embedding AS vector)", sql)
+
+    def test_broad_filter_post_filters_ann_candidates(self):
+        index_manager = PGVectorIndexManager(self.engine, "docs", {"method": "hnsw", "ef_search": 40, "dimensions": 3})
+        retriever = PGHybridRetriever(self.engine, "docs", {"candidates": 20}, index_manager)
+        self.plan_rows["filtered"] = 10000.0
+
+        retriever.search("deploy", [0.1, 0.2, 0.3], k=4, filters={"space": "OPS"})
+
+        calls = self._calls()
+        sql, params = [call for call in calls if "vector_candidates" in call[0]][0]
+        self.assertIn("ORDER BY distance LIMIT :ann_candidates) c LEFT JOIN langchain_pg_page p", sql)
+        self.assertIn("ORDER BY c.distance LIMIT :candidates", sql)
+        # 10% selectivity: 20 * 2 / 0.1 ANN candidates, and ef_search raised to match
+        self.assertEqual(params["ann_candidates"], 400)
+        self.assertIn(("SELECT set_config(:setting, :value, true)", {"setting": "hnsw.ef_search", "value": "400"}), calls)
+
+    def test_selective_filter_pre_filters_vector_candidates(self):
+        index_manager = PGVectorIndexManager(self.engine, "docs", {"method": "hnsw", "dimensions": 3})
+        retriever = PGHybridRetriever(self.engine, "docs", {"candidates": 20}, index_manager)
+        self.plan_rows["filtered"] = 50.0
+
+        retriever.search("deploy", [0.1, 0.2, 0.3], k=4, filters={"space": "OPS"})
+
+        calls = self._calls()
+        sql, params = [call for call in calls if "vector_candidates" in call[0]][0]
+        self.assertIn("e.embedding <=> CAST(:embedding AS vector) AS distance", sql)
+        self.assertNotIn(":ann_candidates", sql)
+        self.assertFalse(any("set_config" in call[0] for call in calls))
+
+    def test_binary_candidates_are_reranked_at_full_precision(self):
+        index_manager = PGVectorIndexManager(self.engine, "docs", {"method": "hnsw", "quantization": "binary",
+                                                                   "rerank_factor": 5, "dimensions": 3})
+        retriever = PGHybridRetriever(self.engine, "docs", {"candidates": 20}, index_manager)
+
+        retriever.search("deploy", [0.1, 0.2, 0.3], k=4)
+
+        calls = self._calls()
+        sql, _ = [call for call in calls if "vector_candidates" in call[0]][0]
+        self.assertIn("ORDER BY binary_quantize(e.embedding)::bit(3) <~> binary_quantize(CAST(:embedding AS vector(3))) "
+                      "LIMIT (:ann_candidates) * 5", sql)
+        self.assertIn("e.embedding::vector(3) <=> CAST(:embedding AS vector(3)) AS distance", sql)
+        self.assertIn(("SELECT set_config(:setting, :value, true)", {"setting": "hnsw.ef_search", "value": "100"}), calls)
+
+    def test_ensure_text_index_adds_generated_column_and_gin_index(self):
+        retriever = PGHybridRetriever(self.engine, "docs", {"text_search_config": "english"})
+
+        retriever.ensure_text_index()
+
+        statements = [sql for sql, _ in self._calls()][1:]
+        self.assertIn("GENERATED ALWAYS AS (to_tsvector('english', coalesce(document, ''))) STORED", statements[0])
+        self.assertIn("USING gin (document_tsv)", statements[1])
+        self.assertTrue(retriever.text_index_ready)
+
+    def test_existing_column_is_not_rewritten(self):
+        self.stored_expression = "to_tsvector('english'::regconfig, COALESCE(document, ''::character varying))"
+        retriever = PGHybridRetriever(self.engine, "docs", {"text_search_config": "english"})
+
+        self.assertTrue(retriever.check_text_index())
+        retriever.ensure_text_index()
+
+        self.assertFalse(any("ALTER TABLE" in sql for sql, _ in self._calls()))
+
+    def test_changed_text_search_config_fails_loudly(self):
+        self.stored_expression = "to_tsvector('simple'::regconfig, COALESCE(document, ''::character varying))"
+        retriever = PGHybridRetriever(self.engine, "docs", {"text_search_config": "english"})
+
+        with self.assertRaises(ValueError):
+            retriever.check_text_index()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+import unittest
+import uuid
+from unittest.mock import MagicMock
+
+from app.core.filters import Eq
+from app.modules.pgvector_index import PGVectorIndexManager, default_ivfflat_lists, vector_literal
+
+
+class TestPGVectorIndexManager(unittest.TestCase):
+    def setUp(self):
+        self.collection_id = uuid.uuid4()
+        self.index_row = None
+        self.other_indexes = []
+        self.plan_rows = {"unfiltered": 100000.0, "filtered": 100000.0}
+        self.engine = MagicMock()
+        self.connection = MagicMock()
+        self.connection.info = {}
+        self.connection.execution_options.return_value = self.connection
+        self.engine.connect.return_value.__enter__.return_value = self.connection
+        self.engine.begin.return_value.__enter__.return_value = self.connection
+        self.connection.execute.side_effect = self._execute
+
+    def _execute(self, statement, params=None):
+        sql = str(statement)
+        result = MagicMock()
+        if sql.startswith("EXPLAIN"):
+            rows = self.plan_rows["filtered" if "p.metadata AS jsonb" in sql else "unfiltered"]
+            result.scalar.return_value = [{"Plan": {"Plan Rows": rows}}]
+        elif "pg_get_expr(i.indpred" in sql:
+            result.fetchall.return_value = [(name,) for name in self.other_indexes]
+        elif "pg_get_indexdef" in sql:
+            result.fetchone.return_value = self.index_row
+        elif "FROM langchain_pg_collection" in sql:
+            result.fetchone.return_value = (str(self.collection_id),)
+        elif "vector_dims" in sql:
+            result.fetchone.return_value = (3,)
+        elif "COUNT(*)" in sql:
+            result.scalar.return_value = 250000
+        else:
+            result.fetchall.return_value = [("chunk", {"id": "1"}, 0.25)]
+        return result
+
+    def _statements(self):
+        return [str(call[0][0]) for call in self.connection.execute.call_args_list]
+
+    def test_builds_hnsw_index_concurrently(self):
+        manager = PGVectorIndexManager(self.engine, "Confluence Embeddings", {"method": "hnsw", "m": 24, "ef_construction": 100})
+
+        self.assertTrue(manager.ensure_index())
+
+        self.connection.execution_options.assert_called_with(isolation_level="AUTOCOMMIT")
+        create = [sql for sql in self._statements() if sql.startswith("CREATE INDEX")][0]
+        self.assertIn("CONCURRENTLY", create)
+        self.assertIn("langchain_pg_embedding_confluence_embeddings_hnsw_idx", create)
+        self.assertIn("USING hnsw ((embedding::vector(3)) vector_cosine_ops)", create)
+        self.assertIn("m = 24, ef_construction = 100", create)
+        self.assertIn(f"WHERE collection_id = '{self.collection_id}'", create)
+
+    def test_ivfflat_lists_default_to_row_count(self):
+        manager = PGVectorIndexManager(self.engine, "docs", {"method": "ivfflat", "concurrently": False})
+
+        manager.ensure_index()
+
+        create = [sql for sql in self._statements() if sql.startswith("CREATE INDEX")][0]
+        self.assertNotIn("CONCURRENTLY", create)
+        self.assertIn("WITH (lists = 250)", create)
+        self.assertEqual(default_ivfflat_lists(4_000_000), 2000)
+
+    def test_skips_existing_valid_index_and_rebuilds_invalid_one(self):
+        manager = PGVectorIndexManager(self.engine, "docs", {"method": "hnsw"})
+
+        self.index_row = ("CREATE INDEX ...", True, 8192)
+        self.assertFalse(manager.ensure_index())
+        self.assertFalse(any(sql.startswith("CREATE INDEX") for sql in self._statements()))
+
+        self.index_row = ("CREATE INDEX ...", False, 0)
+        self.assertTrue(manager.ensure_index())
+        statements = self._statements()
+        self.assertTrue(any(sql.startswith("DROP INDEX CONCURRENTLY") for sql in statements))
+        self.assertTrue(any(sql.startswith("CREATE INDEX") for sql in statements))
+
+    def test_indexes_of_a_previous_quantization_are_dropped(self):
+        manager = PGVectorIndexManager(self.engine, "docs", {"method": "hnsw", "quantization": "halfvec"})
+        self.other_indexes = ["langchain_pg_embedding_docs_hnsw_idx"]
+
+        self.assertTrue(manager.ensure_index())
+
+        statements = self._statements()
+        create = [i for i, sql in enumerate(statements) if sql.startswith("CREATE INDEX")][0]
+        drop = statements.index('DROP INDEX CONCURRENTLY IF EXISTS "langchain_pg_embedding_docs_hnsw_idx"')
+        self.assertGreater(drop, create)  # Searches keep an index while the new one is built
+        lookup = [call[0][1] for call in self.connection.execute.call_args_list if "pg_get_expr(i.indpred" in str(call[0][0])]
+        self.assertEqual(lookup[0], {"predicate": f"%'{self.collection_id}'%",
+                                     "name": "langchain_pg_embedding_docs_hnsw_halfvec_idx"})
+
+    def test_search_sets_per_query_parameter(self):
+        manager = PGVectorIndexManager(self.engine, "docs", {"method": "hnsw", "ef_search": 40}, prepared_statements=False)
+
+        results = manager.search([0.1, 0.2, 0.3], k=2, ef_search=200)
+
+        self.assertEqual(results, [("chunk", {"id": "1"}, 0.25)])
+        settings = [call[0][1] for call in self.connection.execute.call_args_list if "set_config" in str(call[0][0])]
+        self.assertEqual(settings, [{"setting": "hnsw.ef_search", "value": "200"}])
+        query = [sql for sql in self._statements() if "ORDER BY distance" in sql][0]
+        self.assertIn("embedding::vector(3) <=> CAST(:embedding AS vector(3))", query)
+        self.assertEqual(vector_literal([1, 0.5]), "[1.0,0.5]")
+
+    def test_search_prepares_query_once_per_connection(self):
+        manager = PGVectorIndexManager(self.engine, "docs", {"method": "ivfflat"})
+
+        manager.search([0.1, 0.2, 0.3], k=2)
+        manager.search([0.3, 0.2, 0.1], k=2, probes=5)
+
+        statements = self._statements()
+        prepares = [sql for sql in statements if sql.startswith("PREPARE")]
+        self.assertEqual(len(prepares), 1)
+        self.assertIn("CAST($1 AS vector(3))", prepares[0])
+        self.assertIn("LIMIT $2", prepares[0])
+        self.assertEqual(len([sql for sql in statements if sql.startswith("EXECUTE")]), 2)
+        settings = [call[0][1] for call in self.connection.execute.call_args_list if "set_config" in str(call[0][0])]
+        self.assertEqual([s["value"] for s in settings], ["10", "5"])
+
+    def test_broad_filter_post_filters_ann_candidates(self):
+        manager = PGVectorIndexManager(self.engine, "docs", {"method": "hnsw", "ef_search": 40})
+        self.plan_rows["filtered"] = 10000.0
+
+        manager.search([0.1, 0.2, 0.3], k=4, filters=Eq("space", "OPS"))
+
+        query = [sql for sql in self._statements() if "ORDER BY c.distance" in sql][0]
+        self.assertIn("ORDER BY distance LIMIT :candidates) c LEFT JOIN langchain_pg_page p", query)
+        self.assertIn("WHERE TRUE AND (CAST(p.metadata AS jsonb) @>", query)
+        self.assertFalse(any(sql.startswith("PREPARE") for sql in self._statements()))
+        params = [call[0][1] for call in self.connection.execute.call_args_list if "ORDER BY c.distance" in str(call[0][0])][0]
+        # 10% selectivity: 4 * 2 / 0.1 candidates, and ef_search raised to match
+        self.assertEqual(params["candidates"], 80)
+        settings = [call[0][1] for call in self.connection.execute.call_args_list if "set_config" in str(call[0][0])]
+        self.assertEqual(settings, [{"setting": "hnsw.ef_search", "value": "80"}])
+
+    def test_selective_filter_pre_filters_with_exact_distances(self):
+        manager = PGVectorIndexManager(self.engine, "docs", {"method": "hnsw"})
+        self.plan_rows["filtered"] = 50.0
+
+        manager.search([0.1, 0.2, 0.3], k=4, filters={"space": "OPS"})
+
+        query = [sql for sql in self._statements() if "ORDER BY distance LIMIT :k" in sql][0]
+        self.assertIn("e.embedding <=> CAST(:embedding AS vector) AS distance", query)
+        self.assertIn("LEFT JOIN langchain_pg_page p ON p.collection_id = e.collection_id", query)
+        self.assertIn("CAST(p.metadata AS jsonb) @>", query)
+        self.assertFalse(any("set_config" in sql for sql in self._statements()))
+
+    def test_halfvec_index_and_query_use_half_precision(self):
+        manager = PGVectorIndexManager(self.engine, "docs", {"method": "hnsw", "quantization": "halfvec"},
+                                       prepared_statements=False)
+
+        manager.ensure_index()
+        manager.search([0.1, 0.2, 0.3], k=2)
+
+        create = [sql for sql in self._statements() if sql.startswith("CREATE INDEX")][0]
+        self.assertIn("langchain_pg_embedding_docs_hnsw_halfvec_idx", create)
+        self.assertIn("USING hnsw ((embedding::halfvec(3)) halfvec_cosine_ops)", create)
+        query = [sql for sql in self._statements() if "ORDER BY distance" in sql][0]
+        self.assertIn("e.embedding::halfvec(3) <=> CAST(:embedding AS halfvec(3))", query)
+
+    def test_binary_index_reranks_at_full_precision(self):
+        manager = PGVectorIndexManager(self.engine, "docs", {"method": "hnsw", "quantization": "binary", "rerank_factor": 5})
+
+        manager.ensure_index()
+        manager.search([0.1, 0.2, 0.3], k=20)
+
+        create = [sql for sql in self._statements() if sql.startswith("CREATE INDEX")][0]
+        self.assertIn("USING hnsw ((binary_quantize(embedding)::bit(3)) bit_hamming_ops)", create)
+        prepare = [sql for sql in self._statements() if sql.startswith("PREPARE")][0]
+        self.assertIn("ORDER BY binary_quantize(e.embedding)::bit(3) <~> binary_quantize(CAST($1 AS vector(3))) LIMIT ($2) * 5", prepare)
+        self.assertIn("e.embedding::vector(3) <=> CAST($1 AS vector(3)) AS distance", prepare)
+        settings = [call[0][1] for call in self.connection.execute.call_args_list if "set_config" in str(call[0][0])]
+        self.assertEqual(settings, [{"setting": "hnsw.ef_search", "value": "100"}])
+
+    def test_rejects_unknown_method(self):
+        with self.assertRaises(ValueError):
+            PGVectorIndexManager(self.engine, "docs", {"method": "diskann"})
+        with self.assertRaises(ValueError):
+            PGVectorIndexManager(self.engine, "docs", {"quantization": "pq"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,11 @@
+import asyncio
+import hashlib
+import threading
+import time
 import unittest
 from unittest.mock import patch, MagicMock
 
+from app.core.chunking import Chunk
 from app.core.config import Config
 from app.core.aws_manager import AWSManager
 from app.modules.bedrock_embedding import BedrockEmbeddings
@@ -10,6 +15,9 @@ from app.modules.bedrock_llm import BedrockLLM
 from app.modules.markdown_recursive_splitter import MarkdownRecursiveChunking
 from app.pipelines.rag_pipeline import RAGPipeline
 from app.utils.error_handler import ErrorHandler
+from app.core.watermark_store import WatermarkStore, PageWatermark
+from app.core.response_cache import ResponseCache
+from app.modules.semantic_response_cache import SemanticResponseCache
 
 
 class TestRAGPipeline(unittest.TestCase):
@@ -38,6 +46,7 @@ class TestRAGPipeline(unittest.TestCase):
             "username": "test_username",
             "api_key": "test_api_key",
         }
+        self.config.get_query_config.return_value = {"max_concurrency": 8, "llm_concurrency": 2}
         self.config.get.return_value = "test_value"
         self.config.get_secret.return_value = "test_secret"
 
@@ -53,7 +62,11 @@ class TestRAGPipeline(unittest.TestCase):
         self.document_loader_mock = MagicMock(spec=ConfluenceDocumentLoader)
         self.llm_mock = MagicMock(spec=BedrockLLM)
         self.chunking_mock = MagicMock(spec=MarkdownRecursiveChunking)
+        self.chunking_mock.chunk_documents.side_effect = (
+            lambda documents, ordered=None: map(self.chunking_mock.chunk_document, documents)
+        )
         self.error_handler_mock = MagicMock(spec=ErrorHandler)
+        self.watermark_store_mock = MagicMock(spec=WatermarkStore)
 
         # Instantiate RAGPipeline with mocks
         self.rag_pipeline = RAGPipeline(
@@ -63,20 +76,20 @@ class TestRAGPipeline(unittest.TestCase):
             self.embeddings_mock,
             self.vector_store_mock,
             self.llm_mock,
+            watermark_store=self.watermark_store_mock,
         )
         self.rag_pipeline.error_handler = self.error_handler_mock
 
     @patch("app.pipelines.rag_pipeline.logger")
     def test_ingest_data(self, mock_logger):
-        # Simulate loading two batches of documents
-        self.document_loader_mock.load.side_effect = [
-            [{"page_content": "test content 1", "metadata": {"id": "1"}}],
-            [{"page_content": "test content 2", "metadata": {"id": "2"}}],
-            [],  # Empty list to signal the end of documents
-        ]
+        # Simulate the loader streaming two documents
+        self.document_loader_mock.iter_pages.return_value = iter([
+            {"page_content": "test content 1", "metadata": {"id": "1"}},
+            {"page_content": "test content 2", "metadata": {"id": "2"}},
+        ])
         self.chunking_mock.chunk_document.side_effect = [
-            [{"page_content": "test chunk 1", "metadata": {"id": "1"}}],
-            [{"page_content": "test chunk 2", "metadata": {"id": "2"}}],
+            [Chunk("test chunk 1", "1", "c1")],
+            [Chunk("test chunk 2", "2", "c2")],
         ]
         self.embeddings_mock.embed_documents.side_effect = [
             [[0.1, 0.2, 0.3]],
@@ -85,7 +98,8 @@ class TestRAGPipeline(unittest.TestCase):
 
         self.rag_pipeline.ingest_data(batch_size=1)  # Ingest in batches of 1
 
-        self.assertEqual(self.document_loader_mock.load.call_count, 3)  # Called 3 times (2 batches + 1 empty)
+        self.document_loader_mock.iter_pages.assert_called_once_with()  # Every page is fetched in a single pass
+        self.document_loader_mock.load.assert_not_called()
         self.chunking_mock.chunk_document.assert_any_call(
             {"page_content": "test content 1", "metadata": {"id": "1"}}
         )
@@ -95,24 +109,109 @@ class TestRAGPipeline(unittest.TestCase):
         self.embeddings_mock.embed_documents.assert_any_call(["test chunk 1"])
         self.embeddings_mock.embed_documents.assert_any_call(["test chunk 2"])
         self.vector_store_mock.add_texts.assert_any_call(
-            ["test chunk 1"], metadatas=[{"id": "1"}], embeddings=[[0.1, 0.2, 0.3]]
+            ["test chunk 1"], metadatas=[{"id": "1"}], embeddings=[[0.1, 0.2, 0.3]], ids=["c1"]
         )
         self.vector_store_mock.add_texts.assert_any_call(
-            ["test chunk 2"], metadatas=[{"id": "2"}], embeddings=[[0.4, 0.5, 0.6]]
+            ["test chunk 2"], metadatas=[{"id": "2"}], embeddings=[[0.4, 0.5, 0.6]], ids=["c2"]
         )
         mock_logger.info.assert_called()
 
     @patch("app.pipelines.rag_pipeline.logger")
     def test_ingest_data_no_documents(self, mock_logger):
-        self.document_loader_mock.load.return_value = []
+        self.document_loader_mock.iter_pages.return_value = iter([])
 
         self.rag_pipeline.ingest_data()
 
-        self.document_loader_mock.load.assert_called_once_with(limit=100, offset=0)
+        self.document_loader_mock.iter_pages.assert_called_once_with()
         self.chunking_mock.chunk_document.assert_not_called()
         self.embeddings_mock.embed_documents.assert_not_called()
         self.vector_store_mock.add_texts.assert_not_called()
-        mock_logger.warning.assert_called_with("No more documents found.")
+        mock_logger.warning.assert_called_with("No documents found.")
+
+    @patch("app.pipelines.rag_pipeline.logger")
+    def test_ingest_data_invalidates_cached_responses(self, mock_logger):
+        self.rag_pipeline.response_cache.put(ResponseCache.make_key("query"), "stale answer")
+        self.document_loader_mock.iter_pages.return_value = iter([
+            {"page_content": "test content 1", "metadata": {"id": "1"}},
+        ])
+        self.chunking_mock.chunk_document.return_value = [Chunk("test chunk 1", "1", "c1")]
+        self.embeddings_mock.embed_documents.return_value = [[0.1]]
+
+        self.rag_pipeline.ingest_data()
+
+        self.assertIsNone(self.rag_pipeline.response_cache.get(ResponseCache.make_key("query")))
+
+    @patch("app.pipelines.rag_pipeline.logger")
+    def test_ingest_streaming(self, mock_logger):
+        self.document_loader_mock.iter_pages.return_value = iter([
+            {"page_content": "test content 1", "metadata": {"id": "1"}},
+        ])
+        self.chunking_mock.chunk_document.return_value = [Chunk("test chunk 1", "1", "c1")]
+        self.embeddings_mock.embed_documents.return_value = [[0.1, 0.2, 0.3]]
+
+        metrics = self.rag_pipeline.ingest_streaming(batch_size=10)
+
+        self.vector_store_mock.add_texts.assert_called_once_with(
+            ["test chunk 1"], metadatas=[{"id": "1"}], embeddings=[[0.1, 0.2, 0.3]], ids=["c1"]
+        )
+        self.assertEqual(metrics["stages"]["write"]["items_out"], 1)
+        self.error_handler_mock.handle_error.assert_not_called()
+
+    @patch("app.pipelines.rag_pipeline.logger")
+    def test_ingest_incremental(self, mock_logger):
+        self.document_loader_mock.list_page_versions.return_value = {
+            "1": {"version": 3, "last_modified": "2024-01-02"},  # unchanged
+            "2": {"version": 5, "last_modified": "2024-01-03"},  # changed
+            "4": {"version": 1, "last_modified": "2024-01-04"},  # new
+        }
+        self.watermark_store_mock.get_all.return_value = {
+            "1": PageWatermark("1", 3, "unchanged_hash", "2024-01-02"),
+            "2": PageWatermark("2", 4, "old_hash", "2024-01-01"),
+            "3": PageWatermark("3", 1, "removed_hash", "2023-12-31"),  # removed upstream
+        }
+        self.document_loader_mock.load_pages.return_value = [
+            {"page_content": "changed content", "metadata": {"id": "2"}},
+            {"page_content": "new content", "metadata": {"id": "4"}},
+        ]
+        self.chunking_mock.chunk_document.side_effect = [
+            [Chunk("changed chunk", "2", "c2")],
+            [Chunk("new chunk", "4", "c4")],
+        ]
+        self.embeddings_mock.embed_documents.return_value = [[0.1], [0.2]]
+
+        self.rag_pipeline.ingest_incremental()
+
+        self.document_loader_mock.load_pages.assert_called_once_with(["2", "4"])
+        self.vector_store_mock.delete_by_page.assert_any_call(["3"])
+        self.vector_store_mock.delete_by_page.assert_any_call(["2"])
+        self.watermark_store_mock.delete.assert_called_once_with(["3"])
+        self.embeddings_mock.embed_documents.assert_called_once_with(["changed chunk", "new chunk"])
+        self.vector_store_mock.add_texts.assert_called_once()
+        upserted = self.watermark_store_mock.upsert.call_args[0][0]
+        self.assertEqual([(w.page_id, w.version) for w in upserted], [("2", 5), ("4", 1)])
+        self.error_handler_mock.handle_error.assert_not_called()
+
+    @patch("app.pipelines.rag_pipeline.logger")
+    def test_ingest_incremental_skips_unchanged_content(self, mock_logger):
+        self.document_loader_mock.list_page_versions.return_value = {
+            "1": {"version": 2, "last_modified": "2024-01-02"},
+        }
+        content_hash = hashlib.sha256(b"same content").hexdigest()
+        self.watermark_store_mock.get_all.return_value = {
+            "1": PageWatermark("1", 1, content_hash, "2024-01-01"),
+        }
+        self.document_loader_mock.load_pages.return_value = [
+            {"page_content": "same content", "metadata": {"id": "1"}},
+        ]
+
+        self.rag_pipeline.ingest_incremental()
+
+        self.chunking_mock.chunk_document.assert_not_called()
+        self.embeddings_mock.embed_documents.assert_not_called()
+        self.vector_store_mock.delete_by_page.assert_not_called()
+        self.watermark_store_mock.upsert.assert_called_once_with(
+            [PageWatermark("1", 2, content_hash, "2024-01-02")]
+        )
 
     @patch("app.pipelines.rag_pipeline.logger")
     @patch('app.pipelines.rag_pipeline.hashlib.sha256')
@@ -120,22 +219,70 @@ class TestRAGPipeline(unittest.TestCase):
         query = "test query"
         mock_hash.return_value.hexdigest.return_value = "test_hash"
         relevant_docs = [("test context", 0.8)]
-        self.vector_store_mock.similarity_search.return_value = relevant_docs
+        self.embeddings_mock.embed_query.return_value = [0.1, 0.2]
+        self.vector_store_mock.similarity_search_by_vector.return_value = relevant_docs
         self.llm_mock.generate_text.return_value = "test answer"
 
         # Call generate_response twice with the same query
         response1 = self.rag_pipeline.generate_response(query)
         response2 = self.rag_pipeline.generate_response(query)
 
-        self.vector_store_mock.similarity_search.assert_called_once_with(query, k=4)
+        # Embedded once, and the vector is reused for the search
+        self.embeddings_mock.embed_query.assert_called_once_with(query)
+        self.vector_store_mock.similarity_search_by_vector.assert_called_once_with([0.1, 0.2], k=4, query=query)
+        self.vector_store_mock.similarity_search.assert_not_called()
         self.llm_mock.generate_text.assert_called_once()
         self.assertEqual(response1, "test answer")
         self.assertEqual(response2, "test answer") # Should return the cached response
         mock_logger.info.assert_called()
 
+    @patch("app.pipelines.rag_pipeline.logger")
+    def test_generate_response_semantic_cache(self, mock_logger):
+        self.rag_pipeline.semantic_cache = SemanticResponseCache(threshold=0.99)
+        self.embeddings_mock.embed_query.side_effect = lambda query: [1.0, 0.0] if "reset" in query else [0.0, 1.0]
+        self.vector_store_mock.similarity_search_by_vector.return_value = [("test context", 0.8)]
+        self.llm_mock.generate_text.return_value = "test answer"
+
+        first = self.rag_pipeline.generate_response("How do I reset my password?")
+        rephrased = self.rag_pipeline.generate_response("how can I reset the password")
+        unrelated = self.rag_pipeline.generate_response("Where is the office?")
+
+        self.assertEqual([first, rephrased, unrelated], ["test answer"] * 3)
+        self.assertEqual(self.llm_mock.generate_text.call_count, 2)  # The rephrased query is a semantic hit
+        self.assertEqual(self.vector_store_mock.similarity_search_by_vector.call_count, 2)
+        self.vector_store_mock.similarity_search.assert_not_called()
+
+    @patch("app.pipelines.rag_pipeline.logger")
+    def test_stream_response_yields_parts_and_caches_full_response(self, mock_logger):
+        self.vector_store_mock.similarity_search_by_vector.return_value = [("test context", 0.8)]
+        self.llm_mock.stream_text.return_value = iter(["Hello", ", ", "world"])
+
+        parts = list(self.rag_pipeline.stream_response("test query"))
+
+        self.assertEqual(parts, ["Hello", ", ", "world"])
+        self.llm_mock.generate_text.assert_not_called()
+        self.assertEqual(list(self.rag_pipeline.stream_response("test query")), ["Hello, world"])
+        self.llm_mock.stream_text.assert_called_once()
+        self.assertTrue(any("Time to first token" in call[0][0] for call in mock_logger.info.call_args_list))
+
+    @patch("app.pipelines.rag_pipeline.logger")
+    def test_stream_response_does_not_cache_failed_stream(self, mock_logger):
+        def failing_stream(prompt):
+            yield "Hello"
+            raise RuntimeError("stream broken")
+
+        self.vector_store_mock.similarity_search_by_vector.return_value = [("test context", 0.8)]
+        self.llm_mock.stream_text.side_effect = failing_stream
+
+        parts = list(self.rag_pipeline.stream_response("test query"))
+
+        self.assertEqual(parts, ["Hello"])
+        self.error_handler_mock.handle_error.assert_called_once()
+        self.assertIsNone(self.rag_pipeline.response_cache.get(ResponseCache.make_key("test query")))
+
     def test_generate_response_error(self):
         query = "test query"
-        self.vector_store_mock.similarity_search.side_effect = Exception(
+        self.vector_store_mock.similarity_search_by_vector.side_effect = Exception(
             "Test error"
         )
 
@@ -144,6 +291,78 @@ class TestRAGPipeline(unittest.TestCase):
         self.error_handler_mock.handle_error.assert_called_once()
         self.assertEqual(response, "An error occurred while generating the response.")
 
+    @patch("app.pipelines.rag_pipeline.logger")
+    def test_generate_responses_embeds_once_and_dedupes(self, mock_logger):
+        self.rag_pipeline.response_cache.put(ResponseCache.make_key("cached"), "cached answer")
+        self.embeddings_mock.embed_queries.return_value = [[0.1], [0.2]]
+        self.vector_store_mock.similarity_search_by_vector.side_effect = lambda embedding, k, query=None: [(f"doc {embedding[0]}", 0.1)]
+        self.llm_mock.generate_text.side_effect = lambda prompt: f"answer {prompt}"
+        self.config.get.return_value = "{context}"
+
+        responses = self.rag_pipeline.generate_responses(["q1", "cached", "q2", "q1"])
+
+        self.embeddings_mock.embed_queries.assert_called_once_with(["q1", "q2"])
+        self.assertEqual(self.vector_store_mock.similarity_search_by_vector.call_count, 2)
+        self.vector_store_mock.similarity_search.assert_not_called()
+        self.assertEqual(responses, ["answer doc 0.1", "cached answer", "answer doc 0.2", "answer doc 0.1"])
+        self.assertEqual(self.rag_pipeline.generate_responses(["q2"]), ["answer doc 0.2"])  # Now cached
+        self.assertEqual(self.llm_mock.generate_text.call_count, 2)
+
+    @patch("app.pipelines.rag_pipeline.logger")
+    def test_generate_responses_caps_llm_concurrency(self, mock_logger):
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def generate_text(prompt):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return "answer"
+
+        queries = [f"query {i}" for i in range(8)]
+        self.embeddings_mock.embed_queries.return_value = [[float(i)] for i in range(8)]
+        self.vector_store_mock.similarity_search_by_vector.return_value = [("doc", 0.1)]
+        self.llm_mock.generate_text.side_effect = generate_text
+
+        responses = self.rag_pipeline.generate_responses(queries)
+
+        self.assertEqual(responses, ["answer"] * 8)
+        self.assertEqual(peak[0], 2)
+
+    def test_generate_responses_isolates_failures(self):
+        self.embeddings_mock.embed_queries.return_value = [[0.1], [0.2]]
+        self.vector_store_mock.similarity_search_by_vector.side_effect = [[("doc", 0.1)], Exception("Test error")]
+        self.llm_mock.generate_text.return_value = "answer"
+        self.rag_pipeline.query_executor = MagicMock()
+        self.rag_pipeline.query_executor.submit.side_effect = lambda fn, *args: MagicMock(result=MagicMock(return_value=fn(*args)))
+
+        responses = self.rag_pipeline.generate_responses(["q1", "q2"])
+
+        self.assertEqual(responses, ["answer", "An error occurred while generating the response."])
+        self.error_handler_mock.handle_error.assert_called_once()
+
+    @patch("app.pipelines.rag_pipeline.logger")
+    def test_agenerate_response_runs_concurrently(self, mock_logger):
+        self.vector_store_mock.similarity_search_by_vector.return_value = [("doc", 0.1)]
+
+        def generate_text(prompt):
+            time.sleep(0.05)
+            return "answer"
+
+        self.llm_mock.generate_text.side_effect = generate_text
+
+        async def run():
+            return await asyncio.gather(*(self.rag_pipeline.agenerate_response(f"query {i}") for i in range(4)))
+
+        started = time.monotonic()
+        responses = asyncio.run(run())
+
+        self.assertEqual(responses, ["answer"] * 4)
+        self.assertLess(time.monotonic() - started, 0.18)  # Two waves of two LLM calls, not four in a row
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
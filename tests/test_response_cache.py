@@ -0,0 +1,166 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.core.config import Config
+from app.core.response_cache import ResponseCache
+from app.modules.memory_response_cache import MemoryResponseCache
+from app.modules.pg_response_cache import PGResponseCache
+from app.modules.semantic_response_cache import SemanticResponseCache
+from app.modules.sqlite_response_cache import SQLiteResponseCache
+from app.modules.tiered_response_cache import TieredResponseCache
+
+
+class TestMemoryResponseCache(unittest.TestCase):
+    def test_make_key_normalizes_case_and_whitespace(self):
+        self.assertEqual(ResponseCache.make_key("How do I  deploy?\n"), ResponseCache.make_key("how do i deploy?"))
+        self.assertNotEqual(ResponseCache.make_key("deploy"), ResponseCache.make_key("rollback"))
+
+    def test_evicts_least_recently_used(self):
+        cache = MemoryResponseCache(max_entries=2)
+        cache.put("a", "A")
+        cache.put("b", "B")
+        cache.get("a")
+        cache.put("c", "C")
+
+        self.assertEqual(cache.get("a"), "A")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), "C")
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.stats(), {"hits": 3, "misses": 1})
+
+    def test_entries_expire(self):
+        cache = MemoryResponseCache(ttl_seconds=10)
+        with patch("app.modules.memory_response_cache.time.monotonic", return_value=100.0):
+            cache.put("a", "A")
+        with patch("app.modules.memory_response_cache.time.monotonic", return_value=105.0):
+            self.assertEqual(cache.get("a"), "A")
+        with patch("app.modules.memory_response_cache.time.monotonic", return_value=111.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+
+class TestSQLiteResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config = MagicMock(spec=Config)
+        self.config.get.return_value = {
+            "shared": {"path": os.path.join(self.temp_dir.name, "responses.db"), "max_entries": 2, "ttl_seconds": 60}
+        }
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_shared_between_instances_and_bounded(self):
+        writer = SQLiteResponseCache(self.config)
+        reader = SQLiteResponseCache(self.config)
+
+        writer.put("a", "A")
+        writer.put("b", "B")
+        self.assertEqual(reader.get("a"), "A")
+        writer.put("c", "C")
+
+        self.assertIsNone(reader.get("a"))  # Oldest entry evicted beyond max_entries
+        self.assertEqual(reader.get("c"), "C")
+
+        generation = writer.generation()
+        reader.invalidate()
+        self.assertIsNone(writer.get("c"))
+        self.assertEqual(writer.generation(), generation + 1)
+
+    def test_ttl_falls_back_to_the_response_cache_ttl(self):
+        self.config.get.return_value = {"ttl_seconds": 120, "shared": {"path": self.config.get.return_value["shared"]["path"]}}
+
+        self.assertEqual(SQLiteResponseCache(self.config).ttl_seconds, 120)
+
+
+class TestPGResponseCache(unittest.TestCase):
+    @patch("app.modules.pg_response_cache.get_engine")
+    def test_consecutive_puts_over_the_limit_only_evict_the_overflow(self, mock_get_engine):
+        config = MagicMock(spec=Config)
+        config.get.return_value = {"ttl_seconds": 120, "shared": {"max_entries": 5}}
+        connection = mock_get_engine.return_value.begin.return_value.__enter__.return_value
+        cache = PGResponseCache(config)
+
+        def result(rowcount=None, scalar=None):
+            return MagicMock(rowcount=rowcount, scalar=MagicMock(return_value=scalar))
+
+        connection.execute.side_effect = [result(scalar=True), result(scalar=7), result(rowcount=2)]
+        cache.put("a", "A")
+        # An update of an existing key adds no row, so nothing more is evicted
+        connection.execute.side_effect = [result(scalar=False)]
+        cache.put("a", "A2")
+        connection.execute.side_effect = [result(scalar=True), result(rowcount=1)]
+        cache.put("b", "B")
+
+        evictions = [call[0][1] for call in connection.execute.call_args_list if "DELETE" in str(call[0][0])]
+        self.assertEqual(evictions, [{"overflow": 2}, {"overflow": 1}])
+        self.assertEqual(cache.ttl_seconds, 120)
+
+
+class TestTieredResponseCache(unittest.TestCase):
+    def test_promotes_shared_hits_and_invalidates_every_tier(self):
+        memory = MemoryResponseCache()
+        shared = MemoryResponseCache()
+        cache = TieredResponseCache([memory, shared])
+        shared.put("a", "A")
+
+        self.assertEqual(cache.get("a"), "A")
+        self.assertEqual(memory.get("a"), "A")  # Promoted to the faster tier
+
+        cache.put("b", "B")
+        self.assertEqual(shared.get("b"), "B")
+
+        cache.invalidate()
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+
+
+    def test_invalidation_by_another_instance_clears_the_memory_tier(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            config = MagicMock(spec=Config)
+            config.get.return_value = {"shared": {"path": os.path.join(temp_dir, "responses.db")}}
+            now = [0.0]
+            ingester = TieredResponseCache([MemoryResponseCache(), SQLiteResponseCache(config)], 5, lambda: now[0])
+            server_memory = MemoryResponseCache()
+            server = TieredResponseCache([server_memory, SQLiteResponseCache(config)], 5, lambda: now[0])
+            server.put("a", "A")
+            self.assertEqual(server.get("a"), "A")
+
+            ingester.invalidate()
+            now[0] = 1.0
+            self.assertEqual(server.get("a"), "A")  # Served from memory until the next generation check
+            now[0] = 6.0
+            self.assertIsNone(server.get("a"))
+            self.assertEqual(len(server_memory), 0)
+
+
+class TestSemanticResponseCache(unittest.TestCase):
+    def test_returns_response_of_similar_query(self):
+        cache = SemanticResponseCache(threshold=0.95, max_entries=2)
+        cache.add([1.0, 0.0, 0.0], "answer x")
+        cache.add([0.0, 1.0, 0.0], "answer y")
+
+        self.assertEqual(cache.lookup([0.99, 0.05, 0.0]), "answer x")
+        self.assertIsNone(cache.lookup([0.7, 0.7, 0.0]))
+
+        cache.add([0.0, 0.0, 1.0], "answer z")  # Overwrites the oldest slot
+        self.assertIsNone(cache.lookup([1.0, 0.0, 0.0]))
+        self.assertEqual(cache.lookup([0.0, 0.0, 2.0]), "answer z")
+
+        cache.invalidate()
+        self.assertIsNone(cache.lookup([0.0, 1.0, 0.0]))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_expired_entries_do_not_match(self):
+        cache = SemanticResponseCache(ttl_seconds=0.01)
+        cache.add([1.0, 0.0], "answer")
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.lookup([1.0, 0.0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
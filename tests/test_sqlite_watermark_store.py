@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from app.core.config import Config
+from app.core.watermark_store import PageWatermark
+from app.modules.sqlite_watermark_store import SQLiteWatermarkStore
+
+
+class TestSQLiteWatermarkStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.config = MagicMock(spec=Config)
+        self.config.get.return_value = {"watermark_path": os.path.join(self.temp_dir.name, "watermarks.db")}
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_upsert_get_and_delete(self):
+        store = SQLiteWatermarkStore(self.config, namespace="SPACE")
+        store.upsert([PageWatermark("1", 1, "hash1", "2024-01-01"), PageWatermark("2", 1, "hash2")])
+        store.upsert([PageWatermark("1", 2, "hash1b", "2024-01-02")])
+
+        watermarks = store.get_all()
+        self.assertEqual(watermarks["1"], PageWatermark("1", 2, "hash1b", "2024-01-02"))
+        self.assertEqual(set(watermarks), {"1", "2"})
+
+        store.delete(["2"])
+        self.assertEqual(set(store.get_all()), {"1"})
+
+    def test_namespaces_are_isolated(self):
+        SQLiteWatermarkStore(self.config, namespace="A").upsert([PageWatermark("1", 1, "hash")])
+
+        reopened = SQLiteWatermarkStore(self.config, namespace="B")
+        self.assertEqual(reopened.get_all(), {})
+        self.assertIn("1", SQLiteWatermarkStore(self.config, namespace="A").get_all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import threading
+import unittest
+from unittest.mock import MagicMock
+
+from app.core.chunking import Chunk, ChunkingStrategy
+from app.core.embeddings import Embeddings
+from app.core.vectorstore import VectorStore
+from app.pipelines.streaming_ingestion import StreamingIngestion
+
+
+class TestStreamingIngestion(unittest.TestCase):
+    def setUp(self):
+        self.chunking_mock = MagicMock(spec=ChunkingStrategy)
+        self.chunking_mock.chunk_documents.side_effect = (
+            lambda documents, ordered=None: map(self.chunking_mock.chunk_document, documents)
+        )
+        self.chunking_mock.chunk_document.side_effect = lambda doc: [
+            Chunk(f"{doc['page_content']} chunk {i}", doc["metadata"]["id"], f"{doc['metadata']['id']}-{i}") for i in range(3)
+        ]
+        self.embeddings_mock = MagicMock(spec=Embeddings)
+        self.embeddings_mock.embed_documents.side_effect = lambda texts: [[float(len(t))] for t in texts]
+        self.vector_store_mock = MagicMock(spec=VectorStore)
+
+    def test_run_writes_every_chunk_in_bounded_batches(self):
+        documents = ({"page_content": f"doc {i}", "metadata": {"id": str(i)}} for i in range(10))
+        ingestion = StreamingIngestion(
+            documents, self.chunking_mock, self.embeddings_mock, self.vector_store_mock,
+            embed_batch_size=4, queue_size=1,
+        )
+
+        metrics = ingestion.run()
+
+        written = [text for call in self.vector_store_mock.add_texts.call_args_list for text in call[0][0]]
+        self.assertEqual(len(written), 30)
+        self.assertEqual(set(written), {f"doc {i} chunk {j}" for i in range(10) for j in range(3)})
+        self.assertTrue(all(len(call[0][0]) <= 4 for call in self.vector_store_mock.add_texts.call_args_list))
+        # Chunks of a page split across batches still find the page metadata
+        for call in self.vector_store_mock.add_texts.call_args_list:
+            for text, metadata in zip(call[0][0], call[1]["metadatas"]):
+                self.assertEqual(text.split()[1], metadata["id"])
+        self.assertEqual(metrics["stages"]["load"]["items_out"], 10)
+        self.assertEqual(metrics["stages"]["chunk"]["items_out"], 30)
+        self.assertEqual(metrics["stages"]["write"]["items_out"], 30)
+        self.assertLessEqual(metrics["queues"]["documents"]["peak_depth"], 1)
+
+    def test_documents_without_chunks_or_page_ids_keep_their_own_metadata(self):
+        documents = [
+            {"page_content": "", "metadata": {"id": "empty"}},
+            {"page_content": "doc a", "metadata": {"title": "a"}},
+            {"page_content": "doc b", "metadata": {"title": "b"}},
+        ]
+        self.chunking_mock.chunk_document.side_effect = lambda doc: [
+            Chunk(f"{doc['page_content']} chunk {i}", None, f"{doc['page_content']}-{i}") for i in range(2)
+        ] if doc["page_content"] else []
+        ingestion = StreamingIngestion(
+            iter(documents), self.chunking_mock, self.embeddings_mock, self.vector_store_mock, embed_batch_size=3,
+        )
+
+        ingestion.run()
+
+        written = [
+            (text, metadata) for call in self.vector_store_mock.add_texts.call_args_list
+            for text, metadata in zip(call[0][0], call[1]["metadatas"])
+        ]
+        self.assertEqual(len(written), 4)
+        for text, metadata in written:
+            self.assertEqual(text.split()[1], metadata["title"])
+
+    def test_backpressure_limits_documents_read_ahead(self):
+        release = threading.Event()
+        loaded = []
+
+        def documents():
+            for i in range(100):
+                loaded.append(i)
+                yield {"page_content": f"doc {i}", "metadata": {"id": str(i)}}
+
+        def slow_write(texts, metadatas=None, embeddings=None, ids=None):
+            release.wait(timeout=5)
+
+        self.vector_store_mock.add_texts.side_effect = slow_write
+        ingestion = StreamingIngestion(
+            documents(), self.chunking_mock, self.embeddings_mock, self.vector_store_mock,
+            embed_batch_size=3, queue_size=2, embed_workers=1,
+        )
+        runner = threading.Thread(target=ingestion.run)
+        runner.start()
+        runner.join(timeout=0.5)
+
+        # The writer is blocked, so only a bounded number of documents can have been read
+        self.assertLess(len(loaded), 20)
+        release.set()
+        runner.join(timeout=5)
+        self.assertEqual(len(loaded), 100)
+
+    def test_stage_error_stops_the_pipeline_and_is_raised(self):
+        documents = ({"page_content": f"doc {i}", "metadata": {"id": str(i)}} for i in range(50))
+        self.embeddings_mock.embed_documents.side_effect = RuntimeError("Bedrock unavailable")
+        ingestion = StreamingIngestion(
+            documents, self.chunking_mock, self.embeddings_mock, self.vector_store_mock,
+            embed_batch_size=2, queue_size=1,
+        )
+
+        with self.assertRaises(RuntimeError):
+            ingestion.run()
+        self.vector_store_mock.add_texts.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from app.core.config import Config
+from app.core.response_cache import ResponseCache
+from app.pipelines.rag_pipeline import RAGPipeline
+from app.utils.telemetry import NOOP_SPAN, Telemetry, telemetry
+
+
+class TestTelemetry(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.metrics_path = os.path.join(self.directory.name, "metrics.prom")
+        self.spans_path = os.path.join(self.directory.name, "spans.jsonl")
+        self.telemetry = Telemetry().configure({
+            "exporters": ("prometheus", "otel"),
+            "service_name": "test",
+            "prometheus": {"path": self.metrics_path},
+            "otel": {"path": self.spans_path},
+        })
+
+    def _spans(self):
+        with open(self.spans_path) as f:
+            return [span for line in f for span in json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"]]
+
+    def test_disabled_telemetry_records_nothing(self):
+        disabled = Telemetry()
+
+        with disabled.span("embed", texts=3) as span:
+            span.set_attribute("ignored", True)
+        disabled.add("rag_chunks_total", 5)
+
+        self.assertIs(disabled.span("embed"), NOOP_SPAN)
+        self.assertEqual(disabled.registry.render(), "\n")
+
+    def test_nested_spans_are_exported_as_one_otlp_trace(self):
+        with self.telemetry.span("generate_response"):
+            with self.telemetry.span("search", k=4):
+                pass
+            with self.assertRaises(ValueError):
+                with self.telemetry.span("llm"):
+                    raise ValueError("throttled")
+        self.telemetry.shutdown()
+
+        search, llm, root = self._spans()
+        self.assertEqual({search["traceId"], llm["traceId"]}, {root["traceId"]})
+        self.assertEqual(search["parentSpanId"], root["spanId"])
+        self.assertNotIn("parentSpanId", root)
+        self.assertEqual(search["attributes"], [{"key": "k", "value": {"intValue": "4"}}])
+        self.assertEqual(llm["status"], {"code": 2, "message": "ValueError: throttled"})
+        self.assertLessEqual(int(root["startTimeUnixNano"]), int(search["startTimeUnixNano"]))
+
+    def test_prometheus_text_has_counters_and_stage_histograms(self):
+        self.telemetry.add("rag_cache_hits_total", cache="response")
+        self.telemetry.add("rag_cache_hits_total", 2, cache="response")
+        with self.telemetry.span("embed"):
+            pass
+        self.telemetry.shutdown()
+
+        with open(self.metrics_path) as f:
+            text = f.read()
+        self.assertIn("# TYPE rag_cache_hits_total counter\nrag_cache_hits_total{cache=\"response\"} 3\n", text)
+        self.assertIn("# TYPE rag_stage_duration_seconds histogram\n", text)
+        self.assertIn('rag_stage_duration_seconds_bucket{stage="embed",le="0.005"} 1\n', text)
+        self.assertIn('rag_stage_duration_seconds_bucket{stage="embed",le="+Inf"} 1\n', text)
+        self.assertIn('rag_stage_duration_seconds_count{stage="embed"} 1\n', text)
+
+
+class TestPipelineInstrumentation(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.spans_path = os.path.join(directory.name, "spans.jsonl")
+        telemetry.configure({"exporters": ("otel",), "otel": {"path": self.spans_path}})
+        self.addCleanup(telemetry.configure, {})
+
+        config = MagicMock(spec=Config)
+        config.get_query_config.return_value = {"max_concurrency": 2, "llm_concurrency": 1}
+        config.get.return_value = "Context:\n{context}\n\nQuestion:\n{query}"
+        self.embeddings = MagicMock()
+        self.embeddings.embed_query.return_value = [0.1, 0.2]
+        self.vector_store = MagicMock()
+        self.vector_store.similarity_search_by_vector.return_value = [("chunk", 0.9)]
+        self.llm = MagicMock()
+        self.llm.generate_text.return_value = "answer"
+        response_cache = MagicMock(spec=ResponseCache)
+        response_cache.get.return_value = None
+        self.pipeline = RAGPipeline(
+            config, None, None, self.embeddings, self.vector_store, self.llm, response_cache=response_cache
+        )
+
+    def test_generate_response_records_every_stage(self):
+        self.assertEqual(self.pipeline.generate_response("question"), "answer")
+        telemetry.flush()
+
+        with open(self.spans_path) as f:
+            spans = json.loads(f.read())["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        self.assertEqual(
+            [span["name"] for span in spans], ["embed_query", "search", "retrieve", "prompt", "llm", "generate_response"]
+        )
+        self.assertEqual(len({span["traceId"] for span in spans}), 1)
+        self.assertIn('rag_cache_misses_total{cache="response"} 1', telemetry.registry.render())
+
+
+if __name__ == "__main__":
+    unittest.main()